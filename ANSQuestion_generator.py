@@ -1,8 +1,18 @@
 import matplotlib.pyplot as plt
 import numpy as np
 import random
+from question_bank import QuestionBank, ANS_DTYPE
 
-def points_in_ellipse(num_points, center, width, height, ax):
+# Ellipse parameters.
+ELLIPSE_L_CENTER = (0.25, 0.5)
+ELLIPSE_R_CENTER = (0.75, 0.5)
+ELLIPSE_WIDTH = 0.475
+ELLIPSE_HEIGHT = 0.8
+
+# Bumped whenever the same seed starts producing a different bank.
+GENERATOR_VERSION = 2
+
+def points_in_ellipse(num_points, center, width, height, ax, rng=None):
     """
     Generate random points within the boundary of an ellipse.
 
@@ -12,17 +22,21 @@ def points_in_ellipse(num_points, center, width, height, ax):
         width (float): The width of the ellipse.
         height (float): The height of the ellipse.
         ax (matplotlib.axes.Axes): The Axes object to plot the ellipse.
+        rng (np.random.Generator, optional): The random number generator to draw from. Defaults to a fresh unseeded generator.
 
     Returns:
         points (list): A list of generated points within the ellipse boundary, each represented as a tuple (x, y).
     """
     
+    if rng == None:
+        rng = np.random.default_rng()
+    
     points = []
     
     while len(points) < num_points:
         
         # Generate a random point.
-        x, y = np.random.rand(2)
+        x, y = rng.random(2)
         
         # Scale and shift the point to the ellipse's range.
         x = x * width + center[0] - width / 2
@@ -46,27 +60,35 @@ def generate_images(num_points_l, num_points_r):
         fig (matplotlib.figure.Figure): The generated figure object containing the plot of the ellipses and points.
     """
     
+    # Generate points within each ellipse.
+    points_ellipse_l = points_in_ellipse(num_points_l, ELLIPSE_L_CENTER, ELLIPSE_WIDTH, ELLIPSE_HEIGHT, None)
+    points_ellipse_r = points_in_ellipse(num_points_r, ELLIPSE_R_CENTER, ELLIPSE_WIDTH, ELLIPSE_HEIGHT, None)
+    
+    return draw_images(points_ellipse_l, points_ellipse_r)
+
+def draw_images(points_ellipse_l, points_ellipse_r):
+    """
+    Plot two ellipses with the given points inside them.
+
+    Parameters:
+        points_ellipse_l (list): Points (x, y) inside the left ellipse.
+        points_ellipse_r (list): Points (x, y) inside the right ellipse.
+
+    Returns:
+        fig (matplotlib.figure.Figure): The generated figure object containing the plot of the ellipses and points.
+    """
+    
     # Set up the figure and axis.
     fig, ax = plt.subplots(figsize=(8, 8))
-
-    # Ellipse parameters.
-    ellipse_l_center = (0.25, 0.5)
-    ellipse_r_center = (0.75, 0.5)
-    ellipse_width = 0.475
-    ellipse_height = 0.8
     
     # Draw two ellipses to the plot.
-    ellipse_l = plt.matplotlib.patches.Ellipse(ellipse_l_center, ellipse_width, ellipse_height, color='black', fill=False)
-    ellipse_r = plt.matplotlib.patches.Ellipse(ellipse_r_center, ellipse_width, ellipse_height, color='black', fill=False)
+    ellipse_l = plt.matplotlib.patches.Ellipse(ELLIPSE_L_CENTER, ELLIPSE_WIDTH, ELLIPSE_HEIGHT, color='black', fill=False)
+    ellipse_r = plt.matplotlib.patches.Ellipse(ELLIPSE_R_CENTER, ELLIPSE_WIDTH, ELLIPSE_HEIGHT, color='black', fill=False)
 
     # Add the ellipses to the axes.
     ax.add_patch(ellipse_l)
     ax.add_patch(ellipse_r)
 
-    # Generate points within each ellipse.
-    points_ellipse_l = points_in_ellipse(num_points_l, ellipse_l_center, ellipse_width, ellipse_height, ax)
-    points_ellipse_r = points_in_ellipse(num_points_r, ellipse_r_center, ellipse_width, ellipse_height, ax)
-
     # Plot the points.
     x_points_l, y_points_l = zip(*points_ellipse_l)
     x_points_r, y_points_r = zip(*points_ellipse_r)
@@ -85,23 +107,26 @@ def generate_images(num_points_l, num_points_r):
     
     return fig
 
-def ANSQuestion_bank(seed):
+def ANSQuestion_bank(seed, processes=None, renderer=None, rng=None, progress=None):
     """
     Generate a question bank of images with points distributed within two ellipses,
     along with corresponding information about the number of points and the correct answer.
 
     Parameters:
         seed (int): The random seed for reproducibility.
+        processes (int, optional): If given, images are rendered by this many worker processes into shared memory instead of being saved to disk. Defaults to None.
+        renderer (render_service.RenderClient, optional): If given, images are drawn and saved by the renderer service instead of this process. Defaults to None.
+        rng (np.random.Generator, optional): The random number generator owned by this bank. Defaults to one seeded with seed.
+        progress (callable, optional): Called with the fraction of the bank generated so far. Defaults to None.
 
     Returns:
-        tuple: A tuple containing three lists:
-            1. image_list (list): A list of paths to the generated images.
-            2. num_points_list (list): A list of tuples containing the number of points generated within the left and right ellipses for each image.
-            3. answer_list (list): A list of strings indicating the correct answer for each image, where 'left' corresponds to the left ellipse having more points, and 'right' corresponds to the right ellipse having more points.
+        bank (QuestionBank): One record per image with its path ("image"), the number of points in the left and right ellipses ("num_left", "num_right"), their ratio ("ratio") and the correct answer ("answer", "Left" or "Right").
+                             When rendered by worker processes, the images are held as shared_frames.SharedFrame objects in bank.frames instead.
     """
     
-    # Set random seed.
-    np.random.seed(seed)
+    # Use a random number generator of this bank's own, leaving the global state untouched.
+    if rng == None:
+        rng = np.random.default_rng(seed)
     
     # Set ratios of numbers
     ratios = [(12,9), (16,12), (20,15), (14,12), (21,18), (18,6), (10,9), (20,18)]
@@ -110,16 +135,17 @@ def ANSQuestion_bank(seed):
     image_list = []
     num_points_list = []
     answer_list = []
+    points_list = []
     
     # Generate 64 images and add their information to the according list.
     for idx in range(64):
         
         # Randomly choose ellipse ratio index.
-        random_index = np.random.choice(len(ratios))
+        random_index = rng.choice(len(ratios))
         random_ratio = ratios[random_index]
         
         # Random answer and add it to list.
-        answer = "Left" if np.random.randint(2)==0 else "Right"
+        answer = "Left" if rng.integers(2)==0 else "Right"
         answer_list.append(answer)
         
         # Determine number of points in ellipses based on answer, and add them to list.
@@ -127,8 +153,26 @@ def ANSQuestion_bank(seed):
         num_points_r = random_ratio[1] if answer=="Left" else random_ratio[0]
         num_points_list.append((num_points_l, num_points_r))
         
+        # Generate the points in this process so the random sequence does not depend on rendering.
+        points_ellipse_l = points_in_ellipse(num_points_l, ELLIPSE_L_CENTER, ELLIPSE_WIDTH, ELLIPSE_HEIGHT, None, rng)
+        points_ellipse_r = points_in_ellipse(num_points_r, ELLIPSE_R_CENTER, ELLIPSE_WIDTH, ELLIPSE_HEIGHT, None, rng)
+        
+        # Report progress.
+        if progress != None:
+            progress((idx+1)/64)
+        
+        # Leave rendering to the worker processes if requested.
+        if processes != None:
+            points_list.append((points_ellipse_l, points_ellipse_r))
+            continue
+        
+        # Let the renderer service draw and save the image if one is available.
+        if renderer != None:
+            image_list.append(renderer.render_ans(points_ellipse_l, points_ellipse_r, f'./ANS_Test/Figures/ANSQ_{idx}.png'))
+            continue
+        
         # Generate and save image.
-        fig = generate_images(num_points_l, num_points_r)
+        fig = draw_images(points_ellipse_l, points_ellipse_r)
         fig.savefig(f'./ANS_Test/Figures/ANSQ_{idx}.png')
 
         # Add name of image to list.
@@ -136,5 +180,22 @@ def ANSQuestion_bank(seed):
 
         # close image.
         plt.close(fig)
+    
+    # Render all images into shared memory frames owned by this process.
+    frames = None
+    if processes != None:
+        from shared_frames import render_in_workers
+        frames = render_in_workers(draw_images, points_list, processes)
+        image_list = [""]*len(frames)
+    
+    # Pack the questions into a typed bank.
+    num_points = np.array(num_points_list)
+    bank = QuestionBank.from_columns("ANS", ANS_DTYPE, {
+        "image":image_list,
+        "num_left":num_points[:,0],
+        "num_right":num_points[:,1],
+        "ratio":num_points[:,0] / num_points[:,1],
+        "answer":answer_list,
+    }, {"generator":"ANS", "version":GENERATOR_VERSION, "seed":seed}, frames)
         
-    return image_list, num_points_list, answer_list
\ No newline at end of file
+    return bank
\ No newline at end of file
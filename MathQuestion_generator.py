@@ -1,6 +1,10 @@
 import numpy as np
+from question_bank import QuestionBank, MATH_DTYPE
 
-def create_random_MathQuestion(num_steps, num_range=(100,10)):
+# Bumped whenever the same seed starts producing a different bank.
+GENERATOR_VERSION = 2
+
+def create_random_MathQuestion(num_steps, num_range=(100,10), rng=None):
     """
     Generates a random math equation and its result.
 
@@ -9,6 +13,7 @@ def create_random_MathQuestion(num_steps, num_range=(100,10)):
         num_range (tuple): A tuple of two integers, defining the range of values for the operands.
                            The first element is the maximum for addition and subtraction,
                            and the second is the maximum for multiplication and division.
+        rng (np.random.Generator, optional): The random number generator to draw from. Defaults to a fresh unseeded generator.
 
     Returns:
         tuple: A tuple containing two elements:
@@ -16,34 +21,37 @@ def create_random_MathQuestion(num_steps, num_range=(100,10)):
             2. result (str): A string representing the final result of the equation.
     """
     
+    if rng == None:
+        rng = np.random.default_rng()
+    
     # Define the operations list.
     operations = ['+', '-', '\u00D7', '\u00F7']
     
     # Start the equation list with a random number.
-    equation = [str(np.random.randint(1, num_range[0]+1))]
+    equation = [str(rng.integers(1, num_range[0]+1))]
     
     # Initialize result with the first number.
     result = int(equation[0])
 
     # Randomly choose an operation & update the result.
     for step in range(num_steps-1):
-        operation = np.random.choice(operations)
+        operation = rng.choice(operations)
 
         if operation == '+':
-            num = np.random.randint(1, num_range[0]+1)
+            num = rng.integers(1, num_range[0]+1)
             result += num
         elif operation == '-':
-            num = np.random.randint(1, num_range[0]+1)
+            num = rng.integers(1, num_range[0]+1)
             result -= num
         elif operation == '\u00D7':
-            num = np.random.randint(2, num_range[1]+1)
+            num = rng.integers(2, num_range[1]+1)
             result *= num
         else:
-            num = np.random.randint(2, num_range[1]+1)
+            num = rng.integers(2, num_range[1]+1)
             
             # Ensure division is possible without remainder.
             while num == 0 or result % num != 0:
-                num = np.random.randint(1, num_range[1]+1)
+                num = rng.integers(1, num_range[1]+1)
             result /= num
             
         # Add the operation and number to the equation list.
@@ -54,29 +62,39 @@ def create_random_MathQuestion(num_steps, num_range=(100,10)):
     
     return equation, result
 
-def MathQuestion_bank(seed):
+def MathQuestion_bank(seed, rng=None, progress=None):
     """
     Generates a bank of random math questions and their answers, based on specified seed.
 
     Parameters:
         seed (int): A seed for the random number generator to ensure reproducibility.
+        rng (np.random.Generator, optional): The random number generator owned by this bank. Defaults to one seeded with seed.
+        progress (callable, optional): Called with the fraction of the bank generated so far. Defaults to None.
 
     Returns:
-        tuple: A tuple containing two lists:
-            1. equation_list (list): A list of equations for each question, where each equation is represented as a list of strings detailing the steps.
-            2. result (str): A list of strings indicating the final results of the equations.
+        bank (QuestionBank): One record per question with its calculation steps ("equation", padded to four entries), the number of steps ("steps") and the final result ("answer").
     """
     
-    # Set random seed.
-    np.random.seed(seed)
+    # Use a random number generator of this bank's own, leaving the global state untouched.
+    if rng == None:
+        rng = np.random.default_rng(seed)
     equation_list = []
     answer_list = []
     
     # Generate questions for three levels of difficulty.
     for level in range(3):
         for idx in range(5):
-            question = create_random_MathQuestion(level+2, ((idx+1)*10,idx+10))
+            question = create_random_MathQuestion(level+2, ((idx+1)*10,idx+10), rng)
             equation_list.append(question[0])
             answer_list.append(question[1])
+            if progress != None:
+                progress(len(equation_list)/15)
+    
+    # Pack the questions into a typed bank, padding the equations to the widest question.
+    bank = QuestionBank.from_columns("Math", MATH_DTYPE, {
+        "equation":[equation + [""]*(4-len(equation)) for equation in equation_list],
+        "steps":[len(equation) for equation in equation_list],
+        "answer":answer_list,
+    }, {"generator":"Math", "version":GENERATOR_VERSION, "seed":seed})
     
-    return equation_list, answer_list
+    return bank
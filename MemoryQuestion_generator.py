@@ -1,3 +1,8 @@
+from question_bank import QuestionBank, MEMORY_DTYPE
+
+# Bumped whenever the question list changes.
+GENERATOR_VERSION = 1
+
 def MemoryQuestion_bank():
     """
     Creates and returns a structured list of memory test questions with associated images to memory, answer options, and correct answers.
@@ -6,7 +11,7 @@ def MemoryQuestion_bank():
         None
     
     Returns:
-        questions (list): A list containing question sets, where each set includes an image path and a list of questions with their details.
+        bank (QuestionBank): One record per subquestion with the index and path of the image to memorise ("group", "group_image"), its text ("description"), options ("options"), correct answer ("answer") and optional cue image ("image", empty if none).
     """
     questions = [
         [
@@ -51,4 +56,15 @@ def MemoryQuestion_bank():
         ],
     ]
     
-    return questions
\ No newline at end of file
+    # Flatten the question sets into one record per subquestion.
+    subquestions = [(group, question[0], subquestion) for group, question in enumerate(questions) for subquestion in question[1]]
+    bank = QuestionBank.from_columns("Memory", MEMORY_DTYPE, {
+        "group":[group for group, image, subquestion in subquestions],
+        "group_image":[image for group, image, subquestion in subquestions],
+        "description":[subquestion[0] for group, image, subquestion in subquestions],
+        "options":[subquestion[1] for group, image, subquestion in subquestions],
+        "answer":[subquestion[2] for group, image, subquestion in subquestions],
+        "image":[subquestion[3] or "" for group, image, subquestion in subquestions],
+    }, {"generator":"Memory", "version":GENERATOR_VERSION})
+    
+    return bank
\ No newline at end of file
@@ -1,21 +1,29 @@
 import numpy as np
 import random
 import cube_constructor as cc
+from question_bank import QuestionBank, SR_DTYPE
 
 question_info = {"idx":0}
 
-def create_random_cubes(shape, colors):
+# Bumped whenever the same seed starts producing a different bank.
+GENERATOR_VERSION = 2
+
+def create_random_cubes(shape, colors, rng=None):
     """
     Fills a 3D numpy array with color streaks starting from random positions and extending for random lengths in random directions.
     
     Parameters:
         shape (list): Shape of the 3D array [depth, rows, cols].
         colors (str): List of colors to use.
+        rng (np.random.Generator, optional): The random number generator to draw from. Defaults to a fresh unseeded generator.
     
     Returns:
         cubes (np.ndarray): A 3D numpy array with colored streaks.
     """
     
+    if rng == None:
+        rng = np.random.default_rng()
+    
     # Initialize array with empty strings.
     cubes = np.full(shape, "")
 
@@ -23,33 +31,35 @@ def create_random_cubes(shape, colors):
     for color in colors:
         
         # Choose a random starting point in 3D space.
-        start_depth = np.random.randint(depth-1)
-        start_row = np.random.randint(rows-1)
-        start_col = np.random.randint(cols-1)
+        start_depth = rng.integers(depth-1)
+        start_row = rng.integers(rows-1)
+        start_col = rng.integers(cols-1)
         
         # Randomly choose direction: 0 for along depth, 1 for row, 2 for column.
-        direction = np.random.choice([0, 1, 2])
+        direction = rng.choice([0, 1, 2])
         
         # Determine the length and fill the array based on the chosen direction.
         if direction == 0:
-            length = np.random.randint(2, depth - start_depth + 1)
+            length = rng.integers(2, depth - start_depth + 1)
             cubes[start_depth:start_depth+length, start_row, start_col] = color
         elif direction == 1:
-            length = np.random.randint(2, rows - start_row + 1)
+            length = rng.integers(2, rows - start_row + 1)
             cubes[start_depth, start_row:start_row+length, start_col] = color
         else:
-            length = np.random.randint(2, cols - start_col + 1)
+            length = rng.integers(2, cols - start_col + 1)
             cubes[start_depth, start_row, start_col:start_col+length] = color
 
     return cubes
 
-def random_SRQuestion(shape, colors):
+def random_SRQuestion(shape, colors, renderer=None, rng=None):
     """
     Generates a spatial reasoning question with a specific shape and set of colors.
     
     Parameters:
         shape (tuple): The dimensions of the cube arrangement (e.g., (3, 3, 3) for a 3x3x3 grid).
         colors (list): A list of colors used in the cube arrangement.
+        renderer (render_service.RenderClient, optional): If given, the images are drawn and saved by the renderer service instead of this process. Defaults to None.
+        rng (np.random.Generator, optional): The random number generator to draw from. Defaults to a fresh unseeded generator.
 
     Returns:
         tuple: A tuple containing four elements:
@@ -59,6 +69,9 @@ def random_SRQuestion(shape, colors):
             4. grid_size (int): The dimension of the 3D space used in the question, represented as an integer.
     """
     
+    if rng == None:
+        rng = np.random.default_rng()
+    
     # Initialize options and solvability check.
     options = []
     solvable = False
@@ -66,9 +79,12 @@ def random_SRQuestion(shape, colors):
     # Get size of the 3d space.
     grid_size = shape[0]
     
-    # Generate new random cubes until the question is solvable.
+    # Views to be drawn by the renderer service, as (path, view, flip, rot).
+    render_views = []
+    
+    # Generate new random cubes until the question is solvable, only plotting them locally without a renderer.
     while solvable == False:
-        cube_arr = cc.CubeArrangement(create_random_cubes(shape,colors), grid=True, ticks=True)
+        cube_arr = cc.CubeArrangement(create_random_cubes(shape,colors,rng), grid=True, ticks=True, plot=renderer==None)
         solvable = cube_arr.check_solution()
     
     # Increment question index.
@@ -76,8 +92,11 @@ def random_SRQuestion(shape, colors):
     question_idx = question_info["idx"]
     
      # Save the question description image according to index.
-    cube_arr.fig.savefig(f"./Spatial_Reasoning_Test/Figures/SRQ_{question_idx}.png", dpi=300, bbox_inches='tight', pad_inches=0)
     image = f"./Spatial_Reasoning_Test/Figures/SRQ_{question_idx}.png"
+    if renderer == None:
+        cube_arr.fig.savefig(image, dpi=300, bbox_inches='tight', pad_inches=0)
+    else:
+        render_views.append((image, None, None, None))
     
     # Prepare lists for view, rotation, and options generation.
     view_list = ['xy','-xy','xz','-xz','yz','-yz']
@@ -87,13 +106,16 @@ def random_SRQuestion(shape, colors):
     
     # Generate three incorrect options (viable views).
     for idx in range(3):
-        view = np.random.choice(view_list)
+        view = rng.choice(view_list)
         view_list.remove(view)
-        option = np.random.choice(option_list)
+        option = rng.choice(option_list)
         option_list.remove(option)
-        rot = np.random.choice(rot_list)
-        cube_arr.set_view(view=view, rot=rot)
-        cube_arr.fig.savefig(f"./Spatial_Reasoning_Test/Figures/SRQ_{question_idx}_{option}.png", dpi=300,  bbox_inches='tight', pad_inches=0)
+        rot = rng.choice(rot_list)
+        if renderer == None:
+            cube_arr.set_view(view=view, rot=rot)
+            cube_arr.fig.savefig(f"./Spatial_Reasoning_Test/Figures/SRQ_{question_idx}_{option}.png", dpi=300,  bbox_inches='tight', pad_inches=0)
+        else:
+            render_views.append((f"./Spatial_Reasoning_Test/Figures/SRQ_{question_idx}_{option}.png", view, None, rot))
         options.append(f"./Spatial_Reasoning_Test/Figures/SRQ_{question_idx}_{option}.png")
     
     # Determine the impossible view after flip.
@@ -108,32 +130,39 @@ def random_SRQuestion(shape, colors):
         flip_list.remove("x")
     
     # Generate the correct option (unviable view).
-    flip= np.random.choice(flip_list)
-    rot = np.random.choice(rot_list)
-    cube_arr.set_view(view=view, flip=flip, rot=rot)
+    flip= rng.choice(flip_list)
+    rot = rng.choice(rot_list)
     answer = option = option_list[0]
-    cube_arr.fig.savefig(f"./Spatial_Reasoning_Test/Figures/SRQ_{question_idx}_{option}.png", dpi=300, bbox_inches='tight', pad_inches=0)
+    if renderer == None:
+        cube_arr.set_view(view=view, flip=flip, rot=rot)
+        cube_arr.fig.savefig(f"./Spatial_Reasoning_Test/Figures/SRQ_{question_idx}_{option}.png", dpi=300, bbox_inches='tight', pad_inches=0)
+    else:
+        render_views.append((f"./Spatial_Reasoning_Test/Figures/SRQ_{question_idx}_{option}.png", view, flip, rot))
     options.append(f"./Spatial_Reasoning_Test/Figures/SRQ_{question_idx}_{option}.png")
     
+    # Draw all views of the arrangement in one service round trip.
+    if renderer != None:
+        renderer.render_cube(cube_arr.cubes, render_views)
+    
     return image, options, answer, grid_size
 
-def SRQuestion_bank(seed):
+def SRQuestion_bank(seed, renderer=None, rng=None, progress=None):
     """
     Generates a bank of spatial reasoning questions and their answers, based on specified seed.
 
     Parameters:
         seed (int): The seed value for the random number generator to ensure that the questions generated are reproducible.
+        renderer (render_service.RenderClient, optional): If given, the images are drawn and saved by the renderer service. Defaults to None.
+        rng (np.random.Generator, optional): The random number generator owned by this bank. Defaults to one seeded with seed.
+        progress (callable, optional): Called with the fraction of the bank generated so far. Defaults to None.
 
     Returns:
-        tuple: Contains four lists:
-            1. image_list (list): A list of paths to the description images of each question.
-            2. options_list (list): A list of lists containing paths to the option images for each question.
-            3. answer_list (list): A list of string indicating the correct option for each question.
-            4. grid_size_list (list): The dimensions of the 3D space used for each question.
+        bank (QuestionBank): One record per question with the path of its description image ("image"), the paths of its option images ("options"), the correct option ("answer") and the dimension of its 3D space ("grid_size").
     """
     
-    # Set random seed.
-    np.random.seed(seed)
+    # Use a random number generator of this bank's own, leaving the global state untouched.
+    if rng == None:
+        rng = np.random.default_rng(seed)
     
     # Initial lists to store data.
     image_list = []
@@ -152,10 +181,20 @@ def SRQuestion_bank(seed):
     # Generate questions for each level.
     for level in level_list:
         for idx in range(3):
-            question = random_SRQuestion(level[0], level[1])
+            question = random_SRQuestion(level[0], level[1], renderer, rng)
             image_list.append(question[0])
             options_list.append(question[1])
             answer_list.append(question[2])
             grid_size_list.append(question[3])
+            if progress != None:
+                progress(len(image_list)/9)
+        
+    # Pack the questions into a typed bank.
+    bank = QuestionBank.from_columns("SR", SR_DTYPE, {
+        "image":image_list,
+        "options":options_list,
+        "answer":answer_list,
+        "grid_size":grid_size_list,
+    }, {"generator":"SR", "version":GENERATOR_VERSION, "seed":seed})
         
-    return image_list, options_list, answer_list, grid_size_list
\ No newline at end of file
+    return bank
\ No newline at end of file
@@ -0,0 +1,250 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import argparse
+import threading
+import struct
+import json
+import os
+
+# Columns stored as 64-bit floats, every other field is kept in the payload column.
+NUMERIC_COLUMNS = ["total_score", "total_time", "age", "tiredness"]
+
+class CollectorStore:
+    """
+    A class to store submitted results column by column, one directory per test and one append-only file per column.
+
+    Numeric columns are packed 64-bit floats, so a score distribution reads a single contiguous file, while submission IDs and full payloads are kept one per line.
+    Submissions are deduplicated on their submission ID, so a client retrying a batch never stores a row twice.
+
+    Attributes:
+        directory (str): The directory holding the store.
+        submission_ids (set): The IDs of every stored submission.
+        histograms (dict): The count of each total score, by test, kept up to date as batches are stored.
+    """
+
+    def __init__(self, directory):
+        """
+        Opens the store, loading the submission IDs and score histograms of the rows already stored.
+
+        Parameters:
+            directory (str): The directory holding the store, created if needed.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.directory = directory
+        self.submission_ids = set()
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        for test in os.listdir(directory):
+            test_directory = os.path.join(directory, test)
+
+            # A test directory without IDs was created by a batch interrupted before any of its rows were stored.
+            if not os.path.exists(os.path.join(test_directory, "submission_id.txt")):
+                continue
+            with open(os.path.join(test_directory, "submission_id.txt")) as file:
+                self.submission_ids.update(file.read().split())
+            scores = self.column(test, "total_score")
+            values, counts = np.unique(scores[~np.isnan(scores)].astype(int), return_counts=True)
+            self.histograms[test] = dict(zip(values.tolist(), counts.tolist()))
+
+        return
+
+    def add_batch(self, submissions):
+        """
+        Stores a batch of submissions, appending to each column file of their tests and syncing them to disk once per batch.
+
+        Parameters:
+            submissions (list): Dictionaries with the "test", "submission_id" and "payload" of each submission.
+
+        Returns:
+            list: The submission IDs now stored, including the ones stored before.
+        """
+
+        with self._lock:
+            rows = {}
+            for submission in submissions:
+                if submission["submission_id"] not in self.submission_ids:
+                    rows.setdefault(submission["test"], []).append(submission)
+                    self.submission_ids.add(submission["submission_id"])
+
+            for test, test_rows in rows.items():
+                self._append(test, test_rows)
+
+        return [submission["submission_id"] for submission in submissions]
+
+    def _append(self, test, rows):
+        """
+        Appends rows to the column files of a test. Must be called with the lock held.
+
+        Parameters:
+            test (str): The name of the test.
+            rows (list): The submissions to append.
+
+        Returns:
+            None
+        """
+
+        test_directory = os.path.join(self.directory, test)
+        os.makedirs(test_directory, exist_ok=True)
+
+        columns = {f"{column}.f64":struct.pack(f"<{len(rows)}d", *(number(row["payload"].get(column)) for row in rows)) for column in NUMERIC_COLUMNS}
+        columns["payload.jsonl"] = "".join(json.dumps(row["payload"])+"\n" for row in rows).encode()
+
+        # The submission ID column is written last, so a row only counts as stored once all its columns are.
+        columns["submission_id.txt"] = "".join(row["submission_id"]+"\n" for row in rows).encode()
+        for name, data in columns.items():
+            with open(os.path.join(test_directory, name), "ab") as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+
+        histogram = self.histograms.setdefault(test, {})
+        for row in rows:
+            score = number(row["payload"].get("total_score"))
+            if not np.isnan(score):
+                histogram[int(score)] = histogram.get(int(score), 0)+1
+
+        return
+
+    def column(self, test, column):
+        """
+        Reads a numeric column of a test.
+
+        Parameters:
+            test (str): The name of the test.
+            column (str): One of NUMERIC_COLUMNS.
+
+        Returns:
+            np.ndarray: The column's values, NaN where a submission did not have it.
+        """
+
+        path = os.path.join(self.directory, test, f"{column}.f64")
+        if not os.path.exists(path):
+            return np.empty(0)
+
+        return np.fromfile(path, dtype="<f8")
+
+    def distribution(self, test):
+        """
+        Returns the score distribution of a test, in the format of score_sketch.ScoreSketch.to_dict().
+
+        Parameters:
+            test (str): The name of the test.
+
+        Returns:
+            dict: The exact histogram of the test's total scores.
+        """
+
+        with self._lock:
+            counts = dict(self.histograms.get(test, {}))
+
+        return {"version":1, "test":test, "site":"collector", "bin_width":1, "counts":{str(score):count for score, count in sorted(counts.items())}}
+
+def number(value):
+    """
+    Converts a submitted value to a float, NaN if it is missing or not a number.
+
+    Parameters:
+        value: The submitted value.
+
+    Returns:
+        float: The value.
+    """
+
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    """
+    A class to answer the collector's HTTP requests:
+
+        POST /submissions: stores {"submissions": [{"test", "submission_id", "payload"}, ...]}, answers {"accepted": [submission IDs]}.
+        GET /distribution?test=ANS: answers the test's score histogram.
+        GET /health: answers {"ok": true}.
+    """
+
+    # The store, set by serve().
+    store = None
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/submissions":
+            return self.reply(404, {"error":"not found"})
+
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            submissions = body["submissions"]
+            for submission in submissions:
+                if not isinstance(submission.get("test"), str) or not isinstance(submission.get("submission_id"), str) or "/" in submission["test"] or submission["test"].startswith("."):
+                    raise ValueError(f"malformed submission {submission!r}")
+        except (ValueError, KeyError, TypeError) as error:
+            return self.reply(400, {"error":str(error)})
+
+        return self.reply(200, {"accepted":self.store.add_batch(submissions)})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            return self.reply(200, {"ok":True})
+        if url.path == "/distribution":
+            return self.reply(200, self.store.distribution(parse_qs(url.query).get("test", [""])[0]))
+
+        return self.reply(404, {"error":"not found"})
+
+    def reply(self, status, body):
+        """
+        Sends a JSON response.
+
+        Parameters:
+            status (int): The HTTP status.
+            body (dict): The response body.
+
+        Returns:
+            None
+        """
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+        return
+
+def serve(host="127.0.0.1", port=8770, directory="./Data/collector"):
+    """
+    Creates the collector's HTTP server, each request being handled on its own thread.
+
+    Parameters:
+        host (str, optional): The address to listen on. Defaults to "127.0.0.1", local connections only.
+        port (int, optional): The port to listen on. Defaults to 8770.
+        directory (str, optional): The directory of the store. Defaults to "./Data/collector".
+
+    Returns:
+        ThreadingHTTPServer: The server, call serve_forever() to run it.
+    """
+
+    handler = type("BoundCollectorHandler", (CollectorHandler,), {"store":CollectorStore(directory)})
+
+    return ThreadingHTTPServer((host, port), handler)
+
+# Run the collector when started as a script.
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Collect test results sent in batches, and serve their score distributions.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8770, help="Port to listen on.")
+    parser.add_argument("--directory", default="./Data/collector", help="Directory of the columnar store.")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.directory)
+    print(f"Collecting results on http://{args.host}:{args.port}, stored in {args.directory}")
+    server.serve_forever()
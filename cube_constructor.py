@@ -16,7 +16,7 @@ class CubeArrangement:
         rot (int): An integer representing the rotation angle of the plot.
     """
 
-    def __init__(self, cubes=None , ticks=False, grid=False, view='', flip='', rot=0):
+    def __init__(self, cubes=None , ticks=False, grid=False, view='', flip='', rot=0, plot=True):
         """
         Initialize the cube arrangement with optional customization.
 
@@ -27,6 +27,7 @@ class CubeArrangement:
             view (str, optional): A string indicating the initial viewing angle of the plot. Default is an empty string.
             flip (str, optional): A string indicating if the plot should be flipped along a certain axis. Default is an empty string.
             rot (int, optional): An integer representing the rotation angle of the plot. Default is 0.
+            plot (bool, optional): Flag to indicate whether to plot the cubes right away. Default is True, set it to False when only check_solution() is needed.
         
         Returns:
             None
@@ -48,7 +49,8 @@ class CubeArrangement:
         self.rot = rot
 
         # Plot cubes with initial settings.
-        self.plot_voxels()
+        if plot == True:
+            self.plot_voxels()
 
         return
         
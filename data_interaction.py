@@ -2,12 +2,110 @@ import requests
 from bs4 import BeautifulSoup
 import json
 import pandas as pd
-from io import StringIO
+from io import BytesIO
+import threading
+import os
 
+# Base URLs of Google Forms and Google Sheets, e.g. set COGTEST_FORMS_URL=http://localhost:8000 to test uploads against a local stand-in server.
+FORMS_URL = os.environ.get('COGTEST_FORMS_URL', 'https://docs.google.com/forms/d/e')
+SHEETS_URL = os.environ.get('COGTEST_SHEETS_URL', 'https://docs.google.com/spreadsheets/d')
+
+# Pooled HTTP session shared by every request, so uploads and sheet downloads reuse their connections to Google.
+REQUEST_TIMEOUT = 30
+session = requests.Session()
+session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8))
+session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+# Field name to entry ID mapping of each Google Form, cached in memory and on disk so submissions skip the viewform page.
+# Bump FORM_SCHEMA_VERSION whenever the way the mapping is extracted or stored changes, older cache files are then ignored.
+FORM_SCHEMA_VERSION = 1
+FORM_SCHEMA_PATH = './Data/form_schemas.json'
+form_schemas = {}
+form_schema_lock = threading.Lock()
+
+# Last download of each sheet, with its validators and parsed columns, see get_data().
+sheet_cache = {}
+sheet_cache_lock = threading.Lock()
+
+def fetch_form_schema(form_id):
+    """
+    Downloads a Google Form and extracts which entry ID each of its fields is submitted under.
+    
+    Parameters:
+        form_id (str): The ID of the Google Form.
+        
+    Returns:
+        dict: The entry name (e.g. "entry.123456") of each form item name.
+    """
+    
+    # Fetch the content of the view form page and extract the form data structure.
+    view_form_url = f'{FORMS_URL}/{form_id}/viewform'
+    page = session.get(view_form_url, timeout=REQUEST_TIMEOUT)
+    content = BeautifulSoup(page.content, "html.parser").find('script', type='text/javascript')
+    content = content.text[27:-1]
+    result = json.loads(content)[1][1]
+    
+    return {item[1]:f'entry.{item[4][0][0]}' for item in result}
+
+def load_form_schemas():
+    """
+    Loads the schemas cached on disk into memory, unless they were written by another schema version.
+    
+    Parameters:
+        None
+        
+    Returns:
+        None
+    """
+    
+    if not os.path.exists(FORM_SCHEMA_PATH):
+        return
+    
+    try:
+        with open(FORM_SCHEMA_PATH) as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return
+    
+    if cache.get("version") == FORM_SCHEMA_VERSION:
+        form_schemas.update(cache["forms"])
+    
+    return
+
+def get_form_schema(form_id, refresh=False):
+    """
+    Returns the schema of a Google Form, from memory, then from disk, and only downloads it if neither has it.
+    
+    Parameters:
+        form_id (str): The ID of the Google Form.
+        refresh (bool, optional): Downloads the schema again, e.g. after the form has been edited. Defaults to False.
+        
+    Returns:
+        dict: The entry name of each form item name, see fetch_form_schema().
+    """
+    
+    with form_schema_lock:
+        if len(form_schemas) == 0:
+            load_form_schemas()
+        if form_id in form_schemas and refresh == False:
+            return form_schemas[form_id]
+    
+    schema = fetch_form_schema(form_id)
+    
+    # Write the whole cache atomically, a concurrent upload may be reading it.
+    with form_schema_lock:
+        form_schemas[form_id] = schema
+        os.makedirs(os.path.dirname(FORM_SCHEMA_PATH), exist_ok=True)
+        with open(FORM_SCHEMA_PATH+'.tmp', 'w') as file:
+            json.dump({"version":FORM_SCHEMA_VERSION, "forms":form_schemas}, file)
+        os.replace(FORM_SCHEMA_PATH+'.tmp', FORM_SCHEMA_PATH)
+    
+    return schema
 
 def send_data(data_dict, form_id):
     """
     Submits data to a Google Form.
+    The form's schema is cached, it is only downloaded again when the form rejects a submission, e.g. because a field has been added or replaced.
     
     Parameters:
         data_dict (dict): A dictionary containing form data where keys are form item names and values are corresponding data.
@@ -17,29 +115,35 @@ def send_data(data_dict, form_id):
         bool: True if the data was successfully submitted, False otherwise.
     """
 
-    # Define the URLs for viewing and submitting the Google Form.
-    view_form_url = f'https://docs.google.com/forms/d/e/{form_id}/viewform'
-    post_form_url = f'https://docs.google.com/forms/d/e/{form_id}/formResponse'
-
-    # Fetch the content of the view form page and extract the form data structure.
-    page = requests.get(view_form_url)
-    content = BeautifulSoup(page.content, "html.parser").find('script', type='text/javascript')
-    content = content.text[27:-1]
-    result = json.loads(content)[1][1]
-    form_dict = {}
+    # Define the URL for submitting the Google Form.
+    post_form_url = f'{FORMS_URL}/{form_id}/formResponse'
     
-    # Prepare the data to be submitted to the Google Form.
-    for item in result:
-        if item[1] in data_dict:
-            form_dict[f'entry.{item[4][0][0]}'] = data_dict[item[1]]
+    schema = get_form_schema(form_id)
+    for attempt in range(2):
+        
+        # Prepare the data to be submitted to the Google Form.
+        form_dict = {}
+        for name, entry in schema.items():
+            if name in data_dict:
+                form_dict[entry] = data_dict[name]
+        
+        # Submit the data to the Google Form using a POST request.
+        post_result = session.post(post_form_url, data=form_dict, timeout=REQUEST_TIMEOUT)
+        
+        # Google Forms answers 400 when the submitted entries do not match the form, retry once if its schema has changed.
+        if post_result.status_code != 400 or attempt == 1:
+            break
+        refreshed = get_form_schema(form_id, refresh=True)
+        if refreshed == schema:
+            break
+        schema = refreshed
     
-    # Submit the data to the Google Form using a POST request.
-    post_result = requests.post(post_form_url, data=form_dict)
     return post_result.ok
 
 def get_data(data_keys, sheet_id):
     """
     Fetches specified columns from a public Google Sheets document and returns the data as a list of lists.
+    The CSV export is parsed in memory, keeping only the requested columns. Each sheet's last download is cached: an unchanged sheet is not parsed again (or not downloaded at all if the server supports conditional requests), and rows appended since the last download are parsed on their own.
     
     Parameters:
         data_keys (list of str): A list of strings representing the column names to retrieve.
@@ -49,26 +153,67 @@ def get_data(data_keys, sheet_id):
         data_list (list of lists): A dictionary where each key is a column name from data_keys and its value is a list of entries from that column.
     """
     
-    # Initialize an empty dictionary to store data from each specified column.
-    data_dict = {}
-        
     # Define the URLs for viewing the Google Form.
-    view_sheet_url = f'https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv'
+    view_sheet_url = f'{SHEETS_URL}/{sheet_id}/export?format=csv'
+    
+    # Revalidate the cached download, if it holds every requested column.
+    with sheet_cache_lock:
+        cached = sheet_cache.get(sheet_id)
+    headers = {}
+    if cached != None and set(data_keys) <= set(cached["columns"]):
+        if cached["etag"] != None:
+            headers['If-None-Match'] = cached["etag"]
+        if cached["last_modified"] != None:
+            headers['If-Modified-Since'] = cached["last_modified"]
+    else:
+        cached = None
+    
+    # Fetch CSV, unless it has not changed.
+    response = session.get(view_sheet_url, headers=headers, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 304 and cached != None:
+        return {key:list(cached["columns"][key]) for key in data_keys}
+    response.raise_for_status()
+    content = response.content
+    
+    # Parse the rows appended since the last download on their own, an unchanged sheet is not parsed at all.
+    if cached != None and content.startswith(cached["content"]) and (cached["content"].endswith(b"\n") or content[len(cached["content"]):].startswith(b"\n")):
+        columns = {key:list(cached["columns"][key]) for key in data_keys}
+        tail = content[len(cached["content"]):]
+        if tail.strip() != b"":
+            header = content[:content.index(b"\n")+1]
+            appended = pd.read_csv(BytesIO(header+tail.lstrip(b"\r\n")), usecols=data_keys)
+            for key in data_keys:
+                columns[key] += appended[key].dropna().tolist()
+    
+    # Otherwise parse the whole export, keeping only the requested columns.
+    else:
+        df = pd.read_csv(BytesIO(content), usecols=data_keys)
+        columns = {key:df[key].dropna().tolist() for key in data_keys}
+    
+    with sheet_cache_lock:
+        sheet_cache[sheet_id] = {"etag":response.headers.get('ETag'), "last_modified":response.headers.get('Last-Modified'), "content":content, "columns":columns}
+    
+    return {key:list(columns[key]) for key in data_keys}
 
-    # Fetch CSV and load into DataFrame.
-    response = requests.get(view_sheet_url)
-    data = pd.read_csv(StringIO(response.text))
+def get_rows(sheet_id, offset=0):
+    """
+    Fetches the rows of a public Google Sheets document from a row offset on, through the sheet's query endpoint, so rows already retrieved are not downloaded again.
     
-    # Save DataFrame to CSV.
-    csv_path = './Data/output.csv'
-    data.to_csv(csv_path, index=False)
+    Parameters:
+        sheet_id (str): The unique identifier of the Google Sheets document.
+        offset (int, optional): Number of data rows to skip. Defaults to 0, fetching every row.
+    
+    Returns:
+        list of dict: One dictionary per row, mapping each column name to its value as text.
+    """
     
-    # Read CSV back into DataFrame.
-    df = pd.read_csv(csv_path)
+    # Define the URL querying the rows after the offset as CSV.
+    query_sheet_url = f'{SHEETS_URL}/{sheet_id}/gviz/tq'
+    response = session.get(query_sheet_url, params={'tqx':'out:csv', 'headers':1, 'tq':f'select * offset {offset}'}, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    if response.content.strip() == b'':
+        return []
     
-    # Extract data for each specified column.
-    for key in data_keys:
-        key_list = df[key].dropna().tolist()
-        data_dict[key] = key_list
+    df = pd.read_csv(BytesIO(response.content), dtype=str, keep_default_na=False)
     
-    return data_dict
\ No newline at end of file
+    return df.to_dict('records')
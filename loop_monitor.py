@@ -0,0 +1,189 @@
+import numpy as np
+import csv
+import os
+from stimulus_timing import now_ns
+
+class LoopMonitor:
+    """
+    A class to measure how responsive the Tk event loop is, by scheduling a heartbeat and recording how late it fires.
+
+    A late heartbeat means the loop was busy with another callback, so input events such as key presses were also delivered late.
+    Lags are recorded separately for each phase of the session (e.g. "opening", "ANS"), and lags over the slow threshold are flagged.
+
+    Attributes:
+        interval (int): Period of the heartbeat in milliseconds.
+        slow_ms (float): Lag in milliseconds above which the loop is flagged as blocked by a slow callback.
+        phase (str): The phase of the session lags are currently recorded for.
+        samples (dict): The lags in milliseconds recorded for each phase.
+        slow (list): The (phase, session time in seconds, lag in milliseconds) of each flagged heartbeat.
+    """
+
+    def __init__(self, interval=20, slow_ms=50):
+        """
+        Initializes a stopped monitor.
+
+        Parameters:
+            interval (int, optional): Period of the heartbeat in milliseconds. Defaults to 20.
+            slow_ms (float, optional): Lag in milliseconds flagged as slow. Defaults to 50.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.interval = interval
+        self.slow_ms = slow_ms
+        self.phase = "startup"
+        self.samples = {}
+        self.slow = []
+        self._root = None
+        self._expected = None
+
+        return
+
+    def start(self, root):
+        """
+        Starts the heartbeat on the Tk event loop.
+
+        Parameters:
+            root (tk.Tk): The root window.
+
+        Returns:
+            None
+        """
+
+        self._root = root
+        self._schedule()
+
+        return
+
+    def _schedule(self):
+        """
+        Schedules the next heartbeat and records when it is due.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        self._expected = now_ns()+self.interval*1_000_000
+        self._root.after(self.interval, self._beat)
+
+        return
+
+    def _beat(self):
+        """
+        Records the lag of a heartbeat, then schedules the next one.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        lag = max(0, (now_ns()-self._expected)/1e6)
+        self.samples.setdefault(self.phase, []).append(lag)
+        if lag > self.slow_ms:
+            self.slow.append((self.phase, now_ns()/1e9, lag))
+        self._schedule()
+
+        return
+
+    def set_phase(self, phase):
+        """
+        Starts recording lags for a new phase of the session.
+
+        Parameters:
+            phase (str): The name of the phase, e.g. the test being run.
+
+        Returns:
+            None
+        """
+
+        self.phase = phase
+
+        return
+
+    def statistics(self):
+        """
+        Computes the lag percentiles of each phase.
+
+        Parameters:
+            None
+
+        Returns:
+            dict: For each phase, the number of heartbeats, the p50, p95, p99 and max lag in milliseconds, and the number of slow heartbeats.
+        """
+
+        statistics = {}
+        for phase, lags in self.samples.items():
+            p50, p95, p99 = np.percentile(lags, [50, 95, 99])
+            statistics[phase] = {
+                "heartbeats":len(lags),
+                "p50_ms":round(p50, 2),
+                "p95_ms":round(p95, 2),
+                "p99_ms":round(p99, 2),
+                "max_ms":round(max(lags), 2),
+                "slow":sum(1 for slow_phase, time, lag in self.slow if slow_phase == phase),
+            }
+
+        return statistics
+
+    def summary(self):
+        """
+        Summarizes the lag of each phase.
+
+        Parameters:
+            None
+
+        Returns:
+            str: One line per phase with its percentiles and number of slow heartbeats.
+        """
+
+        lines = []
+        for phase, values in self.statistics().items():
+            lines.append(f"{phase}: event loop lag p50 {values['p50_ms']} ms, p95 {values['p95_ms']} ms, p99 {values['p99_ms']} ms, max {values['max_ms']} ms, {values['slow']} slow callbacks")
+
+        return "\n".join(lines)
+
+    def write(self, path):
+        """
+        Writes the per-phase statistics as a CSV file.
+
+        Parameters:
+            path (str): Destination path, its directory is created if needed.
+
+        Returns:
+            None
+        """
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=["phase", "heartbeats", "p50_ms", "p95_ms", "p99_ms", "max_ms", "slow"])
+            writer.writeheader()
+            for phase, values in self.statistics().items():
+                writer.writerow({"phase":phase}|values)
+
+        return
+
+    def reset(self):
+        """
+        Clears the recorded lags, e.g. before the next participant.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        self.samples = {}
+        self.slow = []
+
+        return
+
+# Session-wide event loop monitor.
+loop_monitor = LoopMonitor()
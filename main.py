@@ -1,17 +1,36 @@
-from question_constructor import Question, ANSQuestion, MathQuestion, MemoryQuestion, SpatialReasoningQuestion
-from ANSQuestion_generator import ANSQuestion_bank
-from MathQuestion_generator import MathQuestion_bank
-from MemoryQuestion_generator import MemoryQuestion_bank
-from SRQuestion_generator import SRQuestion_bank
-from data_interaction import get_data, send_data
+from startup_profile import startup_profile
+from question_constructor import Question, ANSQuestion, MathQuestion, MemoryQuestion, SpatialReasoningQuestion, ImagePrefetcher, register_archive, close_archives, drop_widget_pools
+from stimulus_archive import StimulusArchive
+from render_service import RenderClient
+from preloader import Preloader
+from upload_queue import UploadQueue
+from outbox import Outbox
+from sheet_mirror import RESPONSE_SHEETS
+from score_sketch import SketchStore
+from results_backend import GoogleFormsBackend, CollectorBackend
+from test_runner import TestRunner
+from submission_codec import compact_payload, score_questions
+from stimulus_timing import event_clock, timing_log
+from loop_monitor import loop_monitor
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
 from tk_html_widgets import HTMLLabel
 import numpy as np
-import time
 import os
-import threading
+import time
+import argparse
+import socket
+
+# Google Form receiving the results of each test, their responses are collected in sheet_mirror.RESPONSE_SHEETS.
+RESULT_FORMS = {
+    "ANS":"1FAIpQLSdQBeIh23TI9CEyO_nF8QEGxjZlCJNStkaCH1WhxvwlQBHSqQ",
+    "Math":"1FAIpQLSeJ4SykSiZi5Y4_NnOtj2hLKR9jYYWd-mZSDHQWoIr39uH_1A",
+    "Memory":"1FAIpQLSe84e3y21rKnMHL0_j1qVyVIPc8Z4vsnmTLkQrDK77vXx4xRg",
+    "SR":"1FAIpQLScVhZDFl3MBSRnaANngjmYk_5Ej0icxzYqc2ZlyPkcw2MrcFw",
+}
+
+# The question generators (matplotlib) and data_interaction (requests, BeautifulSoup, pandas) are imported on the background threads that use them, see startup_profile.import_module.
+startup_profile.mark("imports")
 
 def test_instruction(frame, instruction):
     """
@@ -39,12 +58,12 @@ def test_instruction(frame, instruction):
     
     return instruction_label, timer_label
 
-def test_set_up():
+def test_set_up(preloader):
     """
-    Sets up the instructions for different test sections and initializes question banks and labels.
+    Sets up the instructions for different test sections. Each test is set up on the Tk event loop once its question bank is ready.
     
     Parameters:
-        None
+        preloader (Preloader): The preloader building the question banks, see start_preloader().
     
     Returns:
         None
@@ -105,60 +124,135 @@ def test_set_up():
     MemoryT_labels = test_instruction(MemoryTest_frame, MemoryT_instruction)
     SRT_labels = test_instruction(SRTest_frame, SRT_instruction)
     
-    # Load question banks for each test.
-    image_list, num_points_list, answer_list= ANSQuestion_bank(60)
-    ANST_dict["question_image_list"]=image_list
-    ANST_dict["num_left_list"]=[nums[0] for nums in num_points_list]
-    ANST_dict["num_right_list"]=[nums[1] for nums in num_points_list]
-    ANST_dict["ratio_list"] = [nums[0] / nums[1] for nums in num_points_list]
-    ANST_dict["question_answer_list"]=answer_list
-    ANSTest(ANSTest_frame, ANST_labels)
-    
-    equation_list, answer_list = MathQuestion_bank(60)
-    MathT_dict["question_equation_list"]=equation_list
-    MathT_dict["question_answer_list"]=answer_list
-    MathTest(MathTest_frame, MathT_labels)
-    
-    question_list = MemoryQuestion_bank()
-    MemoryT_dict["description_image_list"]= [question[0] for question in question_list]
-    MemoryT_dict["question_description_list"]= [subquestion[0] for question in question_list for subquestion in question[1]]
-    MemoryT_dict["question_option_list"]= [subquestion[1] for question in question_list for subquestion in question[1]]
-    MemoryT_dict["question_answer_list"]= [subquestion[2] for question in question_list for subquestion in question[1]]
-    MemoryT_dict["question_image_list"]= [subquestion[3] for question in question_list for subquestion in question[1]]
-    MemoryTest(MemoryTest_frame, MemoryT_labels)
-    
-    image_list, options_list, answer_list, grid_size_list = SRQuestion_bank(60)
-    SRT_dict["question_3d_image_list"]=image_list
-    SRT_dict["question_options_list"]=options_list
-    SRT_dict["question_answer_list"]=answer_list
-    SRT_dict["grid_size_list"]=grid_size_list
-    SRTest(SRTest_frame, SRT_labels)
+    # Set up each test once its bank is ready, copying the per-question details uploaded with the results.
+    def set_up_ANSTest(ANS_bank):
+        ANST_dict["question_image_list"]=ANS_bank.column("image")
+        ANST_dict["num_left_list"]=ANS_bank.column("num_left")
+        ANST_dict["num_right_list"]=ANS_bank.column("num_right")
+        ANST_dict["ratio_list"]=ANS_bank.column("ratio")
+        ANST_dict["question_answer_list"]=ANS_bank.column("answer")
+        ANSTest(ANSTest_frame, ANST_labels, ANS_bank)
+    
+    def set_up_MathTest(Math_bank):
+        MathT_dict["question_equation_list"]=[equation[:steps] for equation, steps in zip(Math_bank.column("equation"), Math_bank.column("steps"))]
+        MathT_dict["question_answer_list"]=Math_bank.column("answer")
+        MathTest(MathTest_frame, MathT_labels, Math_bank)
+    
+    def set_up_MemoryTest(Memory_bank):
+        MemoryT_dict["description_image_list"]=list(dict.fromkeys(Memory_bank.column("group_image")))
+        MemoryT_dict["question_description_list"]=Memory_bank.column("description")
+        MemoryT_dict["question_option_list"]=Memory_bank.column("options")
+        MemoryT_dict["question_answer_list"]=Memory_bank.column("answer")
+        MemoryT_dict["question_image_list"]=[image or None for image in Memory_bank.column("image")]
+        MemoryTest(MemoryTest_frame, MemoryT_labels, Memory_bank)
+    
+    def set_up_SRTest(SR_bank):
+        SRT_dict["question_3d_image_list"]=SR_bank.column("image")
+        SRT_dict["question_options_list"]=SR_bank.column("options")
+        SRT_dict["question_answer_list"]=SR_bank.column("answer")
+        SRT_dict["grid_size_list"]=SR_bank.column("grid_size")
+        SRTest(SRTest_frame, SRT_labels, SR_bank)
+    
+    # Show the loading progress on each instruction screen until its bank is ready, then set the test up.
+    show_loading_progress(ANST_labels[1], preloader, "ANS", set_up_ANSTest)
+    show_loading_progress(MathT_labels[1], preloader, "Math", set_up_MathTest)
+    show_loading_progress(MemoryT_labels[1], preloader, "Memory", set_up_MemoryTest)
+    show_loading_progress(SRT_labels[1], preloader, "SR", set_up_SRTest)
     
     return
 
-def ANSTest(ANSTest_frame, ANST_labels):
+def start_preloader():
+    """
+    Registers the question banks to be built in the background. The banks are built once and reused for every participant.
+    The preloader is started once the first screen has been painted, so its imports do not delay it.
+    
+    Parameters:
+        None
+    
+    Returns:
+        Preloader: The preloader building the banks, not started yet.
+    """
+    
+    # Hand figure rendering to the shared renderer service if requested.
+    renderer = RenderClient.connect_or_start() if args.render_service else None
+    
+    # Build the banks concurrently, each with its own random number generator, in the order the tests are shown.
+    # ANS and SR both draw with pyplot, which is not thread-safe, so they never run at the same time.
+    # Each job imports its generator itself, keeping matplotlib off the path to the first screen.
+    preloader = Preloader(max_workers=2)
+    preloader.add("ANS", lambda progress: startup_profile.import_module("ANSQuestion_generator").ANSQuestion_bank(60, processes=args.render_workers, renderer=renderer, rng=np.random.default_rng(60), progress=progress), 0, ("matplotlib",))
+    preloader.add("Math", lambda progress: startup_profile.import_module("MathQuestion_generator").MathQuestion_bank(60, rng=np.random.default_rng(60), progress=progress), 1)
+    preloader.add("Memory", lambda progress: startup_profile.import_module("MemoryQuestion_generator").MemoryQuestion_bank(), 2)
+    preloader.add("SR", lambda progress: startup_profile.import_module("SRQuestion_generator").SRQuestion_bank(60, renderer=renderer, rng=np.random.default_rng(60), progress=progress), 3, ("matplotlib",))
+    
+    # Load the networking dependencies well before the first upload.
+    preloader.add("data_interaction", lambda progress: startup_profile.import_module("data_interaction"), 4)
+    
+    return preloader
+
+def show_loading_progress(timer_label, preloader, name, on_ready):
+    """
+    Shows how much of a test's question bank has been generated, refreshing until it is ready.
+
+    Parameters:
+        timer_label (HTMLLabel): The label below the test instruction.
+        preloader (Preloader): The preloader building the question banks.
+        name (str): The name of the test's bank in the preloader.
+        on_ready (callable): Called with the bank once it is ready.
+
+    Returns:
+        None
+    """
+    
+    if not timer_label.winfo_exists():
+        return
+    
+    # Stop refreshing once the bank is ready, the test takes the label over for its countdown.
+    if preloader.ready[name].is_set():
+        return on_ready(preloader.wait(name))
+    
+    timer_label.set_html(f"<h3 style='background-color:white;'>Questions not loaded yet... {preloader.progress[name]*100:.0f}%</h3>")
+    root.after(200, show_loading_progress, timer_label, preloader, name, on_ready)
+    
+    return
+
+def ANSTest(ANSTest_frame, ANST_labels, bank):
     """
     Executes the Approximate Number System (ANS) Test within the specified frame.
 
     Parameters:
         ANSTest_frame (tk.Frame): The frame where the ANS Test will be conducted.
         ANST_labels (tuple): Contains instruction and timer labels for the test.
+        bank (QuestionBank): The ANS question bank.
 
     Returns:
         None
     """
     
-    # Initialize form and sheet IDs for data submission.
-    form_id = "1FAIpQLSdQBeIh23TI9CEyO_nF8QEGxjZlCJNStkaCH1WhxvwlQBHSqQ"
-    sheet_id = "19uvDxv2Vhb7-bVsUtOyiaTfbkiMAfMGp1R7FqhDixho"
-    
     # Initialize list to store question objects.
     question_list = []
     
-    # Background threading to manage test sequence and timing.
-    def background():
+    # Fetch question bank and setup questions.
+    answer_list = bank.column("answer")
+    for i in range(len(bank)):
+        question = ANSQuestion(ANSTest_frame,
+                                  "Press the left or right arrow key based on which image has more dots after dots disappear.",
+                                  answer_list[i],
+                                  bank.image_source(i),
+                                  timeout=3)
+        question_list.append(question)
+        
+    # Decode the images of upcoming questions in the background.
+    prefetcher = ImagePrefetcher(question_list, lookahead=args.prefetch_lookahead)
+    prefetchers.append(prefetcher)
+    
+    # Setup progress indicators.
+    progress_indicator = tk.Frame(ANSTest_frame, bg="white")
+    progress_indicator.place(relwidth=0.5)
+    
+    def finish():
         """
-        Manages the sequence of displaying ANS Test questions to the participant.
+        Sends the data and shows the result once the last question has closed.
         
         Parameters:
             None
@@ -167,95 +261,60 @@ def ANSTest(ANSTest_frame, ANST_labels):
             None
         """
         
-        # Wait until the test frame is viewable.
-        while ANSTest_frame.winfo_viewable() == 0:
-            time.sleep(0.1)
-        
-        # Countdown 5 seconds before starting the test.
-        for t in range(5):
-            ANST_labels[1].set_html(f"<h3>Test will start in {5-t} seconds.</h3>")
-            time.sleep(1)
-        ANST_labels[0].place_forget()
-        ANST_labels[1].place_forget()
-        
-        # Initialize the test sequence, and progress indicator.
-        idx = 1
-        question_num = 64
-        bar_description = tk.Label(progress_indicator, text=f"Q {idx}/{question_num} :", bg="white")
-        progress_bar = ttk.Progressbar(progress_indicator, orient="horizontal", length=100, mode="determinate")
-        timer = tk.Label(progress_indicator, text="Question not fully displayed", font=("Helvetica", 12), bg="white")
-        bar_description.grid(row=0, column=0)
-        progress_bar.grid(row=0, column=1)
-        timer.grid(row=1, column=0, columnspan=2)
-        
-        # Update time and question index as test progresses.
-        while idx <= question_num:
-            question = question_list[idx-1]
-            if question.shown == False:
-                question.display_question()
-            elif question.correctness != None or question.time_up==True:
-                time.sleep(1.5)
-                idx += 1
-                bar_description["text"] = text=f"Q {idx}/{question_num} :"
-                progress_bar["value"] = idx*100/question_num
-                timer["text"] = "Question not fully displayed"
-            else:
-                timer["text"] = f"You have {question.timeout-question.get_time():.1f} seconds left"
-                question.check_timeout()
-                
-        # Remove progress indicator.
+        # Remove progress indicator, stop prefetching and add how well image decoding kept ahead of the display to the timing report.
         progress_indicator.destroy()
+        prefetcher.close()
+        timing_log.record_prefetch("ANS", prefetcher.displayed, prefetcher.late)
         
-        # Send data and get result.
-        get_result(ANSTest_frame, question_list, ANST_dict, form_id, sheet_id)
-        
-        # Let result displays for 3 seconds.
-        time.sleep(3)
+        # Send data and get result, the frame is removed 3 seconds after the result is shown.
+        get_result("ANS", ANSTest_frame, question_list, ANST_dict, bank)
         
-        # Remove the frame when the backrgound thread ends.
-        return root.after(0, ANSTest_frame.destroy)
-    
-    # Fetch question bank and setup questions.
-    for i in range(len(ANST_dict["question_image_list"])):
-        question = ANSQuestion(ANSTest_frame,
-                                  "Press the left or right arrow key based on which image has more dots after dots disappear.",
-                                  ANST_dict["question_answer_list"][i],
-                                  ANST_dict["question_image_list"][i],
-                                  timeout=3)
-        question_list.append(question)
-        
-    # Setup progress indicators.
-    progress_indicator = tk.Frame(ANSTest_frame, bg="white")
-    progress_indicator.place(relwidth=0.5)
+        return
     
-    # Start background thread.
-    threading.Thread(target=background, daemon=True).start()
+    # Run the questions on the Tk event loop.
+    TestRunner("ANS", ANSTest_frame, ANST_labels, question_list, progress_indicator, prefetcher, gap=1500).start(finish)
     
     return
 
-def MathTest(MathTest_frame, MathT_labels):
+def MathTest(MathTest_frame, MathT_labels, bank):
     """
     Initiates and manages the Math Test within the specified frame.
 
     Parameters:
         MathTest_frame (tk.Frame): The frame for the Math Test interface.
         MathT_labels (tuple): Tuple containing instruction and timer labels for the test.
+        bank (QuestionBank): The Math question bank.
 
     Returns:
         None
     """
     
-    # Initialize form and sheet IDs for data submission.
-    form_id = "1FAIpQLSeJ4SykSiZi5Y4_NnOtj2hLKR9jYYWd-mZSDHQWoIr39uH_1A"
-    sheet_id = "1QJy2MaWVaj95mrJ-kCtuIzV-2a1hcpL2N0a2yeb33-8"
-
     # Initialize list to store question objects.
     question_list = []
     
-    # Background threading to manage test sequence and timing.
-    def background():
+    # Fetch question bank and setup questions.
+    equation_list = bank.column("equation")
+    steps_list = bank.column("steps")
+    answer_list = bank.column("answer")
+    for i in range(len(bank)):
+        question = MathQuestion(MathTest_frame,
+                                "Remember the calculation steps shown in sequence, write the final result after they vanish.",
+                                equation_list[i][:steps_list[i]],
+                                answer_list[i],
+                                timeout=15)
+        question_list.append(question)
+
+    # Decode the images of upcoming questions in the background.
+    prefetcher = ImagePrefetcher(question_list, lookahead=args.prefetch_lookahead)
+    prefetchers.append(prefetcher)
+    
+    # Setup progress indicators.
+    progress_indicator = tk.Frame(MathTest_frame, bg="white")
+    progress_indicator.place(relwidth=0.5)
+    
+    def finish():
         """
-        Manages the sequence of Math Test questions, displaying each for a set duration.
+        Sends the data and shows the result once the last question has closed.
         
         Parameters:
             None
@@ -264,217 +323,137 @@ def MathTest(MathTest_frame, MathT_labels):
             None
         """
         
-        # Wait until the test frame is viewable.
-        while MathTest_frame.winfo_viewable() == 0:
-            time.sleep(0.1)
-            
-        # Countdown 5 seconds before starting the test.
-        for t in range(5):
-            MathT_labels[1].set_html(f"<h3>Test will start in {5-t} seconds.</h3>")
-            time.sleep(1)
-        MathT_labels[0].place_forget()
-        MathT_labels[1].place_forget()
-        
-        # Initialize the test sequence, and progress indicator.
-        idx = 1
-        question_num = len(question_list)
-        bar_description = tk.Label(progress_indicator, text=f"Q {idx}/{question_num} :", bg="white")
-        progress_bar = ttk.Progressbar(progress_indicator, orient="horizontal", length=100, mode="determinate")
-        timer = tk.Label(progress_indicator, text="Question not fully displayed", font=("Helvetica", 12), bg="white")
-        bar_description.grid(row=0, column=0)
-        progress_bar.grid(row=0, column=1)
-        timer.grid(row=1, column=0, columnspan=2)
-        
-        # Update time and question index as test progresses.
-        while idx <= question_num:
-            question = question_list[idx-1]
-            if question.shown == False:
-                question.display_question()
-            elif question.correctness != None or question.time_up==True:
-                idx += 1
-                bar_description["text"] = text=f"Q {idx}/{question_num} :"
-                progress_bar["value"] = idx*100/question_num
-                timer["text"] = "Question not fully displayed"
-            else:
-                timer["text"] = f"You have {question.timeout-question.get_time():.1f} seconds left"
-                question.check_timeout()
-                
-        # Remove progress indicator.
+        # Remove progress indicator, stop prefetching and add how well image decoding kept ahead of the display to the timing report.
         progress_indicator.destroy()
+        prefetcher.close()
+        timing_log.record_prefetch("Math", prefetcher.displayed, prefetcher.late)
         
-        # Send data and get result.
-        get_result(MathTest_frame, question_list, MathT_dict, form_id, sheet_id)
+        # Send data and get result, the frame is removed 3 seconds after the result is shown.
+        get_result("Math", MathTest_frame, question_list, MathT_dict, bank)
         
-        # Let result displays for 3 seconds.
-        time.sleep(3)
-        
-        # Remove the frame when the backrgound thread ends.
-        return root.after(0, MathTest_frame.destroy)
-    
-    # Fetch question bank and setup questions.
-    for i in range(len(MathT_dict["question_equation_list"])):
-        question = MathQuestion(MathTest_frame,
-                                "Remember the calculation steps shown in sequence, write the final result after they vanish.",
-                                MathT_dict["question_equation_list"][i],
-                                MathT_dict["question_answer_list"][i],
-                                timeout=15)
-        question_list.append(question)
-
-    # Setup progress indicators.
-    progress_indicator = tk.Frame(MathTest_frame, bg="white")
-    progress_indicator.place(relwidth=0.5)
+        return
     
-    # Start background thread.
-    threading.Thread(target=background, daemon=True).start()
+    # Run the questions on the Tk event loop.
+    TestRunner("Math", MathTest_frame, MathT_labels, question_list, progress_indicator, prefetcher).start(finish)
     
     return
 
-def MemoryTest(MemoryTest_frame, MemoryT_labels):
+def MemoryTest(MemoryTest_frame, MemoryT_labels, bank):
     """
     Conducts the Memory Test, displaying images and questions to assess the participant's recall ability.
 
     Parameters:
         MemoryTest_frame (tk.Frame): Frame dedicated to the Memory Test.
         MemoryT_labels (tuple): Instruction and timer labels for guiding the participant.
+        bank (QuestionBank): The Memory question bank.
 
     Returns:
         None
     """
     
-    # Initialize form and sheet IDs for data submission.
-    form_id = "1FAIpQLSe84e3y21rKnMHL0_j1qVyVIPc8Z4vsnmTLkQrDK77vXx4xRg"
-    sheet_id = "1Gb0oRYE3iq47QvIrLnrEC7vypCDfn5QccEqoWORhNWs"
-
     # Initialize list to store question objects.
     question_list = []
     subquestion_list = []
     
-    # Background threading to manage test sequence and timing.
-    def background():
-        """
-        Manages the display and timing of Memory Test questions.
-        
-        Parameters:
-            None
-            
-        Returns:
-            None
-        """
-        
-        # Wait until the test frame is viewable.
-        while MemoryTest_frame.winfo_viewable() == 0:
-            time.sleep(0.1)
-        
-        # Countdown 5 seconds before starting the test.
-        for t in range(5):
-            MemoryT_labels[1].set_html(f"<h3>Test will start in {5-t} seconds.</h3>")
-            time.sleep(1)
-        MemoryT_labels[0].place_forget()
-        MemoryT_labels[1].place_forget()
-        
-        # Initialize the test sequence, and progress indicator.
-        i = 1
-        idx = 1
-        question_num = len(subquestion_list)
-        bar_description = tk.Label(progress_indicator, text=f"Q {idx}/{question_num} :", bg="white")
-        progress_bar = ttk.Progressbar(progress_indicator, orient="horizontal", length=100, mode="determinate")
-        timer = tk.Label(progress_indicator, text="Question not fully displayed", font=("Helvetica", 12), bg="white")
-        bar_description.grid(row=0, column=0)
-        progress_bar.grid(row=0, column=1)
-        timer.grid(row=1, column=0, columnspan=2)
-        
-        # Update time and question index as test progresses.
-        while idx <= question_num:
-            
-            # Display a question (an image for memorization).
-            question = question_list[int(idx/5)]
-            if question.shown == False:
-                question.display_question()
-            else:
-                timer["text"] = f"You have {question.timeout-question.get_time():.1f} seconds left"
-                question.check_timeout()
-            if question.time_up == True:
-                
-                # Follow by five related subquestions.
-                while i <= 5:
-                    subquestion = subquestion_list[idx-1]
-                    if subquestion.shown == False:
-                        subquestion.display_question()
-                    elif subquestion.correctness != None or subquestion.time_up==True:
-                        i += 1
-                        idx += 1
-                        bar_description["text"] = text=f"Q {idx}/{question_num} :"
-                        progress_bar["value"] = idx*100/question_num
-                        timer["text"] = "Question not fully displayed"
-                    else:
-                        timer["text"] = f"You have {subquestion.timeout-subquestion.get_time():.1f} seconds left"
-                        subquestion.check_timeout()
-                
-                # Reset i for next 5 subquestions.
-                i = 1
-        
-        # Remove progress indicator.
-        progress_indicator.destroy()
-        
-        # Send data and get result.
-        get_result(MemoryTest_frame, subquestion_list, MemoryT_dict, form_id, sheet_id)
-        
-        # Let result displays for 3 seconds.
-        time.sleep(3)
-        
-        # Remove the frame when the backrgound thread ends.
-        return root.after(0, MemoryTest_frame.destroy)
-
     # Fetch question bank and setup questions.
-    for i in range(len(MemoryT_dict["description_image_list"])):
+    for group_image in dict.fromkeys(bank.column("group_image")):
         question =Question(MemoryTest_frame,
                              "You will have 20s to remember this picture.",
-                             MemoryT_dict["description_image_list"][i],
+                             group_image,
                              timeout=20)
         question_list.append(question)
     
     # Fetch subquestion bank and setup subquestions.
-    for i in range(len(MemoryT_dict["question_image_list"])):
+    description_list = bank.column("description")
+    option_list = bank.column("options")
+    answer_list = bank.column("answer")
+    image_list = bank.column("image")
+    for i in range(len(bank)):
         subquestion = MemoryQuestion(MemoryTest_frame,
-                                        MemoryT_dict["question_description_list"][i],
-                                        MemoryT_dict["question_option_list"][i],
-                                        MemoryT_dict["question_answer_list"][i],
-                                        MemoryT_dict["question_image_list"][i],
+                                        description_list[i],
+                                        option_list[i],
+                                        answer_list[i],
+                                        image_list[i] or None,
                                         timeout=10)
         subquestion_list.append(subquestion)
 
+    # Decode the images of upcoming questions in the background, in the order they are displayed.
+    display_order = []
+    for group in range(len(question_list)):
+        display_order.append(question_list[group])
+        display_order.extend(subquestion_list[group*5:group*5+5])
+    prefetcher = ImagePrefetcher(display_order, lookahead=args.prefetch_lookahead)
+    prefetchers.append(prefetcher)
+    
     # Setup progress indicators.
     progress_indicator = tk.Frame(MemoryTest_frame, bg="white")
     progress_indicator.place(relwidth=0.5)
     
-    # Start background thread.
-    threading.Thread(target=background, daemon=True).start()
+    def finish():
+        """
+        Sends the data and shows the result once the last question has closed.
+        
+        Parameters:
+            None
+            
+        Returns:
+            None
+        """
+        
+        # Remove progress indicator, stop prefetching and add how well image decoding kept ahead of the display to the timing report.
+        progress_indicator.destroy()
+        prefetcher.close()
+        timing_log.record_prefetch("Memory", prefetcher.displayed, prefetcher.late)
+        
+        # Send data and get result, the frame is removed 3 seconds after the result is shown.
+        get_result("Memory", MemoryTest_frame, subquestion_list, MemoryT_dict, bank)
+        
+        return
+    
+    # Run the questions on the Tk event loop.
+    TestRunner("Memory", MemoryTest_frame, MemoryT_labels, display_order, progress_indicator, prefetcher, scored=subquestion_list).start(finish)
     
     return
 
-def SRTest(SRTest_frame, SRT_labels):
+def SRTest(SRTest_frame, SRT_labels, bank):
     """
     Manages the Spatial Reasoning Test, challenging participants with questions about 3D object rotations.
 
     Parameters:
         SRTest_frame (tk.Frame): The frame to display the Spatial Reasoning Test.
         SRT_labels (tuple): Instruction and timer labels for the test.
+        bank (QuestionBank): The Spatial Reasoning question bank.
 
     Returns:
         None
     """
     
-    # Initialize form and sheet IDs for data submission.
-    form_id = "1FAIpQLScVhZDFl3MBSRnaANngjmYk_5Ej0icxzYqc2ZlyPkcw2MrcFw"
-    sheet_id = "1DBMUZZLjtrP1ZDCP7AH0vBK-nyn_AuGgGjFKrsik8M4"
-
     # Initialize list to store question objects.
     question_list = []
     
-    # Background threading to manage test sequence and timing.
-    def background():
+    # Fetch question bank and setup questions.
+    options_list = bank.column("options")
+    answer_list = bank.column("answer")
+    for i in range(len(bank)):
+        question = SpatialReasoningQuestion(SRTest_frame,
+                                               "Which of the views (a-d) can not be made by rotating the cube arrangement shown?",
+                                               options_list[i],
+                                               answer_list[i],
+                                               bank.image_source(i),
+                                               timeout=25)
+        question_list.append(question)
+    
+    # Decode the images of upcoming questions in the background.
+    prefetcher = ImagePrefetcher(question_list, lookahead=args.prefetch_lookahead)
+    prefetchers.append(prefetcher)
+    
+    # Setup progress indicators.
+    progress_indicator = tk.Frame(SRTest_frame, bg="white")
+    progress_indicator.place(relwidth=0.5)
+    
+    def finish():
         """
-        Manages the display and timing of Reasoning Test questions.
+        Sends the data and shows the result once the last question has closed.
         
         Parameters:
             None
@@ -483,69 +462,18 @@ def SRTest(SRTest_frame, SRT_labels):
             None
         """
         
-        # Wait until the test frame is viewable.
-        while SRTest_frame.winfo_viewable() == 0:
-            time.sleep(0.1)
-            
-        # Countdown 5 seconds before starting the test.
-        for t in range(5):
-            SRT_labels[1].set_html(f"<h3>Test will start in {5-t} seconds.</h3>")
-            time.sleep(1)
-        SRT_labels[0].place_forget()
-        SRT_labels[1].place_forget()
-        
-        # Initialize the test sequence, and progress indicator.
-        idx = 1
-        question_num = len(question_list)
-        bar_description = tk.Label(progress_indicator, text=f"Q {idx}/{question_num} :", bg="white")
-        progress_bar = ttk.Progressbar(progress_indicator, orient="horizontal", length=100, mode="determinate")
-        timer = tk.Label(progress_indicator, text="Question not fully displayed", font=("Helvetica", 12), bg="white")
-        bar_description.grid(row=0, column=0)
-        progress_bar.grid(row=0, column=1)
-        timer.grid(row=1, column=0, columnspan=2)
-        
-        # Update time and question index as test progresses.
-        while idx <= question_num:
-            question = question_list[idx-1]
-            if question.shown == False:
-                question.display_question()
-            elif question.correctness != None or question.time_up==True:
-                idx += 1
-                bar_description["text"] = text=f"Q {idx}/{question_num} :"
-                progress_bar["value"] = idx*100/question_num
-                timer["text"] = "Question not fully displayed"
-            else:
-                timer["text"] = f"You have {question.timeout-question.get_time():.1f} seconds left"
-                question.check_timeout()
-        
-        # Remove progress indicator.
+        # Remove progress indicator, stop prefetching and add how well image decoding kept ahead of the display to the timing report.
         progress_indicator.destroy()
+        prefetcher.close()
+        timing_log.record_prefetch("SR", prefetcher.displayed, prefetcher.late)
         
-        # Send data and get result.
-        get_result(SRTest_frame, question_list, SRT_dict, form_id, sheet_id)
-        
-        # Let result displays for 3 seconds.
-        time.sleep(3)
+        # Send data and get result, the frame is removed 3 seconds after the result is shown.
+        get_result("SR", SRTest_frame, question_list, SRT_dict, bank)
         
-        # Remove the frame when the backrgound thread ends.
-        return root.after(0, SRTest_frame.destroy)
-
-    # Fetch question bank and setup questions.
-    for i in range(len(SRT_dict["question_3d_image_list"])):
-        question = SpatialReasoningQuestion(SRTest_frame,
-                                               "Which of the views (a-d) can not be made by rotating the cube arrangement shown?",
-                                               SRT_dict["question_options_list"][i],
-                                               SRT_dict["question_answer_list"][i],
-                                               SRT_dict["question_3d_image_list"][i],
-                                               timeout=25)
-        question_list.append(question)
-    
-    # Setup progress indicators.
-    progress_indicator = tk.Frame(SRTest_frame, bg="white")
-    progress_indicator.place(relwidth=0.5)
+        return
     
-    # Start background thread.
-    threading.Thread(target=background, daemon=True).start()
+    # Run the questions on the Tk event loop.
+    TestRunner("SR", SRTest_frame, SRT_labels, question_list, progress_indicator, prefetcher).start(finish)
     
     return
 
@@ -721,87 +649,183 @@ def get_info(info_frame):
     
     return
 
-def percentile_rank_calculator(total_score, sheet_id):
+def result_text(result):
     """
-    Calculates the percentile rank of a participant's score compared to scores retrieved from a data sheet.
+    Formats the result of a test, with its percentile rank once known.
 
     Parameters:
-        total_score (int): The participant's total score to be ranked.
-        sheet_id (str): The ID for the google spreadsheet containing score data.
+        result (dict): The test's "score", "total", "percentile", its "error" bound and "status": "uploading", "ranked", "stale" (ranked from earlier data), "unranked" (no data to rank against) or "queued" (left to the outbox).
 
     Returns:
-        percentage (float): The percentile rank of the participant's score.
+        str: The result as HTML paragraphs.
     """
     
-    # Retrieve the list of scores from the spreadsheet identified by sheet_id.
-    score_list = np.array(get_data(["total_score"], sheet_id)["total_score"]).astype(int)
+    if result["status"] == "uploading":
+        percentile_text = "Calculating how you compare to other people..."
+    elif result["status"] == "queued":
+        percentile_text = "Your results are saved and will be uploaded once the network is back, your percentile rank is not available yet."
+    elif result["status"] == "unranked":
+        percentile_text = "Your percentile rank is not available yet."
+    elif result["status"] == "stale":
+        percentile_text = f"You have beaten <strong>{result['percentile']:.0f}%</strong> of people in dataset (as of the last update)."
+    else:
+        percentile_text = f"You have beaten <strong>{result['percentile']:.0f}%</strong> of people in dataset."
     
-    if len(score_list) != 0:
-            
-        # Count the number of scores less than the participant's score.
-        index = sum(1 for score in score_list if score < total_score)
+    # Ranks from coarse sketch bins are only known within an error bound.
+    if result["error"] != 0:
+        percentile_text = percentile_text.replace("%</strong>", f"% (±{result['error']:.0f}%)</strong>", 1)
+    
+    return f"<p>You have got <strong>{result['score']}/{result['total']}</strong>.</p><p>{percentile_text}</p>"
 
-        # Calculate the percentile rank.
-        percentage = (index / len(score_list)) * 100
+def show_results_summary(results):
+    """
+    Shows the results of every test finished so far on the ending frame, including percentile ranks that arrived after their test frame was removed.
+
+    Parameters:
+        results (dict): The result of each test, by test name, see result_text().
+
+    Returns:
+        None
+    """
     
-    # Recurse until google sheet update data.
-    else:
-        return percentile_rank_calculator(total_score, sheet_id)
+    # Results of a previous participant's session arriving late are not shown.
+    if results is not session_results or not results_label.winfo_exists():
+        return
+    
+    summary = "".join(f"<h4>{name} Test</h4>{result_text(result)}" for name, result in results.items())
+    results_label.set_html(f"""<div style="text-align: center; background-color: white; font-size: 12px;">{summary}</div>""")
     
-    return percentage
+    return
 
-def get_result(frame, question_list, Test_dict, form_id, sheet_id):
+def refresh_baseline(name):
     """
-    Displays the test results, sending data for storage and calculating percentile rank.
+    Takes in the distribution of every score the results backend holds for a test as the baseline of its score sketches, see score_sketch.SketchStore.
 
     Parameters:
+        name (str): The name of the test, e.g. "ANS".
+
+    Returns:
+        None
+    """
+    
+    try:
+        sketch = backend.distribution(name)
+    except Exception as error:
+        print(f"Fetching the {name} score distribution failed: {error!r}")
+        return
+    
+    if sketch != None:
+        sketch_store.set_baseline(sketch)
+    
+    return
+
+def get_result(name, frame, question_list, Test_dict, bank):
+    """
+    Displays the test score straight away, then removes the frame 3 seconds later so the next test can start.
+    Sending the data and calculating the percentile rank are queued on the upload workers, the percentile rank is filled in when it arrives.
+
+    Parameters:
+        name (str): The name of the test, e.g. "ANS".
         frame (tk.Frame): The frame to display the test results.
         question_list (list): List of Question objects used in the test.
         Test_dict (dict): Dictionary holding test-related data.
-        form_id (str): ID for the form where results are sent.
-        sheet_id (str): ID for the sheet used for percentile rank calculation.
+        bank (QuestionBank): The question bank the test was run with.
 
     Returns:
         None
     """
     
-    # Display uploading message before data fully uploadeed.
-    uploading_label = f"""
-    <h3 style="text-align: center; background-color: white">Data is uploading...</h3>
-    """
-    uploading_label = HTMLLabel(frame, html=uploading_label, height=12)
-    uploading_label.pack()
-    uploading_label.configure(bg="white")
-    
     # Calculate scores and compile result summary.
-    for question in question_list:
-        if question.correctness:
-            Test_dict["total_score"] += 1
-            Test_dict["score_list"].append(1)
-        else:
-            Test_dict["score_list"].append(0)
-        Test_dict["total_time"] += question.get_time()
-        Test_dict["time_list"].append(question.get_time())
-    
-    # Send test data and display results in the provided frame.
-    if send_data(main_dict|Test_dict, form_id):
-        
-        total_score = Test_dict["total_score"]
-        total_questions = len(Test_dict["question_answer_list"])
-        percentile_rank = percentile_rank_calculator(total_score, sheet_id)
-        result = f"""
-        <div style="text-align: center; background-color: white; font-size: 12px;">
-        <p>You have got <strong>{total_score}/{total_questions}</strong>.</p>
-        <p>You have beaten <strong>{percentile_rank}%</strong> of people in dataset.</p>
-        </div>
+    score_questions(question_list, Test_dict)
+    
+    total_score = Test_dict["total_score"]
+    payload = main_dict|compact_payload(Test_dict, bank)
+    results = session_results
+    results[name] = {"score":total_score, "total":len(Test_dict["question_answer_list"]), "percentile":None, "error":0, "status":"uploading"}
+    
+    # Rank the score straight away against the backend's distribution merged with the scores recorded since by every site, once it has been downloaded.
+    sketch = sketch_store.combined(name)
+    if sketch != None:
+        percentile_rank, error = sketch.percentile_rank(total_score)
+        results[name] |= {"percentile":percentile_rank, "error":error, "status":"ranked"}
+    sketch_store.add(name, total_score)
+    
+    # Store the submission durably before anything is sent, the outbox retries it until the backend accepts it.
+    submission_id = outbox.add(payload, name)
+    
+    # Display the score, without a baseline to rank it the percentile rank follows once the upload has finished.
+    result_label = HTMLLabel(frame, html=f"""<div style="text-align: center; background-color: white; font-size: 12px;">{result_text(results[name])}</div>""", height=12)
+    result_label.pack()
+    result_label.configure(bg="white")
+    show_results_summary(results)
+    
+    def show_percentile(status, percentile_rank):
+        """
+        Fills in the percentile rank, on the Tk event loop.
+
+        Parameters:
+            status (str): The result status, see result_text().
+            percentile_rank (float or None): The percentile rank of the participant's score, None if not available.
+
+        Returns:
+            None
+        """
+        
+        results[name]["status"] = status
+        results[name]["percentile"] = percentile_rank
+        if result_label.winfo_exists():
+            result_label.set_html(f"""<div style="text-align: center; background-color: white; font-size: 12px;">{result_text(results[name])}</div>""")
+        show_results_summary(results)
+        
+        return
+    
+    def upload():
         """
+        Sends the test data and calculates the percentile rank, on an upload worker.
+
+        Parameters:
+            None
 
-        result_label = HTMLLabel(frame, html=result, height=12)
+        Returns:
+            tuple: The result status, see result_text(), and the percentile rank.
+        """
+        
+        # If the first attempt fails, the outbox's background sender keeps retrying.
+        if outbox.try_send(submission_id) == False:
+            return "queued", None
+        
+        percentile_rank, stale = backend.percentile_rank(name, total_score)
         
-        # Replace uploading message with results.
-        uploading_label.pack_forget()
-        result_label.pack()
-        result_label.configure(bg="white")
+        # The distribution now holds this score, so the local sketch can restart from it.
+        refresh_baseline(name)
+        if percentile_rank == None:
+            return "unranked", None
+        
+        return ("stale" if stale else "ranked"), percentile_rank
+    
+    def send():
+        """
+        Sends the test data of a score already ranked, and takes in the backend's distribution holding it, on an upload worker.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+        
+        if outbox.try_send(submission_id):
+            refresh_baseline(name)
+        
+        return
+    
+    if results[name]["status"] == "ranked":
+        upload_queue.submit(f"{name} result", send)
+    else:
+        upload_queue.submit(f"{name} result", upload, lambda outcome: root.after(0, show_percentile, *(outcome or ("unranked", None))))
+    
+    # Let result displays for 3 seconds, then remove the frame.
+    root.after(3000, frame.destroy)
     
     return
 
@@ -856,14 +880,94 @@ def ending(root):
     closing_label.pack()
     closing_label.configure(bg="white")
     
+    # Results of every test, completed as their percentile ranks arrive.
+    global results_label
+    results_label = HTMLLabel(ending_frame, html="", height=16)
+    results_label.pack()
+    results_label.configure(bg="white")
+    
+    # In kiosk mode, let the next participant start straight away.
+    if args.kiosk:
+        next_btn = tk.Button(ending_frame, text="Next participant", width=15, command=start_session, font=("Helvetica", 15), bg="#28a745", fg="white")
+        next_btn.pack()
+    
     return
 
 # The entry point of application.
 if __name__ == "__main__":
+    
+    # Parse command line options.
+    parser = argparse.ArgumentParser(description="Cognitive Test Group 10")
+    parser.add_argument("--render-workers", type=int, default=None, help="Render ANS images in this many worker processes, handed over through shared memory.")
+    parser.add_argument("--render-service", action="store_true", help="Draw ANS and SR figures in the shared, long-lived renderer service process.")
+    parser.add_argument("--prefetch-lookahead", type=int, default=3, help="Number of upcoming questions whose images are decoded ahead of display.")
+    parser.add_argument("--timing-report", default="./Data", help="Directory receiving the per-trial stimulus timing report of each session.")
+    parser.add_argument("--kiosk", action="store_true", help="Run back-to-back participants, offering a new session at the end instead of exiting.")
+    parser.add_argument("--profile-startup", action="store_true", help="Report import and first paint timings, and the deferred imports as they complete.")
+    parser.add_argument("--outbox", default="./Data/outbox.sqlite3", help="SQLite database keeping submissions until they have been accepted.")
+    parser.add_argument("--mirror", default="./Data/mirror.sqlite3", help="SQLite mirror of the response sheets, see sheet_mirror.py.")
+    parser.add_argument("--sketch-dir", default="./Data/sketches", help="Directory of the score sketches of this and other sites, used to rank results.")
+    parser.add_argument("--site", default=socket.gethostname(), help="Name of this site in the score sketches it publishes.")
+    parser.add_argument("--backend", choices=["google", "collector"], default="google", help="Where results are stored and ranked: the Google Forms and Sheets, or a collector service (see collector_service.py).")
+    parser.add_argument("--collector-url", default="http://127.0.0.1:8770", help="Base URL of the collector service, with --backend collector.")
+    parser.add_argument("--slow-callback-ms", type=float, default=50, help="Event loop lag in milliseconds flagged as a slow callback in the loop lag report.")
+    args = parser.parse_args()
+    
+    # Shared memory frames are freed once shown, so they cannot be reused for the next participant.
+    if args.kiosk and args.render_workers != None:
+        parser.error("--kiosk reuses the question banks, which is not supported with --render-workers.")
 
-    def switch_frame():
+    def switch_frame(idx=0):
         """
-        Switches between different test frames based on their visibility and participant consent. Exits application if consent is False.
+        Displays a frame, and moves on to the next one as soon as it is destroyed. Exits application (or starts over in kiosk mode) if consent is False.
+        
+        Parameters:
+            idx (int, optional): Index of the frame to display. Defaults to 0.
+            
+        Returns:
+            None
+        """
+        
+        # Exit the application if consent is False.
+        if main_dict["consent"] == False:
+            return start_session() if args.kiosk else root.destroy()
+        
+        if idx == len(frames):
+            return
+        
+        def on_destroy(event):
+            """
+            Displays the next frame once the current one has been destroyed, and drops the widget pools of the questions it displayed.
+
+            Parameters:
+                event (tk.Event): The destroy event, also received for the frame's children.
+
+            Returns:
+                None
+            """
+            
+            if event.widget != frame:
+                return
+            drop_widget_pools(frame)
+            
+            # Frames of a previous participant are destroyed when a new session starts, they must not move the new one on.
+            if frame in frames:
+                root.after_idle(switch_frame, idx+1)
+            
+            return
+        
+        # Display the frame, the next one follows from its <Destroy> event.
+        frame = frames[idx]
+        loop_monitor.set_phase(frame_phases[idx])
+        frame.bind("<Destroy>", on_destroy, add="+")
+        frame.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+        
+        return
+    
+    def start_session():
+        """
+        Starts a session for a new participant: resets the participant and result state, and builds fresh frames and widgets.
+        The question banks and the decoded images are kept, so in kiosk mode the next participant can start within a second.
         
         Parameters:
             None
@@ -872,74 +976,144 @@ if __name__ == "__main__":
             None
         """
         
-        # Display new frame until the previous one has been destroyed.
-        for frame in frames:
-            frame.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
-            while frame.winfo_exists() == 1:
-                
-                # Exit the application if consent is False.
-                if main_dict["consent"] == False:
-                    root.after(0, root.destroy)
+        global frames, prefetchers, main_dict, session_results, ANST_dict, MathT_dict, MemoryT_dict, SRT_dict
+        global ANSTest_frame, MathTest_frame, MemoryTest_frame, SRTest_frame
+        started = time.perf_counter()
+        
+        # Remove the frames of the previous participant, if any.
+        previous_frames = frames
+        frames = []
+        for frame in previous_frames:
+            frame.destroy()
+        
+        # Stop the prefetch workers of tests the previous participant did not finish, e.g. after a refused consent.
+        for prefetcher in prefetchers:
+            prefetcher.close()
+        prefetchers = []
+        
+        # Write the timing report of the previous participant.
+        write_timing_report()
+        
+        # Dictionary to hold the main participant data.
+        main_dict = {
+            "consent":None,
+            "user_id":None,
+            "age":None,
+            "gender":None,
+            "sports":None,
+            "tiredness":None,
+        }
+        
+        # The result of each test, by test name, see result_text().
+        session_results = {}
+
+        # Dictionaries to hold test-specific data.
+        ANST_dict = {
+            "total_score":0,
+            "total_time":0,
+            "question_image_list":[],
+            "num_left_list":[],
+            "num_right_list":[],
+            "ratio_list":[],
+            "question_answer_list":[],
+            "score_list":[],
+            "time_list":[]
+        }
+
+        MathT_dict = {
+            "total_score":0,
+            "total_time":0,
+            "question_equation_list":[],
+            "question_answer_list":[],
+            "score_list":[],
+            "time_list":[]
+        }
+
+        MemoryT_dict = {
+            "total_score":0,
+            "total_time":0,
+            "description_image_list":[],
+            "question_image_list":[],
+            "question_answer_list":[],
+            "score_list":[],
+            "time_list":[]
+        }
+
+        SRT_dict = {
+            "total_score":0,
+            "total_time":0,
+            "question_3d_image_list":[],
+            "question_options_list":[],
+            "question_answer_list":[],
+            "grid_size_list":[],
+            "score_list":[],
+            "time_list":[]
+        }
+        
+        # Create opening frames for consent and participant info.
+        opening(root)
+        
+        # Create the test frames and append them to the frames list for later display.
+        ANSTest_frame = tk.Frame(root, bg="white", width=600, height=900)
+        frames.append(ANSTest_frame)
+        MathTest_frame = tk.Frame(root, bg="white", width=600, height=900)
+        frames.append(MathTest_frame)
+        MemoryTest_frame = tk.Frame(root, bg="white", width=600, height=900)
+        frames.append(MemoryTest_frame)
+        SRTest_frame = tk.Frame(root, bg="white", width=600, height=900)
+        frames.append(SRTest_frame)
+        
+        # Create ending frame for final messages display.
+        ending(root)
+        
+        # Set up the tests, each one starts on the Tk event loop once its question bank is ready.
+        test_set_up(preloader)
+        
+        # Display the first frame, each following one is displayed when the previous one is destroyed.
+        switch_frame()
+        
+        if args.kiosk:
+            root.update_idletasks()
+            print(f"Session ready in {(time.perf_counter()-started)*1000:.0f} ms")
         
         return
     
-    # Dictionary to hold the main participant data.
-    main_dict = {
-        "consent":None,
-        "user_id":None,
-        "age":None,
-        "gender":None,
-        "sports":None,
-        "tiredness":None,
-    }
-
-    # Dictionaries to hold test-specific data.
-    ANST_dict = {
-        "total_score":0,
-        "total_time":0,
-        "question_image_list":[],
-        "num_left_list":[],
-        "num_right_list":[],
-        "ratio_list":[],
-        "question_answer_list":[],
-        "score_list":[],
-        "time_list":[]
-    }
-
-    MathT_dict = {
-        "total_score":0,
-        "total_time":0,
-        "question_equation_list":[],
-        "question_answer_list":[],
-        "score_list":[],
-        "time_list":[]
-    }
-
-    MemoryT_dict = {
-        "total_score":0,
-        "total_time":0,
-        "description_image_list":[],
-        "question_image_list":[],
-        "question_answer_list":[],
-        "score_list":[],
-        "time_list":[]
-    }
-
-    SRT_dict = {
-        "total_score":0,
-        "total_time":0,
-        "question_3d_image_list":[],
-        "question_options_list":[],
-        "question_answer_list":[],
-        "grid_size_list":[],
-        "score_list":[],
-        "time_list":[]
-    }
-    
-    # List to hold the test frames for display management.
-    frames=[]
+    def write_timing_report():
+        """
+        Writes the reports of the session, intended vs. actual duration of every timed phase and the event loop lag of every part of the session, and clears them for the next participant.
+        
+        Parameters:
+            None
+            
+        Returns:
+            None
+        """
+        
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        if len(timing_log.records) != 0:
+            timing_log.write(os.path.join(args.timing_report, f"timing_{stamp}.csv"))
+        if len(timing_log.records) != 0 or len(timing_log.prefetch) != 0:
+            print(timing_log.summary())
+        timing_log.reset()
+        
+        if len(loop_monitor.samples) != 0:
+            loop_monitor.write(os.path.join(args.timing_report, f"loop_lag_{stamp}.csv"))
+            print(loop_monitor.summary())
+            loop_monitor.reset()
+        
+        return
+    
+    # List to hold the frames of the current session for display management.
+    frames = []
+    
+    # Image prefetchers of the current session's tests, closed when the next session starts if a test never finished.
+    prefetchers = []
+    
+    # Part of the session each frame belongs to in the loop lag report, the test runners refine it once questions are shown.
+    frame_phases = ["consent", "info", "ANS instructions", "Math instructions", "Memory instructions", "SR instructions", "ending"]
     
     # Set up the main application window.
+    startup_profile.mark("arguments parsed")
     root = tk.Tk()
     root.configure(bg='white')
     root.attributes('-topmost', True)
@@ -953,27 +1127,83 @@ if __name__ == "__main__":
     y = (screen_height / 2) - (window_size[1] / 2)
     root.geometry('%dx%d+%d+%d' % (window_size[0], window_size[1], x, y))
     
-    # Create opening frames for consent and participant info.
-    opening(root)
+    # Serve stimuli from the packed archive when it has been built.
+    if os.path.exists("./stimuli.ctstim"):
+        register_archive(StimulusArchive("./stimuli.ctstim"))
     
-    # Create the test frames and append them to the frames list for later display.
-    ANSTest_frame = tk.Frame(root, bg="white", width=600, height=900)
-    frames.append(ANSTest_frame)
-    MathTest_frame = tk.Frame(root, bg="white", width=600, height=900)
-    frames.append(MathTest_frame)
-    MemoryTest_frame = tk.Frame(root, bg="white", width=600, height=900)
-    frames.append(MemoryTest_frame)
-    SRTest_frame = tk.Frame(root, bg="white", width=600, height=900)
-    frames.append(SRTest_frame)
-
-    # Create ending frame for final messages display.
-    ending(root)
-
-    # Start the test setup in a background thread.
-    threading.Thread(target=test_set_up, daemon=True).start()
+    # Upload results in the background, so the next test can start while they are in flight.
+    upload_queue = UploadQueue()
+    
+    # Score distributions of every site, for ranking without downloading the response sheets.
+    sketch_store = SketchStore(args.sketch_dir, args.site)
+    
+    # Store results in the Google Forms and rank against their sheets, or in a collector service, see results_backend.py.
+    if args.backend == "collector":
+        backend = CollectorBackend(args.collector_url)
+    else:
+        backend = GoogleFormsBackend(RESULT_FORMS, RESPONSE_SHEETS, args.mirror)
+    
+    # Keep every submission on disk until it has been accepted.
+    # The questions are identified by the bank fingerprint, see submission_codec.expand_submission, alongside the per-question lists the forms still expect.
+    outbox = Outbox(args.outbox, backend.send_batch)
+    
+    # Register the question banks, shared by every participant.
+    preloader = start_preloader()
 
-    # Start frame switching in a background thread.
-    threading.Thread(target=switch_frame, daemon=True).start()
+    # Time responses from the timestamps of input events.
+    event_clock.install(root)
+    
+    # Measure how promptly the event loop runs its callbacks.
+    loop_monitor.slow_ms = args.slow_callback_ms
+    loop_monitor.start(root)
+    
+    # Start the first participant's session.
+    start_session()
+    startup_profile.mark("session built")
+    
+    def on_first_paint():
+        """
+        Starts building the question banks once the consent screen has been drawn, and reports the startup timings if requested.
+        
+        Parameters:
+            None
+            
+        Returns:
+            None
+        """
+        
+        root.update_idletasks()
+        startup_profile.mark("first paint")
+        preloader.start()
+        outbox.start()
+        backend.prefetch()
+        for name in RESULT_FORMS:
+            upload_queue.submit(f"{name} baseline", lambda name=name: refresh_baseline(name))
+        
+        if args.profile_startup:
+            print(startup_profile.report())
+        
+        return
+    
+    startup_profile.verbose = args.profile_startup
+    root.after_idle(on_first_paint)
 
     # Start the application event loop
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    
+    # Let the uploads still in flight finish.
+    if upload_queue.pending != 0:
+        print(f"Waiting for {upload_queue.pending} uploads to finish...")
+    upload_queue.close()
+    upload_queue.join(timeout=60)
+    
+    # Give the submissions still in the outbox one last attempt, any left are sent after the next start.
+    if outbox.pending() != 0:
+        print(f"{outbox.flush(timeout=30)} submissions left in {args.outbox}, they will be sent after the next start.")
+    outbox.close()
+    
+    # Release the stimulus archive once the window has been destroyed.
+    close_archives()
+    
+    # Write the timing report of the last participant.
+    write_timing_report()
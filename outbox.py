@@ -0,0 +1,262 @@
+import sqlite3
+import threading
+import random
+import json
+import time
+import uuid
+import os
+
+class Outbox:
+    """
+    A class to make result submissions durable: each one is written to a local SQLite database before it is sent, and kept there until the form has accepted it.
+
+    A background sender retries failed submissions with exponential backoff, so results recorded while the network is down are uploaded once it is back, including after a restart.
+    Each submission carries an idempotency key in its "submission_id" field, so a submission sent twice (e.g. the application stopped between the backend accepting it and the outbox recording it) can be deduplicated downstream.
+    The collector service deduplicates on it. Google Forms only store it if the form has a submission_id field, which the current forms do not, so their submissions are delivered at least once and a retried one may appear twice in the response sheet.
+    Submissions due at the same time are handed over together, so backends ingesting batches receive them in a single request.
+
+    Attributes:
+        path (str): Path of the SQLite database.
+        send_batch (callable): Sends submissions, called with a list of (destination, payload), returns whether each one has been accepted, see results_backend.ResultsBackend.send_batch().
+        base_delay (float): Delay in seconds before the first retry, doubled with every further failure.
+        max_delay (float): Longest delay in seconds between two attempts.
+    """
+
+    def __init__(self, path, send_batch, base_delay=2, max_delay=300):
+        """
+        Opens the outbox, creating its database if needed.
+
+        Parameters:
+            path (str): Path of the SQLite database, its directory is created if needed.
+            send_batch (callable): Sends submissions, called with a list of (destination, payload), returns whether each one has been accepted.
+            base_delay (float, optional): Delay in seconds before the first retry. Defaults to 2.
+            max_delay (float, optional): Longest delay in seconds between two attempts. Defaults to 300.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.path = path
+        self.send_batch = send_batch
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._in_flight = set()
+        self._closed = False
+        self._condition = threading.Condition()
+
+        # A single connection shared by the Tk thread, the upload workers and the sender, serialized by the condition's lock.
+        # The destination of each submission is stored in the form_id column, named after the Google Form IDs first stored there.
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=FULL")
+        self._connection.execute("""CREATE TABLE IF NOT EXISTS submissions (
+            submission_id TEXT PRIMARY KEY,
+            form_id TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt REAL NOT NULL,
+            last_error TEXT,
+            sent REAL
+        )""")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS pending ON submissions (next_attempt) WHERE sent IS NULL")
+
+        return
+
+    def start(self):
+        """
+        Starts the background sender, which also picks up submissions left over from previous runs.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        threading.Thread(target=self._work, name="outbox-sender", daemon=True).start()
+
+        return
+
+    def add(self, payload, destination):
+        """
+        Records a submission durably, before any attempt to send it.
+
+        Parameters:
+            payload (dict): The fields to submit.
+            destination (str): Where the backend stores them, e.g. the name of the test.
+
+        Returns:
+            str: The submission's idempotency key.
+        """
+
+        submission_id = uuid.uuid4().hex
+        payload = payload|{"submission_id":submission_id}
+        with self._condition:
+            self._connection.execute("INSERT INTO submissions (submission_id, form_id, payload, created, next_attempt) VALUES (?, ?, ?, ?, ?)", (submission_id, destination, json.dumps(payload, default=str), time.time(), time.time()))
+
+            # Wake the sender, it waits without a timeout while nothing is pending.
+            self._condition.notify_all()
+
+        return submission_id
+
+    def try_send(self, submission_id):
+        """
+        Attempts to send a submission now, e.g. right after adding it. If it fails, the background sender retries it later.
+
+        Parameters:
+            submission_id (str): The idempotency key returned by add().
+
+        Returns:
+            bool: True if the submission has been accepted, now or before.
+        """
+
+        with self._condition:
+            row = self._connection.execute("SELECT form_id, payload, sent FROM submissions WHERE submission_id = ?", (submission_id,)).fetchone()
+            if row == None or row[2] != None:
+                return row != None
+
+            # Another thread is sending it already, wait for the outcome.
+            if submission_id in self._in_flight:
+                self._condition.wait_for(lambda: submission_id not in self._in_flight)
+                return self._connection.execute("SELECT sent FROM submissions WHERE submission_id = ?", (submission_id,)).fetchone()[0] != None
+            self._in_flight.add(submission_id)
+
+        return self._attempt([(submission_id, row[0], json.loads(row[1]))])[0]
+
+    def _attempt(self, claimed):
+        """
+        Sends claimed submissions once, as one batch, and records the outcomes, scheduling the next attempt of those that failed.
+
+        Parameters:
+            claimed (list): The (submission_id, destination, payload) of each submission.
+
+        Returns:
+            list: Whether each submission has been accepted.
+        """
+
+        error = None
+        try:
+            accepted = self.send_batch([(destination, payload) for submission_id, destination, payload in claimed])
+        except Exception as exception:
+            accepted, error = [False]*len(claimed), repr(exception)
+
+        with self._condition:
+            for (submission_id, destination, payload), submission_accepted in zip(claimed, accepted):
+                self._in_flight.discard(submission_id)
+                if self._closed:
+                    continue
+                if submission_accepted:
+                    self._connection.execute("UPDATE submissions SET sent = ?, attempts = attempts + 1 WHERE submission_id = ?", (time.time(), submission_id))
+                else:
+                    attempts = self._connection.execute("SELECT attempts FROM submissions WHERE submission_id = ?", (submission_id,)).fetchone()[0]+1
+                    delay = min(self.max_delay, self.base_delay*2**(attempts-1))*random.uniform(0.5, 1)
+                    self._connection.execute("UPDATE submissions SET attempts = ?, next_attempt = ?, last_error = ? WHERE submission_id = ?", (attempts, time.time()+delay, error or "rejected", submission_id))
+            self._condition.notify_all()
+
+        return accepted
+
+    def _claim_due(self, now):
+        """
+        Claims the submissions whose next attempt is due, oldest first. Must be called with the lock held.
+
+        Parameters:
+            now (float): The current time.
+
+        Returns:
+            list: The (submission_id, destination, payload) of each claimed submission.
+        """
+
+        rows = self._connection.execute("SELECT submission_id, form_id, payload FROM submissions WHERE sent IS NULL AND next_attempt <= ? ORDER BY created", (now,)).fetchall()
+        claimed = [(submission_id, destination, json.loads(payload)) for submission_id, destination, payload in rows if submission_id not in self._in_flight]
+        self._in_flight.update(submission_id for submission_id, destination, payload in claimed)
+
+        return claimed
+
+    def _work(self):
+        """
+        Sends due submissions, then sleeps until the next one is due or a new one is added.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        while True:
+            with self._condition:
+                if self._closed:
+                    return
+                claimed = self._claim_due(time.time())
+                if len(claimed) == 0:
+                    next_attempt = self._connection.execute("SELECT MIN(next_attempt) FROM submissions WHERE sent IS NULL").fetchone()[0]
+                    timeout = None if next_attempt == None else max(0, next_attempt-time.time())
+                    self._condition.wait(timeout if timeout == None else min(timeout, self.max_delay))
+                    continue
+
+            self._attempt(claimed)
+
+    def pending(self):
+        """
+        Counts the submissions not accepted yet.
+
+        Parameters:
+            None
+
+        Returns:
+            int: The number of pending submissions.
+        """
+
+        with self._condition:
+            return self._connection.execute("SELECT COUNT(*) FROM submissions WHERE sent IS NULL").fetchone()[0]
+
+    def flush(self, timeout=30):
+        """
+        Attempts every pending submission now, ignoring their backoff, e.g. before the application exits.
+        Submissions that still fail stay in the outbox and are sent after the next start.
+
+        Parameters:
+            timeout (float, optional): Time in seconds after which no new attempt is started. Defaults to 30.
+
+        Returns:
+            int: The number of submissions still pending.
+        """
+
+        deadline = time.time()+timeout
+        with self._condition:
+            self._connection.execute("UPDATE submissions SET next_attempt = ? WHERE sent IS NULL", (time.time(),))
+            self._condition.notify_all()
+
+        # Each submission gets one more attempt, by the sender or here.
+        while time.time() < deadline:
+            with self._condition:
+                claimed = self._claim_due(time.time())
+                if len(claimed) == 0 and len(self._in_flight) == 0:
+                    break
+                if len(claimed) == 0:
+                    self._condition.wait(max(0, deadline-time.time()))
+                    continue
+            self._attempt(claimed)
+
+        return self.pending()
+
+    def close(self):
+        """
+        Stops the background sender and closes the database.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            self._connection.close()
+
+        return
@@ -0,0 +1,151 @@
+import threading
+
+class Preloader:
+    """
+    A class to build the question banks concurrently, in the order the tests will be shown.
+
+    Each job declares the shared resources it needs (e.g. "matplotlib", whose pyplot interface is not thread-safe).
+    Jobs needing the same resource never run at the same time, all others run in parallel up to max_workers.
+
+    Attributes:
+        jobs (dict): Job details (build function, priority, resources) by name.
+        ready (dict): A threading.Event by job name, set once the job has finished.
+        progress (dict): The fraction (0 to 1) of each job completed so far.
+        results (dict): The value returned by each finished job.
+        errors (dict): The exception raised by each failed job.
+    """
+
+    def __init__(self, max_workers=2):
+        """
+        Initializes an empty preloader.
+
+        Parameters:
+            max_workers (int, optional): Number of jobs built at the same time. Defaults to 2.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.max_workers = max_workers
+        self.jobs = {}
+        self.ready = {}
+        self.progress = {}
+        self.results = {}
+        self.errors = {}
+        self._pending = []
+        self._busy_resources = set()
+        self._condition = threading.Condition()
+
+        return
+
+    def add(self, name, build, priority, resources=()):
+        """
+        Registers a job to be built.
+
+        Parameters:
+            name (str): The name of the job, e.g. "ANS".
+            build (callable): Called with a progress callback taking a fraction, returns the job result.
+            priority (int): Lower values are built first, use the order in which the tests are shown.
+            resources (tuple, optional): Names of shared resources the job needs exclusively. Defaults to ().
+
+        Returns:
+            None
+        """
+
+        self.jobs[name] = {"build":build, "priority":priority, "resources":set(resources)}
+        self.ready[name] = threading.Event()
+        self.progress[name] = 0.0
+        self._pending.append(name)
+
+        return
+
+    def start(self):
+        """
+        Starts the worker threads, which build the registered jobs in priority order.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        self._pending.sort(key=lambda name: self.jobs[name]["priority"])
+        for idx in range(self.max_workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+        return
+
+    def _next_job(self):
+        """
+        Waits for and claims the highest priority job whose resources are free.
+
+        Parameters:
+            None
+
+        Returns:
+            str or None: The name of the claimed job, or None once nothing is left to build.
+        """
+
+        with self._condition:
+            while True:
+                if len(self._pending) == 0:
+                    return None
+                for name in self._pending:
+                    if not self.jobs[name]["resources"] & self._busy_resources:
+                        self._pending.remove(name)
+                        self._busy_resources |= self.jobs[name]["resources"]
+                        return name
+                self._condition.wait()
+
+    def _work(self):
+        """
+        Worker thread loop building jobs until none are left.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        while True:
+            name = self._next_job()
+            if name == None:
+                return
+
+            def update_progress(fraction, name=name):
+                self.progress[name] = fraction
+
+            # Build the job, keeping its error for the thread waiting on it.
+            try:
+                self.results[name] = self.jobs[name]["build"](update_progress)
+            except Exception as error:
+                self.errors[name] = error
+            self.progress[name] = 1.0
+
+            # Free the job's resources and signal readiness.
+            with self._condition:
+                self._busy_resources -= self.jobs[name]["resources"]
+                self._condition.notify_all()
+            self.ready[name].set()
+
+    def wait(self, name, timeout=None):
+        """
+        Blocks until a job is ready and returns its result.
+
+        Parameters:
+            name (str): The name of the job.
+            timeout (float, optional): Maximum seconds to wait. Defaults to None, waiting indefinitely.
+
+        Returns:
+            The value returned by the job's build function. Re-raises the job's exception if it failed.
+        """
+
+        if not self.ready[name].wait(timeout):
+            raise TimeoutError(f"{name} was not loaded within {timeout} seconds.")
+        if name in self.errors:
+            raise self.errors[name]
+
+        return self.results[name]
@@ -0,0 +1,144 @@
+import json
+import numpy as np
+
+# Record layouts of each test's question bank.
+# Byte strings (S) keep ASCII fields at one byte per character, only the Math equations need unicode for × and ÷.
+ANS_DTYPE = np.dtype([("image","S48"), ("num_left","i2"), ("num_right","i2"), ("ratio","f8"), ("answer","S5")])
+MATH_DTYPE = np.dtype([("equation","U8",(4,)), ("steps","i1"), ("answer","U12")])
+MEMORY_DTYPE = np.dtype([("group","i1"), ("group_image","S64"), ("description","S96"), ("options","S24",(4,)), ("answer","S24"), ("image","S64")])
+SR_DTYPE = np.dtype([("image","S64"), ("options","S64",(4,)), ("answer","S1"), ("grid_size","i1")])
+
+class QuestionBank:
+    """
+    A class to hold a test's questions as one NumPy structured array, shared by all generators and test runners.
+
+    Attributes:
+        test (str): The name of the test, e.g. "ANS".
+        records (np.ndarray): One record per question, laid out by the test's dtype.
+        metadata (dict): Details of how the bank was generated, e.g. generator version and seed.
+        frames (list or None): Shared memory frames of the images when they were rendered by worker processes.
+    """
+
+    def __init__(self, test, records, metadata=None, frames=None):
+        """
+        Initializes the bank from its records.
+
+        Parameters:
+            test (str): The name of the test.
+            records (np.ndarray): The structured array of questions.
+            metadata (dict, optional): Details of how the bank was generated. Defaults to None.
+            frames (list, optional): Shared memory frames of the images, one per record. Defaults to None.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.test = test
+        self.records = records
+        self.metadata = metadata or {}
+        self.frames = frames
+
+        return
+
+    @classmethod
+    def from_columns(cls, test, dtype, columns, metadata=None, frames=None):
+        """
+        Builds a bank from parallel per-field lists, as produced while generating questions.
+
+        Parameters:
+            test (str): The name of the test.
+            dtype (np.dtype): The record layout.
+            columns (dict): A list of values per field name.
+            metadata (dict, optional): Details of how the bank was generated. Defaults to None.
+            frames (list, optional): Shared memory frames of the images. Defaults to None.
+
+        Returns:
+            QuestionBank: The new bank.
+        """
+
+        length = len(next(iter(columns.values())))
+        records = np.zeros(length, dtype=dtype)
+        for name, values in columns.items():
+            records[name] = values
+
+        return cls(test, records, metadata, frames)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, name):
+        """
+        Vectorized access to one field of every question, e.g. bank["ratio"].
+
+        Parameters:
+            name (str): The field name.
+
+        Returns:
+            np.ndarray: A view of the field across all records.
+        """
+
+        return self.records[name]
+
+    def column(self, name):
+        """
+        Returns a field as plain Python values, e.g. for the upload form or to build Question objects.
+
+        Parameters:
+            name (str): The field name.
+
+        Returns:
+            list: The values of the field, with byte strings decoded (nested lists for multi-value fields).
+        """
+
+        values = self.records[name]
+        if values.dtype.kind == "S":
+            values = np.char.decode(values, "utf-8")
+
+        return values.tolist()
+
+    def image_source(self, idx):
+        """
+        Returns what a Question should load as the image of a record: its shared memory frame if any, else its path.
+
+        Parameters:
+            idx (int): The index of the record.
+
+        Returns:
+            str or SharedFrame: The image source.
+        """
+
+        if self.frames != None:
+            return self.frames[idx]
+
+        return self.records["image"][idx].decode("utf-8")
+
+    def save(self, path):
+        """
+        Writes the bank to an uncompressed .npz file, which loads back without any parsing of the records.
+
+        Parameters:
+            path (str): Destination path.
+
+        Returns:
+            None
+        """
+
+        np.savez(path, records=self.records, test=np.array(self.test), metadata=np.array(json.dumps(self.metadata)))
+
+        return
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a bank written by save().
+
+        Parameters:
+            path (str): Path of the .npz file.
+
+        Returns:
+            QuestionBank: The loaded bank.
+        """
+
+        with np.load(path) as data:
+            return cls(str(data["test"]), data["records"], json.loads(str(data["metadata"])))
@@ -1,16 +1,464 @@
 import tkinter as tk
 from PIL import Image, ImageTk
 from tkinter import ttk
-import time
+import threading
+from collections import OrderedDict
+from shared_frames import SharedFrame
+from stimulus_timing import now_ns, event_clock
+
+# Stimulus archives searched before falling back to loose image files.
+stimulus_archives = []
+
+def register_archive(archive):
+    """
+    Registers a packed stimulus archive so that question images are served from it.
+
+    Parameters:
+        archive (stimulus_archive.StimulusArchive): An opened stimulus archive.
+
+    Returns:
+        None
+    """
+
+    stimulus_archives.append(archive)
+
+    return
+
+def close_archives():
+    """
+    Closes and unregisters every stimulus archive.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+
+    while stimulus_archives:
+        stimulus_archives.pop().close()
+
+    return
+
+def open_image(source):
+    """
+    Opens a question image from shared memory, from the registered stimulus archives, or from disk if no archive holds it.
+
+    Parameters:
+        source (str or SharedFrame): Path to the image as produced by the question banks, or a frame rendered by a worker process.
+
+    Returns:
+        PIL.Image.Image: The opened image.
+    """
+
+    # Wrap worker-rendered frames without copying their pixels.
+    if isinstance(source, SharedFrame):
+        return source.to_image()
+
+    for archive in stimulus_archives:
+        if source in archive:
+            return archive.open_image(source)
+
+    return Image.open(source)
+
+class ImageCache:
+    """
+    A class to keep decoded and resized images for the whole session, evicting the least recently used ones beyond a byte budget.
+
+    Attributes:
+        max_bytes (int): The budget for the pixels held by the cache.
+        size_bytes (int): The pixels currently held, estimated at 4 bytes per pixel.
+        hits (int): Number of lookups served from the cache, including images decoded ahead by a prefetcher.
+        misses (int): Number of lookups that had to decode the image.
+    """
+
+    def __init__(self, max_bytes):
+        """
+        Initializes an empty cache.
+
+        Parameters:
+            max_bytes (int): The budget for the pixels held by the cache.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._decoded = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+        return
+
+    def contains(self, source, size):
+        """
+        Checks whether an image is ready, either as a PhotoImage or decoded ahead by a prefetcher.
+
+        Parameters:
+            source (str): Path to the image.
+            size (tuple): The (width, height) of the image.
+
+        Returns:
+            bool: True if the image can be shown without decoding it.
+        """
+
+        key = (source, size)
+        with self._lock:
+            return key in self._entries or key in self._decoded
+
+    def decode(self, source, size):
+        """
+        Decodes and resizes an image ahead of display. Safe to call from a worker thread, the PhotoImage is only created by get() on the Tk thread.
+
+        Parameters:
+            source (str): Path to the image.
+            size (tuple): The (width, height) the image is resized to.
+
+        Returns:
+            None
+        """
+
+        key = (source, size)
+        with self._lock:
+            if key in self._entries or key in self._decoded or key in self._in_flight:
+                return
+            self._in_flight[key] = threading.Event()
+
+        try:
+            image = open_image(source).resize(size, Image.ANTIALIAS)
+            with self._lock:
+                self._decoded[key] = image
+        finally:
+            with self._lock:
+                self._in_flight.pop(key).set()
+
+        return
+
+    def get(self, source, size):
+        """
+        Returns the image at the given size, decoding and resizing it only on first use.
+
+        Parameters:
+            source (str): Path to the image.
+            size (tuple): The (width, height) the image is resized to.
+
+        Returns:
+            ImageTk.PhotoImage: The image ready to be shown in a label.
+        """
+
+        key = (source, size)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            in_flight = self._in_flight.get(key)
+
+        # Let a prefetch that is already decoding this image finish rather than decoding it twice.
+        if in_flight != None:
+            in_flight.wait()
+
+        with self._lock:
+            image = self._decoded.pop(key, None)
+            if image != None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        # Decode outside the lock so other lookups are not held up.
+        if image == None:
+            image = open_image(source).resize(size, Image.ANTIALIAS)
+        photo = ImageTk.PhotoImage(image)
+        self.put(key, photo)
+
+        return photo
+
+    def put(self, key, photo):
+        """
+        Adds an image to the cache, evicting the least recently used images while over budget.
+
+        Parameters:
+            key (tuple): The (source, size) of the image.
+            photo (ImageTk.PhotoImage): The image.
+
+        Returns:
+            None
+        """
+
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = photo
+            self.size_bytes += photo.width() * photo.height() * 4
+
+            # Labels still showing an evicted image keep it alive through their own reference.
+            while self.size_bytes > self.max_bytes and len(self._entries) > 1:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= evicted.width() * evicted.height() * 4
+
+        return
+
+# Images shared by all questions, e.g. the fixation cross shown after every ANS trial.
+image_cache = ImageCache(max_bytes=128*1024*1024)
+
+class ImagePrefetcher:
+    """
+    A class to decode and resize the images of the next few questions on a worker thread, ahead of their display.
+
+    Attributes:
+        questions (list): The questions of a test, in display order.
+        lookahead (int): How many upcoming questions are kept decoded.
+        displayed (int): Number of questions displayed so far.
+        late (int): Number of questions displayed before all their images had been prefetched.
+    """
+
+    def __init__(self, questions, lookahead=3, cache=None):
+        """
+        Initializes the prefetcher and starts its worker thread.
+
+        Parameters:
+            questions (list): The questions of a test, in display order.
+            lookahead (int, optional): How many upcoming questions are kept decoded. Defaults to 3.
+            cache (ImageCache, optional): The cache receiving the decoded images. Defaults to the session-wide image cache.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.questions = questions
+        self.lookahead = lookahead
+        self.cache = cache if cache != None else image_cache
+        self.displayed = 0
+        self.late = 0
+        self._next = 0
+        self._requests = []
+        self._closed = False
+        self._condition = threading.Condition()
+
+        # Start decoding the first questions straight away.
+        self._queue_until(lookahead)
+        threading.Thread(target=self._work, daemon=True).start()
+
+        return
+
+    def _queue_until(self, end):
+        """
+        Queues the images of every question up to (not including) the given index.
+
+        Parameters:
+            end (int): Index of the first question not to queue.
+
+        Returns:
+            None
+        """
+
+        with self._condition:
+            while self._next < min(end, len(self.questions)):
+                self._requests.extend(self.questions[self._next].image_requests())
+                self._next += 1
+            self._condition.notify()
+
+        return
+
+    def _work(self):
+        """
+        Worker thread loop decoding queued images in order.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        while True:
+            with self._condition:
+                while len(self._requests) == 0 and self._closed == False:
+                    self._condition.wait()
+                if self._closed == True:
+                    return
+                source, size = self._requests.pop(0)
+            
+            # A failed decode is left to the display, which loads the image itself and reports the error there.
+            try:
+                self.cache.decode(source, size)
+            except Exception:
+                pass
+
+    def advance(self, idx):
+        """
+        Records that a question is about to be displayed and extends the prefetch window past it.
+
+        Parameters:
+            idx (int): Index of the question about to be displayed.
+
+        Returns:
+            None
+        """
+
+        # Count the question as late if any of its images has not been decoded yet.
+        self.displayed += 1
+        if not all(self.cache.contains(source, size) for source, size in self.questions[idx].image_requests()):
+            self.late += 1
+
+        self._queue_until(idx+1+self.lookahead)
+
+        return
+
+    def close(self):
+        """
+        Stops the worker thread once the test is over, the decoded images stay in the cache.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+        return
+
+    def summary(self):
+        """
+        Reports how well the prefetcher kept ahead of the display.
+
+        Parameters:
+            None
+
+        Returns:
+            str: The number of questions displayed, and how many of them were displayed before their prefetch completed.
+        """
+
+        return f"{self.late}/{self.displayed} questions displayed before their images were prefetched"
+
+class WidgetPool:
+    """
+    A class to recycle the widget trees of one type of question within one display region.
+
+    Questions only hold their data until they are displayed. They then borrow a widget tree from the pool, fill it in, and hand it back once answered or timed out.
+    The number of live widgets therefore stays constant however many questions a test has.
+
+    Attributes:
+        max_free (int): Number of released widget trees kept for reuse, any further ones are destroyed.
+        free (list): Widget trees ready to be reused.
+        created (int): Number of widget trees built so far.
+    """
+
+    def __init__(self, max_free=1):
+        """
+        Initializes an empty pool.
+
+        Parameters:
+            max_free (int, optional): Number of released widget trees kept for reuse. Defaults to 1, as one question is shown at a time.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.max_free = max_free
+        self.free = []
+        self.created = 0
+
+        return
+
+    def acquire(self, build):
+        """
+        Hands out a released widget tree, or builds a new one if none is free.
+
+        Parameters:
+            build (callable): Builds a new widget tree, returning a dictionary of widgets with at least a "frame" entry.
+
+        Returns:
+            dict: The widget tree.
+        """
+
+        # Skip trees destroyed together with their display region.
+        while len(self.free) != 0:
+            widgets = self.free.pop()
+            if widgets["frame"].winfo_exists() == 1:
+                return widgets
+
+        self.created += 1
+
+        return build()
+
+    def release(self, widgets):
+        """
+        Takes a widget tree back once its question is no longer displayed.
+
+        Parameters:
+            widgets (dict): The widget tree returned by acquire().
+
+        Returns:
+            None
+        """
+
+        if len(self.free) < self.max_free and widgets["frame"].winfo_exists() == 1:
+            self.free.append(widgets)
+        else:
+            widgets["frame"].destroy()
+
+        return
+
+# Widget pools by display region and question type.
+widget_pools = {}
+
+def get_widget_pool(display_region, question_type):
+    """
+    Returns the widget pool shared by all questions of a type displayed in a region, creating it on first use.
+
+    Parameters:
+        display_region (tk.Frame): The GUI region where the questions are displayed.
+        question_type (type): The Question class.
+
+    Returns:
+        WidgetPool: The pool.
+    """
+
+    # Tk path names are never reused within a session, so they identify the region.
+    key = (str(display_region), question_type)
+    if key not in widget_pools:
+        widget_pools[key] = WidgetPool()
+
+    return widget_pools[key]
+
+def drop_widget_pools(display_region):
+    """
+    Forgets the widget pools of a display region once it has been destroyed, so the widget trees they hold can be freed.
+
+    Parameters:
+        display_region (tk.Frame): The destroyed GUI region.
+
+    Returns:
+        None
+    """
+
+    for key in [key for key in widget_pools if key[0] == str(display_region)]:
+        del widget_pools[key]
+
+    return
 
 class Question:
     """
     A class to represent a question with optional image, customizable display style, and timing functionality.
     
     Attributes:
-        frame (tk.Frame): The container frame for the question display within the GUI.
+        display_region (tk.Frame): The GUI region where the question is displayed.
+        frame (tk.Frame): The container frame for the question display within the GUI, borrowed from a widget pool while the question is displayed and None otherwise.
+        widgets (dict): The widget tree borrowed from the pool while the question is displayed, None otherwise.
         description (str): The text of the question.
-        description_img_path (str, optional): The file path to an optional image associated with the question.
+        description_img_path (str or SharedFrame, optional): The file path to an optional image associated with the question, or a frame rendered into shared memory.
         description_img (ImageTk.PhotoImage, optional): The optional image displayed with the question, loaded from description_img_path.
         timeout (int, optional): The time limit for the question in seconds. A value of -1 indicates no time limit.
         time_up (bool): Indicator of whether the time limit for answering the question has been exceeded.
@@ -18,10 +466,16 @@ class Question:
         submission (tk.StringVar): The user's submitted answer.
         correctness (bool): Indicates whether the submitted answer is correct.
         shown (bool): Tracks whether the question has been displayed to the user.
+        fully_displayed (bool): Tracks whether the question is accepting an answer, i.e. any timed stimulus phase is over and its time limit is running.
+        on_close (callable): Called without arguments when the question closes after an answer or a timeout, None for no callback.
         total_time (float): The total time taken by the user to answer the question, measured from when the question is displayed to when the answer is submitted.
-        start_time (float): The timestamp when the question was displayed.
+        start_time (float): The timestamp in seconds on the session clock (see stimulus_timing) when the question was displayed.
         end_time (float): The timestamp when the answer was submitted or when the time was checked last.
+        response_time (float): The timestamp of the input event that submitted the answer, None until answered.
+        onset (int): The session clock in nanoseconds once the question had been drawn on screen.
+        timing (dict): The (intended, actual) duration in nanoseconds of each timed phase, for the timing report.
         elapsed_time (float): The time elapsed from displaying the question to the current moment or to the submission of the answer.
+        shared_frames (list): Shared memory frames owned by the question, freed when the question is closed.
 
     """
     
@@ -39,8 +493,10 @@ class Question:
             None
         """
         
-        # Assign attributes.
-        self.frame = tk.Frame(display_region, bg="white")
+        # Assign attributes. Widgets are only borrowed from the pool when the question is displayed.
+        self.display_region = display_region
+        self.frame = None
+        self.widgets = None
         self.description = description
         self.description_img_path = description_img_path
         self.description_img = None
@@ -49,61 +505,317 @@ class Question:
         self.description_img = None
         self.time_up = False
         self.answer = None
-        self.submission = tk.StringVar()
+        self.submission = tk.StringVar(display_region)
         self.correctness = None
         self.shown = False
+        self.fully_displayed = False
+        self.on_close = None
+        self.response_time = None
+        self.onset = None
+        self.timing = {}
         self.total_time = None
+        self.shared_frames = []
+
+        return
+    
+    def build_widgets(self):
+        """
+        Builds a new widget tree for this type of question. The tree holds no question data, populate_widgets() fills it in for each question displayed.
+        
+        Parameters:
+            None
+            
+        Returns:
+            dict: The widgets by name, with the container frame under "frame".
+        """
+        
+        frame = tk.Frame(self.display_region, bg="white")
+        widgets = {"frame":frame}
         
         # Create description widgets.
-        self.assemble_description_widgets()
+        self.assemble_description_widgets(widgets)
+        
+        return widgets
+    
+    def assemble_description_widgets(self, widgets):
+        """
+        Prepares and places the text and optional image components within the question's frame.
+        
+        Parameters:
+            widgets (dict): The widget tree being built, the description label is added to it.
+            
+        Returns:
+            None
+        """
+        
+        # Create a sub-frame for the question description and optional image.
+        description_frame = tk.Frame(widgets["frame"], width=600, height=450, bg="white")
+        description_frame.grid(row=0, column=0)
+        
+        # Create the label, its text and optional image are filled in for each question.
+        widgets["description_box"] = tk.Label(description_frame, compound="top", bg="white", wraplength=600, font=("Helvetica", 12, "bold"))
+            
+        # Display the text (and optionally image) within the frame.
+        widgets["description_box"].pack()
+    
+    def populate_widgets(self):
+        """
+        Fills the borrowed widget tree in with the question's data.
+        
+        Parameters:
+            None
+            
+        Returns:
+            None
+        """
+        
+        self.frame = self.widgets["frame"]
+        self.description_box = self.widgets["description_box"]
+        self.description_box.configure(text=self.description, image="")
+        
+        return
+    
+    def close(self):
+        """
+        Removes the question from the display and hands its widget tree back to the pool. Calling it more than once has no effect.
+        
+        Parameters:
+            None
+            
+        Returns:
+            None
+        """
+        
+        if self.widgets == None:
+            return
+        
+        # Clear the question's bindings and images, so the next question starts from a blank tree.
+        self.frame.place_forget()
+        self.frame.unbind("<Key>")
+        self.unload_images()
+        self.release_shared_frames()
+        
+        get_widget_pool(self.display_region, type(self)).release(self.widgets)
+        self.widgets = None
+        self.frame = None
+        
+        # Let the test runner move on straight away.
+        if self.on_close != None:
+            self.on_close()
+        
+        return
+    
+    def image_requests(self):
+        """
+        Lists the images the question shows, so they can be prefetched.
+        
+        Parameters:
+            None
+            
+        Returns:
+            list: The (source, size) of each image read from disk or an archive. Shared memory frames are already in memory and not listed.
+        """
+        
+        if self.description_img_path != None and not isinstance(self.description_img_path, SharedFrame):
+            return [(self.description_img_path, (340,340))]
+        
+        return []
+    
+    def load_images(self):
+        """
+        Loads the question's images into its widgets. Called on the Tk side just before display, so prefetched images are used.
+        
+        Parameters:
+            None
+            
+        Returns:
+            None
+        """
+        
+        if self.description_img_path != None:
+            self.description_img = self.load_image(self.description_img_path, (340,340))
+            self.description_box.configure(image=self.description_img)
+        
+        return
+    
+    def unload_images(self):
+        """
+        Removes the question's images from its widgets, so their memory is freed once the question is closed.
+        
+        Parameters:
+            None
+            
+        Returns:
+            None
+        """
+        
+        self.description_box.configure(image="")
+        self.description_img = None
+        
+        return
+    
+    def load_image(self, source, size):
+        """
+        Loads, resizes and converts an image for display, taking ownership of it if it lives in shared memory.
+        Images read from disk or an archive go through the session-wide image cache, so they are decoded once.
+        
+        Parameters:
+            source (str or SharedFrame): Path to the image, or a frame rendered by a worker process.
+            size (tuple): The (width, height) the image is resized to.
+            
+        Returns:
+            ImageTk.PhotoImage: The image ready to be shown in a label.
+        """
+        
+        # Record shared memory frames so they are freed when the question is closed.
+        # Each frame is only shown by its own question, so it is not worth caching.
+        if isinstance(source, SharedFrame):
+            if source not in self.shared_frames:
+                self.shared_frames.append(source)
+            return ImageTk.PhotoImage(open_image(source).resize(size, Image.ANTIALIAS))
+        
+        return image_cache.get(source, size)
+    
+    def release_shared_frames(self):
+        """
+        Frees the shared memory frames owned by the question. The decoded PhotoImages keep their own copy of the pixels.
+        
+        Parameters:
+            None
+            
+        Returns:
+            None
+        """
+        
+        for shared_frame in self.shared_frames:
+            shared_frame.release()
+        self.shared_frames = []
+        
+        return
+    
+    def display_question(self):
+        """
+        Displays the question text with optional image and applies specified style. Marks the question as shown and starts timing from this point.
+        
+        Parameters:
+            None
+        
+        Returns:
+            None
+        """
+        
+        # Borrow a widget tree, fill it in and load the images, then place the question's frame in the center of its display region.
+        requested = now_ns()
+        self.widgets = get_widget_pool(self.display_region, type(self)).acquire(self.build_widgets)
+        self.populate_widgets()
+        self.load_images()
+        self.frame.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+
+        # Mark the question as shown from the time it was actually drawn.
+        self.mark_displayed(self.confirm_repaint())
+        self.timing["onset"] = (0, self.onset-requested)
 
         return
     
-    def assemble_description_widgets(self):
+    def stimulus_ms(self):
+        """
+        Gives the length of the question's timed stimulus phase, during which no answer is accepted.
+        
+        Parameters:
+            None
+            
+        Returns:
+            int: The length in milliseconds, 0 for questions accepting an answer as soon as they are shown.
+        """
+        
+        return 0
+    
+    def mark_displayed(self, onset):
+        """
+        Marks the question as shown and starts timing it. Used by display_question() and by the headless simulation (see simulation.py).
+        
+        Parameters:
+            onset (int): The session clock in nanoseconds when the question appeared.
+            
+        Returns:
+            None
+        """
+        
+        # Questions with a timed stimulus phase are only fully displayed once that phase is over.
+        self.shown = True
+        self.fully_displayed = self.stimulus_ms() == 0
+        self.onset = onset
+        self.start_time = onset/1e9
+        
+        return
+    
+    def mark_fully_displayed(self, offset):
         """
-        Prepares and places the text and optional image components within the question's frame.
+        Ends the timed stimulus phase, recording its actual length and restarting the response time from its end.
         
         Parameters:
-            None
+            offset (int): The session clock in nanoseconds when the stimulus left the screen.
             
         Returns:
             None
         """
         
-        # Create a sub-frame for the question description and optional image.
-        description_frame = tk.Frame(self.frame, width=600, height=450, bg="white")
-        description_frame.grid(row=0, column=0)
+        self.timing["exposure"] = (self.stimulus_ms()*1_000_000, offset-self.onset)
+        self.start_time = offset/1e9
+        self.fully_displayed = True
         
-        # If an image path is provided, load the image, otherwise the text only.
-        if self.description_img_path != None:
-            self.description_img = ImageTk.PhotoImage(Image.open(self.description_img_path).resize((340,340), Image.ANTIALIAS))
-            self.description_box = tk.Label(description_frame, image=self.description_img, text=self.description, compound="top", bg="white", wraplength=600, font=("Helvetica", 12, "bold"))
-        else:
-            self.description_box = tk.Label(description_frame, text=self.description, bg="white", wraplength=600, font=("Helvetica", 12, "bold"))
+        return
+    
+    def confirm_repaint(self):
+        """
+        Lets Tk redraw the pending changes to the display before reading the clock, so stimulus onsets and offsets are timed from when they are on screen.
+        
+        Parameters:
+            None
             
-        # Display the text (and optionally image) within the frame.
-        self.description_box.pack()
+        Returns:
+            int: The session clock in nanoseconds after the repaint.
+        """
+        
+        self.frame.update_idletasks()
+        
+        return now_ns()
     
-    def display_question(self):
+    def schedule(self, deadline, callback, *args):
         """
-        Displays the question text with optional image and applies specified style. Marks the question as shown and starts timing from this point.
+        Schedules a callback on the Tk event loop for a time on the session clock, so delays do not accumulate over successive steps.
         
         Parameters:
+            deadline (int): The session clock in nanoseconds at which to call back.
+            callback (callable): The function to call.
+            *args: Arguments passed to the callback.
+            
+        Returns:
             None
+        """
+        
+        delay = max(0, round((deadline-now_ns())/1e6))
+        self.frame.after(delay, callback, *args)
         
+        return
+    
+    def submit(self, submission, event=None):
+        """
+        Records a submission with the time of the input that made it, checks the answer and closes the question.
+        
+        Parameters:
+            submission (str): The submitted answer.
+            event (tk.Event, optional): The input event, whose timestamp is used as the response time. Defaults to None, using the current time for widgets whose commands carry no event.
+            
         Returns:
             None
         """
         
-        # Place the question's frame in the center of its display region.
-        self.frame.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
-
-        # Mark the question as shown.
-        self.shown = True
-
-        # Record the current time as the start time.
-        self.start_time = time.time()
-
+        self.response_time = (event_clock.event_time(event) if event != None else now_ns())/1e9
+        self.submission.set(submission)
+        self.check_answer()
+        self.close()
+        
         return
     
     def check_answer(self):
@@ -150,15 +862,15 @@ class Question:
         elif self.submission.get() == "" and self.time_up == False:
             
             # Calculate elapsed time.
-            self.end_time = time.time()
+            self.end_time = now_ns()/1e9
             self.elapsed_time = self.end_time-self.start_time
             
             return self.elapsed_time
         
         elif self.total_time == None:
             
-            # Calculate total time.
-            self.end_time = time.time()
+            # Calculate total time, from the input event if the question was answered.
+            self.end_time = self.response_time if self.response_time != None else now_ns()/1e9
             self.total_time = self.end_time-self.start_time
             
             return self.total_time
@@ -181,11 +893,11 @@ class Question:
         # Check if the question has been displayed.
         if self.shown == True:
             
-            # Mark time_up as true, set the total_time to the timeout value & remove the question frame from the GUI if the current time exceeds the given time limit .
+            # Mark time_up as true, set the total_time to the timeout value & remove the question from the GUI if the current time exceeds the given time limit .
             if self.timeout != -1 and self.get_time() > self.timeout:
                 self.time_up = True
                 self.total_time = self.timeout
-                self.frame.destroy()
+                self.close()
             
         return
     
@@ -224,15 +936,71 @@ class SpatialReasoningQuestion(Question):
         self.options = options
         self.answer = answer
 
-        # Create option widgets.
-        self.assemble_option_widgets()
-
         return
+    
+    def build_widgets(self):
+        """
+        Builds a new widget tree with the description and the option widgets.
+
+        Parameters:
+            None
+
+        Returns:
+            dict: The widgets by name.
+        """
+        
+        widgets = super().build_widgets()
+        self.assemble_option_widgets(widgets)
+        
+        return widgets
 
-    def assemble_option_widgets(self):
+    def assemble_option_widgets(self, widgets):
         """
         Prepares interactive widgets for question options. Options are displayed with associated images.
 
+        Parameters:
+            widgets (dict): The widget tree being built, the option labels and radio buttons are added to it.
+
+        Returns:
+            None
+        """
+        
+        # Create a frame to contain the option images and radio buttons.
+        options_frame = tk.Frame(widgets["frame"], width=500, height=450, bg="white")
+        options_frame.grid(row=1, column=0)
+        
+        # Place option image labels in the options frame, the images are loaded by load_images() just before display.
+        widgets["option_img_a"] = option_img_a = tk.Label(options_frame, bg="white")
+        widgets["option_img_b"] = option_img_b = tk.Label(options_frame, bg="white")
+        widgets["option_img_c"] = option_img_c = tk.Label(options_frame, bg="white")
+        widgets["option_img_d"] = option_img_d = tk.Label(options_frame, bg="white")
+        
+        # Configure the style for radio buttons.
+        style = ttk.Style()
+        style.configure('White.TRadiobutton', background='white')
+        
+        # Create radio buttons for each option, their variable and command are set for each question.
+        widgets["radio_button_a"] = radio_button_a = ttk.Radiobutton(options_frame, text="a", value="a", style='White.TRadiobutton')
+        widgets["radio_button_b"] = radio_button_b = ttk.Radiobutton(options_frame, text="b", value="b", style='White.TRadiobutton')
+        widgets["radio_button_c"] = radio_button_c = ttk.Radiobutton(options_frame, text="c", value="c", style='White.TRadiobutton')
+        widgets["radio_button_d"] = radio_button_d = ttk.Radiobutton(options_frame, text="d", value="d", style='White.TRadiobutton')
+        
+        # Organize the radio buttons and images.
+        radio_button_a.grid(row=0, column= 0)
+        option_img_a.grid(row=1, column= 0)
+        radio_button_b.grid(row=0, column= 1)
+        option_img_b.grid(row=1, column= 1)
+        radio_button_c.grid(row=2, column= 0)
+        option_img_c.grid(row=3, column= 0)
+        radio_button_d.grid(row=2, column= 1)
+        option_img_d.grid(row=3, column= 1)
+        
+        return
+    
+    def populate_widgets(self):
+        """
+        Fills the borrowed widget tree in, connecting the radio buttons to this question's submission.
+
         Parameters:
             None
 
@@ -242,7 +1010,7 @@ class SpatialReasoningQuestion(Question):
 
         def on_radio_button_changed():
             """
-            Check the submitted answer and destroy the question frame upon selection.
+            Check the submitted answer and close the question upon selection.
 
             Parameters:
                 None
@@ -251,49 +1019,76 @@ class SpatialReasoningQuestion(Question):
                 None
             """
             
-            self.check_answer()
-            self.frame.destroy()
+            self.submit(self.submission.get())
             
             return
+        
+        super().populate_widgets()
+        
+        self.option_img_a = self.widgets["option_img_a"]
+        self.option_img_b = self.widgets["option_img_b"]
+        self.option_img_c = self.widgets["option_img_c"]
+        self.option_img_d = self.widgets["option_img_d"]
+        for name in ["radio_button_a", "radio_button_b", "radio_button_c", "radio_button_d"]:
+            self.widgets[name].configure(variable=self.submission, command=on_radio_button_changed)
+        
+        return
+    
+    def image_requests(self):
+        """
+        Lists the description and option images, so they can be prefetched.
+        
+        Parameters:
+            None
             
-        # Sort the options to ensure a consistent order.
-        sorted_options = sorted(self.options)
+        Returns:
+            list: The (source, size) of each image read from disk or an archive.
+        """
         
-        # Create a frame to contain the option images and radio buttons.
-        options_frame = tk.Frame(self.frame, width=500, height=450, bg="white")
-        options_frame.grid(row=1, column=0)
+        return super().image_requests() + [(option, (200,200)) for option in sorted(self.options)]
+    
+    def load_images(self):
+        """
+        Loads the description and option images into their labels just before display.
+        
+        Parameters:
+            None
+            
+        Returns:
+            None
+        """
         
-        # Load and option images.
-        self.img_a = ImageTk.PhotoImage(Image.open(sorted_options[0]).resize((200,200), Image.ANTIALIAS))
-        self.img_b = ImageTk.PhotoImage(Image.open(sorted_options[1]).resize((200,200), Image.ANTIALIAS))
-        self.img_c = ImageTk.PhotoImage(Image.open(sorted_options[2]).resize((200,200), Image.ANTIALIAS))
-        self.img_d = ImageTk.PhotoImage(Image.open(sorted_options[3]).resize((200,200), Image.ANTIALIAS))
+        super().load_images()
         
-        # Place option images in the options frame.
-        option_img_a = tk.Label(options_frame, image=self.img_a, bg="white")
-        option_img_b = tk.Label(options_frame, image=self.img_b, bg="white")
-        option_img_c = tk.Label(options_frame, image=self.img_c, bg="white")
-        option_img_d = tk.Label(options_frame, image=self.img_d, bg="white")
+        # Load option images in the same sorted order as the radio buttons.
+        sorted_options = sorted(self.options)
+        self.img_a = self.load_image(sorted_options[0], (200,200))
+        self.img_b = self.load_image(sorted_options[1], (200,200))
+        self.img_c = self.load_image(sorted_options[2], (200,200))
+        self.img_d = self.load_image(sorted_options[3], (200,200))
+        self.option_img_a.configure(image=self.img_a)
+        self.option_img_b.configure(image=self.img_b)
+        self.option_img_c.configure(image=self.img_c)
+        self.option_img_d.configure(image=self.img_d)
         
-        # Configure the style for radio buttons.
-        style = ttk.Style()
-        style.configure('White.TRadiobutton', background='white')
+        return
+    
+    def unload_images(self):
+        """
+        Removes the description and option images from their labels.
+        
+        Parameters:
+            None
+            
+        Returns:
+            None
+        """
         
-        # Create radio buttons for each option.
-        radio_button_a = ttk.Radiobutton(options_frame, text="a", value="a", variable=self.submission, command=on_radio_button_changed, style='White.TRadiobutton')
-        radio_button_b = ttk.Radiobutton(options_frame, text="b", value="b", variable=self.submission, command=on_radio_button_changed, style='White.TRadiobutton')
-        radio_button_c = ttk.Radiobutton(options_frame, text="c", value="c", variable=self.submission, command=on_radio_button_changed, style='White.TRadiobutton')
-        radio_button_d = ttk.Radiobutton(options_frame, text="d", value="d", variable=self.submission, command=on_radio_button_changed, style='White.TRadiobutton')
+        super().unload_images()
         
-        # Organize the radio buttons and images.
-        radio_button_a.grid(row=0, column= 0)
-        option_img_a.grid(row=1, column= 0)
-        radio_button_b.grid(row=0, column= 1)
-        option_img_b.grid(row=1, column= 1)
-        radio_button_c.grid(row=2, column= 0)
-        option_img_c.grid(row=3, column= 0)
-        radio_button_d.grid(row=2, column= 1)
-        option_img_d.grid(row=3, column= 1)
+        for label in [self.option_img_a, self.option_img_b, self.option_img_c, self.option_img_d]:
+            label.configure(image="")
+        self.img_a = self.img_b = self.img_c = self.img_d = None
         
         return
     
@@ -303,9 +1098,12 @@ class ANSQuestion(Question):
     
     Attributes:
         answer (str): The correct answer to the ANS question. It should be "Left" or "Right".
+        exposure_ms (int): How long the dots are shown for, in milliseconds.
         Inherits all attributes from the 'Question' class.
     """
     
+    exposure_ms = 750
+    
     def __init__(self, display_region, description, answer, description_img_path=None, timeout=-1):
         """
         Initializes an ANSQuestion object with question details and display settings.
@@ -330,6 +1128,32 @@ class ANSQuestion(Question):
         
         return
     
+    def stimulus_ms(self):
+        """
+        Gives how long the dots are shown for.
+        
+        Parameters:
+            None
+            
+        Returns:
+            int: The exposure in milliseconds.
+        """
+        
+        return self.exposure_ms
+    
+    def image_requests(self):
+        """
+        Lists the dot image and the fixation cross, so they can be prefetched.
+        
+        Parameters:
+            None
+            
+        Returns:
+            list: The (source, size) of each image read from disk or an archive.
+        """
+        
+        return super().image_requests() + [("./ANS_Test/Figures/Fixation_cross.png", (340,340))]
+    
     def update_fixation_cross(self):
         """
         Updates the discription image to show a blank fixation cross.
@@ -341,7 +1165,7 @@ class ANSQuestion(Question):
             None
         """
         
-        self.description_img = ImageTk.PhotoImage(Image.open("./ANS_Test/Figures/Fixation_cross.png").resize((340,340), Image.ANTIALIAS))
+        self.description_img = self.load_image("./ANS_Test/Figures/Fixation_cross.png", (340,340))
         self.description_box.configure(image=self.description_img)
         
     def assemble_keyboard_listener(self):
@@ -358,7 +1182,7 @@ class ANSQuestion(Question):
         def on_key_press(event):
             
             """
-            Set submission for "Left" or "Right" key press, check the answer, and destroy the frame.
+            Set submission for "Left" or "Right" key press, check the answer, and close the question.
 
             Parameters:
                 None
@@ -368,24 +1192,41 @@ class ANSQuestion(Question):
             """
             
             if event.keysym in ["Left", "Right"]:
-                self.submission.set(event.keysym)
-                self.check_answer()
-                self.frame.destroy()
+                self.submit(event.keysym, event)
                 
             return
         
-        # Reset start time upon full display of question to accurately measure response time.
-        self.start_time = time.time()
-        
         # Bind the key press event to the frame for response capture.
         self.frame.bind("<Key>", on_key_press)
         self.frame.focus_set()
+    
+    def end_stimulus(self):
+        """
+        Replaces the dots with the fixation cross and starts accepting the response.
+        
+        Parameters:
+            None
+            
+        Returns:
+            None
+        """
+        
+        # Nothing to do if the question was closed in the meantime.
+        if self.widgets == None:
+            return
+        
+        # Start the response time once the fixation cross is on screen.
+        self.update_fixation_cross()
+        self.mark_fully_displayed(self.confirm_repaint())
+        self.assemble_keyboard_listener()
+        
+        return
 
     def display_question(self):
         """
         Displays the question after showing the description and optional image for a brief period.
         
-        Inherits the initial display behavior from the base class, then briefly pauses before showing a fixation cross and enable input.
+        Inherits the initial display behavior from the base class, then schedules the fixation cross and the input to follow after a brief pause.
 
         Parameters:
             None
@@ -394,15 +1235,11 @@ class ANSQuestion(Question):
             None
         """
         
-        # Display initial question.
+        # Display initial question, the time limit only runs once the dots are gone.
         super().display_question()
         
-        # Brief pause before showing the fixation cross.
-        time.sleep(0.75)
-        
-        # Show the fixation cross and set up the keyboard listener for response capture.
-        self.update_fixation_cross()
-        self.assemble_keyboard_listener()
+        # Show the fixation cross and set up the keyboard listener for response capture after a brief pause.
+        self.schedule(self.onset+self.stimulus_ms()*1_000_000, self.end_stimulus)
 
         return
     
@@ -413,9 +1250,12 @@ class MathQuestion(Question):
     Attributes:
         equation (list): A list containing strings, each representing a part of the math equation or calculation posed to the participant.
         answer (str): The correct answer to the complete math calculation.
+        step_ms (int): How long each part of the equation is shown for, in milliseconds.
         Inherits all attributes from the 'Question' class.
     """
     
+    step_ms = 2000
+    
     def __init__(self, display_region, description, equation, answer, description_img_path=None, timeout=-1):
         """
         Initializes a MathQuestion object with detailed settings for interaction and display.
@@ -440,15 +1280,55 @@ class MathQuestion(Question):
         self.equation = equation
         self.answer = answer
         
-        # Create calculation widgets.
-        self.assemble_calculation_widgets()
-        
         return
+    
+    def build_widgets(self):
+        """
+        Builds a new widget tree with the description and the calculation widgets.
+        
+        Parameters:
+            None
+            
+        Returns:
+            dict: The widgets by name.
+        """
+        
+        widgets = super().build_widgets()
+        self.assemble_calculation_widgets(widgets)
         
-    def assemble_calculation_widgets(self):
+        return widgets
+        
+    def assemble_calculation_widgets(self, widgets):
         """
         Prepares interactive widgets for displaying the equation sequence and collecting the participant's answer.
         
+        Parameters:
+            widgets (dict): The widget tree being built, the calculation label and entry box are added to it.
+            
+        Returns:
+            None
+        """
+        
+        # Create a frame for the equation display and answer input.
+        calculation_frame = tk.Frame(widgets["frame"], width=500, height=450, bg="white")
+        calculation_frame.grid(row=1, column=0)
+        
+        # Create label widget to display the equation.
+        widgets["calculation_box"] = tk.Label(calculation_frame, bg="white", anchor="center", font=("Helvetica", 24, "bold"))
+        equal_label = tk.Label(calculation_frame, text="=", bg="white", font=("Helvetica", 12))
+        
+        # Create entry widget for answer submission.
+        widgets["entry"] = tk.Entry(calculation_frame, width=22, bg="white", font=("Helvetica", 12), state='disabled')
+        
+        # Organize the label and entry box.
+        widgets["calculation_box"].grid(row=0, column=0, columnspan=2)
+        equal_label.grid(row=1, column=0)
+        widgets["entry"].grid(row=1, column=1)
+    
+    def populate_widgets(self):
+        """
+        Fills the borrowed widget tree in, showing the calculation box and clearing the entry box left by the previous question.
+        
         Parameters:
             None
             
@@ -458,7 +1338,7 @@ class MathQuestion(Question):
         
         def get_submission(event):
             """
-            Capture answer submission from entry box and destroy the question frame.
+            Capture answer submission from entry box and close the question.
 
             Parameters:
                 None
@@ -469,42 +1349,60 @@ class MathQuestion(Question):
             
             submission = self.entry.get()
             if submission != "":
-                self.submission.set(submission)
-                self.check_answer()
-                self.frame.destroy()
+                self.submit(submission, event)
             
             return
         
-        # Create a frame for the equation display and answer input.
-        calculation_frame = tk.Frame(self.frame, width=500, height=450, bg="white")
-        calculation_frame.grid(row=1, column=0)
+        super().populate_widgets()
         
-        # Create label widget to display the equation.
-        self.calculation_box = tk.Label(calculation_frame, bg="white", anchor="center", font=("Helvetica", 24, "bold"))
-        equal_label = tk.Label(calculation_frame, text="=", bg="white", font=("Helvetica", 12))
+        self.calculation_box = self.widgets["calculation_box"]
+        self.calculation_box.configure(text="")
+        self.calculation_box.grid()
         
-        # Create entry widget for answer submission.
-        self.entry = tk.Entry(calculation_frame, width=22, bg="white", font=("Helvetica", 12), state='disabled')
+        self.entry = self.widgets["entry"]
+        self.entry.configure(state="normal")
+        self.entry.delete(0, tk.END)
+        self.entry.configure(state="disabled")
         self.entry.bind("<Return>", get_submission)
         
-        # Organize the label and entry box.
-        self.calculation_box.grid(row=0, column=0, columnspan=2)
-        equal_label.grid(row=1, column=0)
-        self.entry.grid(row=1, column=1)
+        return
     
-    def update_calculation_box(self):
+    def stimulus_ms(self):
         """
-        Sequentially updates the calculation box with each part of the equation.
+        Gives how long the equation is shown for, all parts included.
         
-        parameters:
+        Parameters:
             None
+            
+        Returns:
+            int: The length in milliseconds.
+        """
+        
+        return len(self.equation)*self.step_ms
+    
+    def update_calculation_box(self, step=0):
+        """
+        Sequentially updates the calculation box with each part of the equation, scheduling the next part 2 seconds after the previous one's onset.
+        Once all parts have been shown, removes the calculation box and activates the entry box.
+        
+        parameters:
+            step (int, optional): Index of the part to show. Defaults to 0.
         Returns:
             None
         """
         
-        for calculation in self.equation:
-            self.calculation_box.configure(text=calculation)
-            time.sleep(2)
+        # Nothing to do if the question was closed in the meantime.
+        if self.widgets == None:
+            return
+        
+        # Steps are scheduled from the question's onset, so a late step does not delay the following ones.
+        if step < len(self.equation):
+            self.calculation_box.configure(text=self.equation[step])
+            self.schedule(self.onset+(step+1)*self.step_ms*1_000_000, self.update_calculation_box, step+1)
+        else:
+            self.calculation_box.grid_remove()
+            self.mark_fully_displayed(self.confirm_repaint())
+            self.enable_entry()
             
         return
     
@@ -519,9 +1417,6 @@ class MathQuestion(Question):
             None
         """
         
-        # Reset start time upon full display of question to accurately measure response time.
-        self.start_time = time.time()
-        
         # Enable the entry widget for input and set focus to it.
         self.entry.configure(state="normal")
         self.entry.focus_set()
@@ -541,15 +1436,11 @@ class MathQuestion(Question):
             None
         """
         
-        # Display initial question.
+        # Display initial question, the time limit only runs once the equation is gone.
         super().display_question()
         
-        # Show each part of the equation with pauses.
+        # Show each part of the equation with pauses, then activate the entry box.
         self.update_calculation_box()
-        
-        # Remove the calculation box from the display and activate entry box.
-        self.calculation_box.destroy()
-        self.enable_entry()
 
         return
     
@@ -588,16 +1479,58 @@ class MemoryQuestion(Question):
         self.options = options
         self.answer = answer
         
-        # Create option widgets.
-        self.assemble_option_widgets()
-        
         return
+    
+    def build_widgets(self):
+        """
+        Builds a new widget tree with the description and the option buttons.
+        
+        Parameters:
+            None
+            
+        Returns:
+            dict: The widgets by name.
+        """
+        
+        widgets = super().build_widgets()
+        self.assemble_option_widgets(widgets)
         
-    def assemble_option_widgets(self):
+        return widgets
+        
+    def assemble_option_widgets(self, widgets):
         """
-        Creates and arranges buttons for each of the provided options.
+        Creates and arranges buttons for the four options.
         
         parameters:
+            widgets (dict): The widget tree being built, the option buttons are added to it.
+            
+        Returns:
+            None
+        """
+        
+        # Set up a frame for the option buttons.
+        options_frame = tk.Frame(widgets["frame"], width=500, height=450, bg="white")
+        options_frame.grid(row=1, column=0)
+        
+        # Create option buttons, their text and command are set for each question.
+        widgets["button_a"] = button_a = tk.Button(options_frame, bg="white", font=("Helvetica", 12), width=25)
+        widgets["button_b"] = button_b = tk.Button(options_frame, bg="white", font=("Helvetica", 12), width=25)
+        widgets["button_c"] = button_c = tk.Button(options_frame, bg="white", font=("Helvetica", 12), width=25)
+        widgets["button_d"] = button_d = tk.Button(options_frame, bg="white", font=("Helvetica", 12), width=25)
+        
+        # Organize the option buttons.
+        button_a.grid(row=0, column= 0, padx=5, pady=5)
+        button_b.grid(row=0, column= 1, padx=5, pady=5)
+        button_c.grid(row=1, column= 0, padx=5, pady=5)
+        button_d.grid(row=1, column= 1, padx=5, pady=5)
+        
+        return
+    
+    def populate_widgets(self):
+        """
+        Fills the borrowed widget tree in with the question's options.
+        
+        Parameters:
             None
             
         Returns:
@@ -606,7 +1539,7 @@ class MemoryQuestion(Question):
         
         def on_button_clicked(submission):
             """
-            Set submission for button press, check the answer, and destroy the frame.
+            Set submission for button press, check the answer, and close the question.
             
             Parameters:
                 None
@@ -615,24 +1548,11 @@ class MemoryQuestion(Question):
                 None
             """
             
-            self.submission.set(submission)
-            self.check_answer()
-            self.frame.destroy()
-        
-        # Set up a frame for the option buttons.
-        options_frame = tk.Frame(self.frame, width=500, height=450, bg="white")
-        options_frame.grid(row=1, column=0)
+            self.submit(submission)
         
-        # Create option buttons.
-        button_a = tk.Button(options_frame, text=self.options[0], command=lambda: on_button_clicked(self.options[0]), bg="white", font=("Helvetica", 12), width=25)
-        button_b = tk.Button(options_frame, text=self.options[1], command=lambda: on_button_clicked(self.options[1]), bg="white", font=("Helvetica", 12), width=25)
-        button_c = tk.Button(options_frame, text=self.options[2], command=lambda: on_button_clicked(self.options[2]), bg="white", font=("Helvetica", 12), width=25)
-        button_d = tk.Button(options_frame, text=self.options[3], command=lambda: on_button_clicked(self.options[3]), bg="white", font=("Helvetica", 12), width=25)
+        super().populate_widgets()
         
-        # Organize the option buttons.
-        button_a.grid(row=0, column= 0, padx=5, pady=5)
-        button_b.grid(row=0, column= 1, padx=5, pady=5)
-        button_c.grid(row=1, column= 0, padx=5, pady=5)
-        button_d.grid(row=1, column= 1, padx=5, pady=5)
+        for name, option in zip(["button_a", "button_b", "button_c", "button_d"], self.options):
+            self.widgets[name].configure(text=option, command=lambda option=option: on_button_clicked(option))
         
-        return
\ No newline at end of file
+        return
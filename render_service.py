@@ -0,0 +1,276 @@
+from multiprocessing.connection import Listener, Client
+import subprocess
+import threading
+import sys
+import io
+import os
+import time
+
+# Local address and key shared by every app instance on the machine.
+SERVICE_ADDRESS = ("localhost", 6021)
+SERVICE_AUTHKEY = b"cognitive-test-renderer"
+
+def warm_up():
+    """
+    Imports matplotlib and draws a throwaway figure so font caches and the Agg backend are ready before the first job.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import ANSQuestion_generator
+    import cube_constructor
+
+    fig, ax = plt.subplots(figsize=(1, 1))
+    ax.scatter([0.5], [0.5])
+    fig.savefig(io.BytesIO(), format="png")
+    plt.close(fig)
+
+    return
+
+def save_figure(fig, path, **kwargs):
+    """
+    Saves a figure to the given path, or returns its PNG bytes if no path is given.
+
+    Parameters:
+        fig (matplotlib.figure.Figure): The figure to save.
+        path (str or None): Destination path of the image.
+        **kwargs: Extra options for savefig.
+
+    Returns:
+        str or bytes: The path the image was written to, or the PNG bytes.
+    """
+
+    if path != None:
+        fig.savefig(path, **kwargs)
+        return path
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", **kwargs)
+    return buffer.getvalue()
+
+def render_job(job):
+    """
+    Renders one job in the service process.
+
+    Supported jobs:
+        ("ping",): Checks that the service is alive.
+        ("ans", points_l, points_r, path): Draws an ANS image with the given dots.
+        ("cube", cubes, views): Draws a cube arrangement once per (path, view, flip, rot) entry of views, a view of None keeps the initial view.
+
+    Parameters:
+        job (tuple): The job description.
+
+    Returns:
+        The job result: "pong", a path or PNG bytes, or a list of them for cube jobs.
+    """
+
+    import matplotlib.pyplot as plt
+
+    if job[0] == "ping":
+        return "pong"
+
+    if job[0] == "ans":
+        from ANSQuestion_generator import draw_images
+        kind, points_l, points_r, path = job
+        fig = draw_images(points_l, points_r)
+        result = save_figure(fig, path)
+        plt.close(fig)
+        return result
+
+    if job[0] == "cube":
+        from cube_constructor import CubeArrangement
+        kind, cubes, views = job
+        cube_arr = CubeArrangement(cubes, grid=True, ticks=True)
+        results = []
+        for path, view, flip, rot in views:
+            if view != None:
+                cube_arr.set_view(view=view, flip=flip, rot=rot)
+            results.append(save_figure(cube_arr.fig, path, dpi=300, bbox_inches='tight', pad_inches=0))
+        return results
+
+    raise ValueError(f"Unknown render job {job[0]}.")
+
+def serve(address=SERVICE_ADDRESS, authkey=SERVICE_AUTHKEY):
+    """
+    Runs the renderer service: warms matplotlib once, then serves render jobs from any number of local clients.
+
+    Parameters:
+        address (tuple, optional): The (host, port) to listen on. Defaults to SERVICE_ADDRESS.
+        authkey (bytes, optional): The key clients must present. Defaults to SERVICE_AUTHKEY.
+
+    Returns:
+        None
+    """
+
+    warm_up()
+
+    # pyplot is not thread-safe, so jobs from concurrent clients are rendered one at a time.
+    render_lock = threading.Lock()
+
+    def handle(connection):
+        """
+        Serves the jobs of a single client until it disconnects.
+
+        Parameters:
+            connection (multiprocessing.connection.Connection): The client connection.
+
+        Returns:
+            None
+        """
+
+        with connection:
+            while True:
+                try:
+                    job = connection.recv()
+                except EOFError:
+                    return
+                try:
+                    with render_lock:
+                        connection.send(("ok", render_job(job)))
+                except Exception as error:
+                    connection.send(("error", repr(error)))
+
+    with Listener(address, authkey=authkey) as listener:
+        while True:
+            connection = listener.accept()
+            threading.Thread(target=handle, args=(connection,), daemon=True).start()
+
+class RenderClient:
+    """
+    A class to submit render jobs to the renderer service.
+
+    Attributes:
+        connection (multiprocessing.connection.Connection): The connection to the service.
+        lock (threading.Lock): Keeps jobs from different threads of one app instance from interleaving.
+    """
+
+    def __init__(self, address=SERVICE_ADDRESS, authkey=SERVICE_AUTHKEY):
+        """
+        Connects to a running renderer service.
+
+        Parameters:
+            address (tuple, optional): The (host, port) of the service. Defaults to SERVICE_ADDRESS.
+            authkey (bytes, optional): The key of the service. Defaults to SERVICE_AUTHKEY.
+
+        Returns:
+            None
+        """
+
+        self.connection = Client(address, authkey=authkey)
+        self.lock = threading.Lock()
+
+        return
+
+    @classmethod
+    def connect_or_start(cls, timeout=30):
+        """
+        Connects to the renderer service, starting it as a detached process first if none is running.
+
+        Parameters:
+            timeout (float, optional): Seconds to wait for a freshly started service. Defaults to 30.
+
+        Returns:
+            RenderClient: A connected client.
+        """
+
+        try:
+            return cls()
+        except ConnectionRefusedError:
+            pass
+
+        # Start the service in its own session so it outlives this app instance.
+        subprocess.Popen([sys.executable, os.path.abspath(__file__)], cwd=os.path.dirname(os.path.abspath(__file__)),
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+        # Poll until the service accepts connections.
+        deadline = time.time() + timeout
+        while True:
+            try:
+                return cls()
+            except ConnectionRefusedError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.2)
+
+    def submit(self, job):
+        """
+        Sends a job to the service and waits for its result.
+
+        Parameters:
+            job (tuple): The job description, see render_job().
+
+        Returns:
+            The job result.
+        """
+
+        with self.lock:
+            self.connection.send(job)
+            status, result = self.connection.recv()
+        if status != "ok":
+            raise RuntimeError(f"Render job failed: {result}")
+
+        return result
+
+    def render_ans(self, points_l, points_r, path=None):
+        """
+        Renders an ANS image with the given dots.
+
+        Parameters:
+            points_l (list): Points (x, y) inside the left ellipse.
+            points_r (list): Points (x, y) inside the right ellipse.
+            path (str, optional): Destination path of the image. Defaults to None, returning the PNG bytes.
+
+        Returns:
+            str or bytes: The path of the image, or its PNG bytes.
+        """
+
+        # The service runs in its own working directory, so send absolute paths.
+        if path != None:
+            self.submit(("ans", points_l, points_r, os.path.abspath(path)))
+            return path
+
+        return self.submit(("ans", points_l, points_r, path))
+
+    def render_cube(self, cubes, views):
+        """
+        Renders several views of one cube arrangement.
+
+        Parameters:
+            cubes (np.ndarray): The cube colors, as used by cube_constructor.CubeArrangement.
+            views (list of tuple): The (path, view, flip, rot) of each image, a view of None keeps the initial view.
+
+        Returns:
+            list: The path or PNG bytes of each image.
+        """
+
+        # The service runs in its own working directory, so send absolute paths.
+        absolute_views = [(os.path.abspath(path) if path != None else None, view, flip, rot) for path, view, flip, rot in views]
+        results = self.submit(("cube", cubes, absolute_views))
+
+        return [path if path != None else result for (path, view, flip, rot), result in zip(views, results)]
+
+    def close(self):
+        """
+        Disconnects from the service, which keeps running for other clients.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        self.connection.close()
+
+        return
+
+# Run the service when started as a script.
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,316 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from startup_profile import startup_profile
+from score_index import get_score_index
+from score_sketch import ScoreSketch
+import threading
+import time
+
+class ResultsBackend:
+    """
+    The interface of a results backend: where get_result() stores each test's results, and what it ranks scores against.
+
+    Submissions reach a backend through the outbox, which calls send_batch() with every submission due, so backends able to ingest batches receive them in one request.
+
+    Implementations:
+        GoogleFormsBackend: The Google Forms and Sheets of the original application.
+        CollectorBackend: The collector service of collector_service.py, e.g. run on localhost.
+    """
+
+    def send(self, test, payload):
+        """
+        Stores the results of one test.
+
+        Parameters:
+            test (str): The name of the test, e.g. "ANS".
+            payload (dict): The fields to store, including the "submission_id" idempotency key.
+
+        Returns:
+            bool: True once the backend has accepted them.
+        """
+
+        raise NotImplementedError
+
+    def send_batch(self, submissions):
+        """
+        Stores several submissions, one send() each unless the backend can ingest them together.
+
+        Parameters:
+            submissions (list): The (test, payload) of each submission.
+
+        Returns:
+            list: Whether each submission has been accepted, in order.
+        """
+
+        return [self.send(test, payload) for test, payload in submissions]
+
+    def prefetch(self):
+        """
+        Starts loading what percentile_rank() needs, e.g. while the participant fills in the consent and info forms.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        return
+
+    def distribution(self, test):
+        """
+        Returns the distribution of every score the backend holds for a test, used as the baseline of the score sketches (see score_sketch.SketchStore).
+
+        Parameters:
+            test (str): The name of the test.
+
+        Returns:
+            ScoreSketch or None: The distribution, as an exact histogram, None if the backend cannot provide one.
+        """
+
+        return None
+
+    def percentile_rank(self, test, score):
+        """
+        Ranks a score against the stored results of a test.
+
+        Parameters:
+            test (str): The name of the test.
+            score (int): The participant's total score.
+
+        Returns:
+            tuple: The percentile rank (None if no score is available), and whether it was calculated from stale data after the backend could not be reached.
+        """
+
+        raise NotImplementedError
+
+class GoogleFormsBackend(ResultsBackend):
+    """
+    A results backend submitting to Google Forms and ranking against the forms' response sheets.
+
+    The sheets are pulled incrementally into the local mirror (see sheet_mirror.py), and their scores are kept in sorted indexes (see score_index.py).
+
+    Attributes:
+        forms (dict): The Google Form ID of each test.
+        sheets (dict): The response sheet ID of each test.
+        mirror_path (str): Path of the mirror database.
+        retries (int): Number of further attempts when a sheet cannot be fetched or holds no scores yet.
+        retry_delay (float): Delay in seconds before the first retry, doubled for each further one.
+        prefetch_timeout (float): Longest wait in seconds for a test's launch snapshot before ranking.
+    """
+
+    def __init__(self, forms, sheets, mirror_path, retries=3, retry_delay=2, prefetch_timeout=60):
+        """
+        Initializes the backend.
+
+        Parameters:
+            forms (dict): The Google Form ID of each test.
+            sheets (dict): The response sheet ID of each test.
+            mirror_path (str): Path of the mirror database.
+            retries (int, optional): Number of further attempts when a sheet cannot be fetched or holds no scores yet. Defaults to 3.
+            retry_delay (float, optional): Delay in seconds before the first retry. Defaults to 2.
+            prefetch_timeout (float, optional): Longest wait in seconds for a test's launch snapshot. Defaults to 60.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.forms = forms
+        self.sheets = sheets
+        self.mirror_path = mirror_path
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.prefetch_timeout = prefetch_timeout
+        self._prefetches = {}
+
+        return
+
+    def send(self, test, payload):
+        """
+        Submits the results of one test to its Google Form, see ResultsBackend.send().
+        """
+
+        # Submissions queued by earlier versions of the outbox are addressed by form ID rather than test name.
+        form_id = self.forms.get(test, test)
+
+        return startup_profile.import_module("data_interaction").send_data(payload, form_id)
+
+    def refresh(self, test):
+        """
+        Pulls the rows appended to a test's response sheet since the last sync into the mirror, and adds their scores to the sheet's score index.
+
+        Parameters:
+            test (str): The name of the test.
+
+        Returns:
+            ScoreIndex: The sheet's updated score index.
+        """
+
+        get_rows = startup_profile.import_module("data_interaction").get_rows
+        mirror = startup_profile.import_module("sheet_mirror").open_mirror(self.mirror_path)
+        index = get_score_index(self.sheets[test])
+
+        mirror.sync(test, self.sheets[test], get_rows)
+        index.update(mirror.scores(test))
+
+        return index
+
+    def prefetch(self):
+        """
+        Downloads the response sheets concurrently, so each result screen only needs a delta refresh.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        executor = ThreadPoolExecutor(max_workers=len(self.sheets), thread_name_prefix="sheet-prefetch")
+        for test in self.sheets:
+            self._prefetches[test] = executor.submit(self.refresh, test)
+        executor.shutdown(wait=False)
+
+        return
+
+    def wait_prefetch(self, test):
+        """
+        Lets the launch snapshot of a test's response sheet finish, so a refresh is then only a delta.
+
+        Parameters:
+            test (str): The name of the test.
+
+        Returns:
+            None
+        """
+
+        if test in self._prefetches:
+            try:
+                self._prefetches[test].result(timeout=self.prefetch_timeout)
+            except Exception as error:
+                print(f"Prefetching scores from {self.sheets[test]} failed: {error!r}")
+
+        return
+
+    def distribution(self, test):
+        """
+        Returns the distribution of the scores in the test's response sheet, see ResultsBackend.distribution().
+        """
+
+        self.wait_prefetch(test)
+        self.refresh(test)
+        scores = startup_profile.import_module("sheet_mirror").open_mirror(self.mirror_path).scores(test)
+
+        return ScoreSketch(test, "sheet", 1, Counter(int(score) for score in scores))
+
+    def percentile_rank(self, test, score):
+        """
+        Ranks a score against the test's response sheet, see ResultsBackend.percentile_rank().
+        """
+
+        self.wait_prefetch(test)
+
+        for attempt in range(self.retries+1):
+            if attempt != 0:
+                time.sleep(self.retry_delay*2**(attempt-1))
+
+            # Pull the rows appended to the sheet since the last sync.
+            try:
+                index = self.refresh(test)
+            except Exception as error:
+                print(f"Fetching scores from {self.sheets[test]} failed: {error!r}")
+                continue
+
+            # The sheet may not have received any response yet.
+            if len(index) != 0:
+                return index.percentile_rank(score), False
+
+        # Fall back on the scores mirrored before, possibly in an earlier run.
+        index = get_score_index(self.sheets[test])
+        index.update(startup_profile.import_module("sheet_mirror").open_mirror(self.mirror_path).scores(test))
+        if len(index) != 0:
+            return index.percentile_rank(score), True
+
+        return None, False
+
+class CollectorBackend(ResultsBackend):
+    """
+    A results backend sending batched JSON submissions to a collector service (see collector_service.py) and ranking against the score distributions it serves.
+
+    The distributions are also the baselines of the score sketches, so results shown straight away are ranked against the collector's scores, plus those recorded locally since the last download.
+
+    Attributes:
+        url (str): Base URL of the collector, e.g. "http://127.0.0.1:8770".
+        distributions (dict): The last score distribution received for each test, as a ScoreSketch, used when the collector cannot be reached.
+    """
+
+    def __init__(self, url):
+        """
+        Initializes the backend.
+
+        Parameters:
+            url (str): Base URL of the collector.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.url = url.rstrip("/")
+        self.distributions = {}
+        self._lock = threading.Lock()
+
+        return
+
+    def send(self, test, payload):
+        """
+        Sends the results of one test as a batch of one, see ResultsBackend.send().
+        """
+
+        return self.send_batch([(test, payload)])[0]
+
+    def send_batch(self, submissions):
+        """
+        Sends several submissions in a single request, see ResultsBackend.send_batch().
+        """
+
+        session = startup_profile.import_module("data_interaction").session
+        body = {"submissions":[{"test":test, "submission_id":payload.get("submission_id"), "payload":payload} for test, payload in submissions]}
+        response = session.post(f"{self.url}/submissions", json=body, timeout=30)
+        response.raise_for_status()
+        accepted = set(response.json()["accepted"])
+
+        return [payload.get("submission_id") in accepted for test, payload in submissions]
+
+    def distribution(self, test):
+        """
+        Downloads the distribution of the scores the collector holds for a test, see ResultsBackend.distribution().
+        It is also kept to rank against when the collector cannot be reached.
+        """
+
+        session = startup_profile.import_module("data_interaction").session
+        response = session.get(f"{self.url}/distribution", params={"test":test}, timeout=30)
+        response.raise_for_status()
+        sketch = ScoreSketch.from_dict(response.json())
+        with self._lock:
+            self.distributions[test] = sketch
+
+        return sketch
+
+    def percentile_rank(self, test, score):
+        """
+        Ranks a score against the test's distribution on the collector, or the last one received if it cannot be reached, see ResultsBackend.percentile_rank().
+        """
+
+        try:
+            sketch, stale = self.distribution(test), False
+        except Exception as error:
+            print(f"Fetching the {test} distribution from {self.url} failed: {error!r}")
+            with self._lock:
+                sketch, stale = self.distributions.get(test), True
+
+        if sketch == None or sketch.n == 0:
+            return None, False
+
+        return sketch.percentile_rank(score)[0], stale
@@ -0,0 +1,98 @@
+import numpy as np
+import threading
+import time
+
+class ScoreIndex:
+    """
+    A class to hold the scores of one test sorted in memory, so a percentile rank is a binary search rather than a scan of the whole sheet.
+
+    The response sheets only grow, so each update inserts just the scores appended since the previous one.
+    The index keeps its last contents when a refresh fails, and can still answer from them (stale data) rather than leaving the participant without a rank.
+
+    Attributes:
+        scores (np.ndarray): The scores seen so far, sorted in ascending order.
+        rows (int): Number of sheet rows the index has seen.
+        updated (float or None): time.time() of the last successful update, None before the first one.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty index.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.scores = np.empty(0, dtype=int)
+        self.rows = 0
+        self.updated = None
+        self._lock = threading.Lock()
+
+        return
+
+    def update(self, scores):
+        """
+        Brings the index up to date with the scores column of the sheet.
+
+        Parameters:
+            scores (list): Every score in the sheet, in row order.
+
+        Returns:
+            int: Number of scores inserted.
+        """
+
+        with self._lock:
+
+            # Rows have been removed from the sheet, rebuild the index from scratch.
+            if len(scores) < self.rows:
+                self.scores = np.empty(0, dtype=int)
+                self.rows = 0
+
+            new = np.sort(np.asarray(scores[self.rows:], dtype=float).astype(int))
+            self.scores = np.insert(self.scores, np.searchsorted(self.scores, new), new)
+            self.rows = len(scores)
+            self.updated = time.time()
+
+        return len(new)
+
+    def percentile_rank(self, score):
+        """
+        Calculates the share of scores strictly lower than a score.
+
+        Parameters:
+            score (int): The participant's score.
+
+        Returns:
+            float: The percentile rank, between 0 and 100.
+        """
+
+        with self._lock:
+            return np.searchsorted(self.scores, score, side="left")/len(self.scores)*100
+
+    def __len__(self):
+        return len(self.scores)
+
+# Score index of each response sheet, by sheet ID.
+score_indexes = {}
+score_indexes_lock = threading.Lock()
+
+def get_score_index(sheet_id):
+    """
+    Returns the score index of a response sheet, creating it on first use.
+
+    Parameters:
+        sheet_id (str): The ID of the Google Sheet.
+
+    Returns:
+        ScoreIndex: The index.
+    """
+
+    with score_indexes_lock:
+        if sheet_id not in score_indexes:
+            score_indexes[sheet_id] = ScoreIndex()
+
+        return score_indexes[sheet_id]
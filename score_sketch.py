@@ -0,0 +1,325 @@
+import argparse
+import threading
+import json
+import glob
+import time
+import os
+
+# Bumped whenever the sketch file format changes, files of other versions are ignored.
+SKETCH_VERSION = 1
+
+class ScoreSketch:
+    """
+    A class to summarize the score distribution of one test at one site as a histogram.
+
+    Scores are small integers, so with bins of width 1 the histogram is exact. Two sketches are merged by adding their counts, whatever order sites publish in.
+    Wider bins (e.g. for times) trade accuracy for size: a percentile rank is then only known up to the share of scores falling in the same bin, which percentile_rank() reports as its error bound.
+
+    Attributes:
+        test (str): The name of the test, e.g. "ANS".
+        site (str): The site whose participants the sketch counts.
+        bin_width (float): Width of the histogram bins.
+        counts (dict): The number of scores in each bin, by bin index.
+        n (int): The number of scores counted.
+        since (float): time.time() from which the sketch counts scores, those recorded before are counted by the baseline it follows (see SketchStore). 0 for a sketch following no baseline.
+    """
+
+    def __init__(self, test, site, bin_width=1, counts=None, since=0):
+        """
+        Initializes a sketch.
+
+        Parameters:
+            test (str): The name of the test.
+            site (str): The site whose participants the sketch counts.
+            bin_width (float, optional): Width of the histogram bins. Defaults to 1, exact for integer scores.
+            counts (dict, optional): Initial count of each bin index. Defaults to None, an empty sketch.
+            since (float, optional): time.time() from which the sketch counts scores. Defaults to 0, following no baseline.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.test = test
+        self.site = site
+        self.bin_width = bin_width
+        self.counts = dict(counts or {})
+        self.n = sum(self.counts.values())
+        self.since = since
+
+        return
+
+    def add(self, score, count=1):
+        """
+        Counts a score.
+
+        Parameters:
+            score (float): The score.
+            count (int, optional): Number of times to count it. Defaults to 1.
+
+        Returns:
+            None
+        """
+
+        key = int(score//self.bin_width)
+        self.counts[key] = self.counts.get(key, 0)+count
+        self.n += count
+
+        return
+
+    def merge(self, other):
+        """
+        Adds the counts of another sketch of the same test and bin width.
+
+        Parameters:
+            other (ScoreSketch): The sketch to merge in.
+
+        Returns:
+            None
+        """
+
+        if other.bin_width != self.bin_width:
+            raise ValueError(f"Cannot merge sketches with bin widths {self.bin_width} and {other.bin_width}.")
+
+        for key, count in other.counts.items():
+            self.counts[key] = self.counts.get(key, 0)+count
+        self.n += other.n
+
+        return
+
+    def percentile_rank(self, score):
+        """
+        Estimates the share of scores strictly lower than a score.
+
+        Parameters:
+            score (float): The participant's score.
+
+        Returns:
+            tuple: The percentile rank, between 0 and 100, and its error bound in percentage points (0 when the score falls on a bin edge, as integer scores do with bins of width 1).
+        """
+
+        key = score/self.bin_width
+        below = sum(count for bin_key, count in self.counts.items() if bin_key < key//1)
+        same_bin = self.counts.get(int(key//1), 0) if key%1 != 0 else 0
+
+        return below/self.n*100, same_bin/self.n*100
+
+    def to_dict(self):
+        """
+        Serializes the sketch for storage or publication.
+
+        Parameters:
+            None
+
+        Returns:
+            dict: The sketch's fields, with the format version.
+        """
+
+        return {"version":SKETCH_VERSION, "test":self.test, "site":self.site, "bin_width":self.bin_width, "since":self.since, "counts":{str(key):count for key, count in sorted(self.counts.items())}}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuilds a sketch serialized by to_dict().
+
+        Parameters:
+            data (dict): The serialized sketch.
+
+        Returns:
+            ScoreSketch: The sketch.
+        """
+
+        return cls(data["test"], data["site"], data["bin_width"], {int(key):count for key, count in data["counts"].items()}, data.get("since", 0))
+
+class SketchStore:
+    """
+    A class to keep the score sketches of every test and site in a directory, one JSON file per test and site.
+
+    The local site's sketches are updated as participants finish tests. Sketches published by other sites are copied into the same directory, and the latest file of each site replaces its previous one, so re-importing a site never counts its participants twice.
+
+    Each test's ranking starts from a baseline: the distribution of every score the results backend holds, e.g. the response sheet's history (see results_backend.ResultsBackend.distribution()), kept in the "baseline" subdirectory.
+    Site sketches only count the scores recorded since that baseline was taken, so a score is never counted both in the baseline and in a sketch. Scores recorded while the baseline was being downloaded, or still queued in the outbox, are left out until the next baseline includes them.
+
+    Attributes:
+        directory (str): The directory holding the sketch files.
+        site (str): The local site.
+        sketches (dict): The sketch of each site, by test name then site.
+        baselines (dict): The baseline sketch of each test.
+    """
+
+    def __init__(self, directory, site):
+        """
+        Initializes the store and loads the sketches found in its directory.
+
+        Parameters:
+            directory (str): The directory holding the sketch files, created if needed.
+            site (str): The local site.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.directory = directory
+        self.site = site
+        self.sketches = {}
+        self.baselines = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(directory, "baseline"), exist_ok=True)
+        self.load()
+
+        return
+
+    def load(self):
+        """
+        Loads (again) every sketch file in the directory, e.g. after other sites have published theirs.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.json"))+glob.glob(os.path.join(self.directory, "baseline", "*.json"))):
+            try:
+                with open(path) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            if data.get("version") != SKETCH_VERSION:
+                continue
+            if os.path.basename(os.path.dirname(path)) == "baseline":
+                with self._lock:
+                    self.baselines[data["test"]] = ScoreSketch.from_dict(data)
+            else:
+                self.merge(ScoreSketch.from_dict(data), save=False)
+
+        return
+
+    def merge(self, sketch, save=True):
+        """
+        Takes in a sketch published by a site, replacing that site's previous sketch of the test.
+
+        Parameters:
+            sketch (ScoreSketch): The published sketch.
+            save (bool, optional): Writes it to the directory. Defaults to True.
+
+        Returns:
+            None
+        """
+
+        with self._lock:
+            self.sketches.setdefault(sketch.test, {})[sketch.site] = sketch
+        if save:
+            self.save(sketch)
+
+        return
+
+    def add(self, test, score):
+        """
+        Counts a local participant's score and saves the local sketch.
+
+        Parameters:
+            test (str): The name of the test.
+            score (float): The participant's score.
+
+        Returns:
+            None
+        """
+
+        with self._lock:
+            sites = self.sketches.setdefault(test, {})
+            if self.site not in sites:
+                sites[self.site] = ScoreSketch(test, self.site, since=self.baselines[test].since if test in self.baselines else 0)
+            sites[self.site].add(score)
+        self.save(sites[self.site])
+
+        return
+
+    def set_baseline(self, sketch):
+        """
+        Replaces a test's baseline with a fresh distribution from the results backend, and restarts the local site's sketch from it.
+
+        Parameters:
+            sketch (ScoreSketch): The distribution of every score the backend holds for the test.
+
+        Returns:
+            None
+        """
+
+        # Scores recorded from now on are not in the baseline, those recorded before are once they have been sent.
+        with self._lock:
+            sketch.since = time.time()
+            self.baselines[sketch.test] = sketch
+            local = self.sketches.setdefault(sketch.test, {})[self.site] = ScoreSketch(sketch.test, self.site, sketch.bin_width, since=sketch.since)
+        self.save(sketch, os.path.join(self.directory, "baseline", f"{sketch.test}.json"))
+        self.save(local)
+
+        return
+
+    def save(self, sketch, path=None):
+        """
+        Writes a sketch to the directory atomically.
+
+        Parameters:
+            sketch (ScoreSketch): The sketch.
+            path (str, optional): Destination path. Defaults to None, "<test>_<site>.json" in the directory.
+
+        Returns:
+            None
+        """
+
+        with self._lock:
+            path = path or os.path.join(self.directory, f"{sketch.test}_{sketch.site}.json")
+            with open(path+".tmp", "w") as file:
+                json.dump(sketch.to_dict(), file)
+            os.replace(path+".tmp", path)
+
+        return
+
+    def combined(self, test):
+        """
+        Merges a test's baseline with the sketches of every site counting from it.
+
+        Parameters:
+            test (str): The name of the test.
+
+        Returns:
+            ScoreSketch or None: The merged sketch, None until the test has a baseline, or if no score has been counted yet.
+        """
+
+        with self._lock:
+            if test not in self.baselines:
+                return None
+            baseline = self.baselines[test]
+
+            # Sketches started before the baseline may count scores it already holds, they are left out until their site restarts them.
+            sketches = [baseline]+[sketch for sketch in self.sketches.get(test, {}).values() if sketch.since >= baseline.since]
+        if sum(sketch.n for sketch in sketches) == 0:
+            return None
+
+        combined = ScoreSketch(test, "all", sketches[0].bin_width)
+        for sketch in sketches:
+            combined.merge(sketch)
+
+        return combined
+
+# Import published sketches or show the merged distributions when started as a script.
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Merge score sketches published by other sites and show the combined distributions of the tests with a baseline.")
+    parser.add_argument("--directory", default="./Data/sketches", help="Directory holding the sketch files.")
+    parser.add_argument("--import", dest="imports", nargs="*", default=[], metavar="FILE", help="Sketch files published by other sites to merge in.")
+    args = parser.parse_args()
+
+    store = SketchStore(args.directory, site="local")
+    for path in args.imports:
+        with open(path) as file:
+            store.merge(ScoreSketch.from_dict(json.load(file)))
+
+    for test in sorted(set(store.sketches)|set(store.baselines)):
+        combined = store.combined(test)
+        if combined != None:
+            print(f"{test}: {combined.n} scores from the baseline and {len(store.sketches.get(test, {}))} sites, histogram {dict(sorted(combined.counts.items()))}")
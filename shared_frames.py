@@ -0,0 +1,222 @@
+from multiprocessing import shared_memory, resource_tracker
+import multiprocessing
+import numpy as np
+
+class SharedFrame:
+    """
+    A class to represent a rendered RGBA frame living in a multiprocessing shared memory block.
+
+    The process that creates a frame (a generator worker) hands it over through its picklable handle.
+    The process that attaches to it (the GUI) owns the block and must release it once the frame is no longer displayed.
+
+    Attributes:
+        name (str): The name of the shared memory block.
+        shape (tuple): The (height, width, channels) shape of the frame.
+        dtype (str): The NumPy dtype of the frame's pixels.
+        released (bool): Indicates whether the block has already been freed.
+    """
+
+    def __init__(self, shm, shape, dtype="uint8"):
+        """
+        Wraps an existing shared memory block. Use create() or attach() instead of calling this directly.
+
+        Parameters:
+            shm (shared_memory.SharedMemory): The shared memory block holding the pixels.
+            shape (tuple): The (height, width, channels) shape of the frame.
+            dtype (str, optional): The NumPy dtype of the pixels. Defaults to "uint8".
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self._shm = shm
+        self.name = shm.name
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.released = False
+
+        return
+
+    @classmethod
+    def create(cls, shape, dtype="uint8"):
+        """
+        Allocates a new shared memory block large enough for a frame of the given shape.
+
+        Parameters:
+            shape (tuple): The (height, width, channels) shape of the frame.
+            dtype (str, optional): The NumPy dtype of the pixels. Defaults to "uint8".
+
+        Returns:
+            SharedFrame: The newly allocated frame.
+        """
+
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        return cls(shared_memory.SharedMemory(create=True, size=size), shape, dtype)
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        Attaches to a frame created in another process and takes over ownership of its block.
+
+        Parameters:
+            handle (tuple): The (name, shape, dtype) handle returned by the creating process.
+
+        Returns:
+            SharedFrame: The attached frame.
+        """
+
+        name, shape, dtype = handle
+        return cls(shared_memory.SharedMemory(name=name), shape, dtype)
+
+    @property
+    def handle(self):
+        """
+        Picklable description of the frame, sent from the worker to the GUI process.
+
+        Returns:
+            tuple: The (name, shape, dtype) of the frame.
+        """
+
+        return (self.name, self.shape, self.dtype)
+
+    @property
+    def array(self):
+        """
+        NumPy view of the frame's pixels, backed directly by the shared memory block.
+
+        Returns:
+            np.ndarray: The pixel array (no copy is made).
+        """
+
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)
+
+    def to_image(self):
+        """
+        Wraps the frame as a PIL image sharing the same memory.
+
+        The image must be discarded (or copied, e.g. by resize()) before the frame is released.
+
+        Parameters:
+            None
+
+        Returns:
+            PIL.Image.Image: An RGBA image backed by the shared memory block.
+        """
+
+        from PIL import Image
+        height, width = self.shape[:2]
+        return Image.frombuffer("RGBA", (width, height), self._shm.buf, "raw", "RGBA", 0, 1)
+
+    def hand_off(self):
+        """
+        Closes the worker's mapping without freeing the block, leaving its lifetime to the attaching process.
+
+        Parameters:
+            None
+
+        Returns:
+            tuple: The handle to send to the attaching process.
+        """
+
+        # Stop this process's resource tracker from unlinking the block when the worker exits.
+        resource_tracker.unregister(self._shm._name, "shared_memory")
+        self._shm.close()
+
+        return self.handle
+
+    def release(self):
+        """
+        Unmaps and frees the shared memory block. Calling it more than once has no effect.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        if self.released == False:
+            self.released = True
+            self._shm.close()
+            self._shm.unlink()
+
+        return
+
+def figure_to_shared_frame(fig):
+    """
+    Renders a matplotlib figure straight into a new shared memory frame.
+
+    Parameters:
+        fig (matplotlib.figure.Figure): The figure to render.
+
+    Returns:
+        SharedFrame: The frame holding the rendered RGBA pixels.
+    """
+
+    # Draw the figure with Agg and copy the pixels once, into shared memory.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+    pixels = np.asarray(canvas.buffer_rgba())
+    frame = SharedFrame.create(pixels.shape, pixels.dtype.str)
+    frame.array[:] = pixels
+
+    return frame
+
+def _render_job(job):
+    """
+    Worker entry point: calls the draw function, renders its figure into shared memory and hands the frame off.
+
+    Parameters:
+        job (tuple): The draw function and the arguments to call it with.
+
+    Returns:
+        tuple: The handle of the rendered frame.
+    """
+
+    import matplotlib.pyplot as plt
+    draw_function, args = job
+    fig = draw_function(*args)
+    frame = figure_to_shared_frame(fig)
+    plt.close(fig)
+
+    return frame.hand_off()
+
+def render_in_workers(draw_function, args_list, processes=None):
+    """
+    Renders figures in worker processes and returns them as shared memory frames owned by the calling process.
+
+    Parameters:
+        draw_function (callable): A module-level function returning a matplotlib figure.
+        args_list (list of tuple): The arguments for each figure to render.
+        processes (int, optional): Number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        frames (list): A list of SharedFrame objects in the same order as args_list.
+    """
+
+    # Spawn fresh interpreters so that workers never inherit the GUI's Tk state.
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes, initializer=_use_agg_backend) as pool:
+        handles = pool.map(_render_job, [(draw_function, args) for args in args_list])
+
+    frames = [SharedFrame.attach(handle) for handle in handles]
+
+    return frames
+
+def _use_agg_backend():
+    """
+    Worker initializer selecting the non-interactive Agg backend.
+
+    Parameters:
+        None
+
+    Returns:
+        None
+    """
+
+    import matplotlib
+    matplotlib.use("Agg")
+
+    return
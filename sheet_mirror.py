@@ -0,0 +1,274 @@
+import argparse
+import threading
+import sqlite3
+import json
+import time
+import os
+
+# Response sheet of each test.
+RESPONSE_SHEETS = {
+    "ANS":"19uvDxv2Vhb7-bVsUtOyiaTfbkiMAfMGp1R7FqhDixho",
+    "Math":"1QJy2MaWVaj95mrJ-kCtuIzV-2a1hcpL2N0a2yeb33-8",
+    "Memory":"1Gb0oRYE3iq47QvIrLnrEC7vypCDfn5QccEqoWORhNWs",
+    "SR":"1DBMUZZLjtrP1ZDCP7AH0vBK-nyn_AuGgGjFKrsik8M4",
+}
+
+# File name of each test's responses in the Report folders.
+REPORT_FILES = {
+    "ANS":"ANS_Response.csv",
+    "Math":"Math_Ability_Response.csv",
+    "Memory":"Memory_Response.csv",
+    "SR":"Spatial_Reasoning_Response.csv",
+}
+
+# Indexed columns, with the names earlier versions of the forms used for them.
+COLUMN_ALIASES = {
+    "user_id":["user_id", "id"],
+    "age":["age"],
+    "gender":["gender"],
+    "sports":["sports"],
+    "tiredness":["tiredness"],
+    "total_score":["total_score", "score"],
+    "total_time":["total_time"],
+}
+
+# Rows fetched again before the last synced one, so rows removed from the sheet cannot make a sync skip new ones.
+SYNC_OVERLAP = 20
+
+class SheetMirror:
+    """
+    A class to mirror the response sheets in a local SQLite database, as the single up-to-date source of responses for the app and the Report notebooks.
+
+    Each sync only pulls the rows after the last one seen. Rows are deduplicated on their timestamp and user ID, so overlapping pulls never add a row twice.
+    Responses are indexed by test, by user and by demographics (gender, age, sports, tiredness), while the full row is kept as JSON for the notebooks.
+
+    Attributes:
+        path (str): Path of the SQLite database.
+    """
+
+    def __init__(self, path):
+        """
+        Opens the mirror, creating its database if needed.
+
+        Parameters:
+            path (str): Path of the SQLite database, its directory is created if needed.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.path = path
+        self._lock = threading.Lock()
+
+        # A single connection shared by the threads using the mirror, serialized by the lock.
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""CREATE TABLE IF NOT EXISTS responses (
+            test TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            age INTEGER,
+            gender TEXT,
+            sports TEXT,
+            tiredness INTEGER,
+            total_score REAL,
+            total_time REAL,
+            row TEXT NOT NULL,
+            PRIMARY KEY (test, timestamp, user_id)
+        )""")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_user ON responses (user_id, test)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_demographics ON responses (test, gender, age, sports, tiredness)")
+        self._connection.execute("""CREATE TABLE IF NOT EXISTS sync_state (
+            test TEXT PRIMARY KEY,
+            sheet_id TEXT NOT NULL,
+            rows INTEGER NOT NULL,
+            synced REAL NOT NULL
+        )""")
+
+        return
+
+    def sync(self, test, sheet_id, get_rows):
+        """
+        Pulls the rows added to a test's response sheet since the last sync.
+
+        Parameters:
+            test (str): The name of the test, e.g. "ANS".
+            sheet_id (str): The ID of its response sheet.
+            get_rows (callable): Fetches rows from an offset, see data_interaction.get_rows().
+
+        Returns:
+            int: Number of new responses stored.
+        """
+
+        with self._lock:
+            state = self._connection.execute("SELECT sheet_id, rows FROM sync_state WHERE test = ?", (test,)).fetchone()
+
+        # Start over if the test has moved to another sheet.
+        offset = max(0, state[1]-SYNC_OVERLAP) if state != None and state[0] == sheet_id else 0
+        rows = get_rows(sheet_id, offset)
+
+        with self._lock:
+            before = self._connection.execute("SELECT COUNT(*) FROM responses WHERE test = ?", (test,)).fetchone()[0]
+            self._connection.execute("BEGIN")
+            self._connection.executemany("INSERT OR IGNORE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [self._record(test, row) for row in rows if len(row) != 0])
+            self._connection.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)", (test, sheet_id, offset+len(rows), time.time()))
+            self._connection.execute("COMMIT")
+
+            return self._connection.execute("SELECT COUNT(*) FROM responses WHERE test = ?", (test,)).fetchone()[0]-before
+
+    def _record(self, test, row):
+        """
+        Extracts the indexed columns of a sheet row.
+
+        Parameters:
+            test (str): The name of the test.
+            row (dict): The row, by column name. Its first column is the form's timestamp, whose name depends on the form's language.
+
+        Returns:
+            tuple: The values of a responses table row.
+        """
+
+        values = {}
+        for column, aliases in COLUMN_ALIASES.items():
+            values[column] = next((row[alias] for alias in aliases if alias in row and row[alias] != ""), None)
+
+        return (
+            test,
+            next(iter(row.values())),
+            values["user_id"] or "",
+            number(values["age"], int),
+            values["gender"],
+            values["sports"],
+            number(values["tiredness"], int),
+            number(values["total_score"], float),
+            number(values["total_time"], float),
+            json.dumps(row),
+        )
+
+    def scores(self, test):
+        """
+        Returns the scores of a test in the order they were stored, so new scores are always appended.
+
+        Parameters:
+            test (str): The name of the test.
+
+        Returns:
+            list: The total scores.
+        """
+
+        with self._lock:
+            rows = self._connection.execute("SELECT total_score FROM responses WHERE test = ? AND total_score IS NOT NULL ORDER BY rowid", (test,)).fetchall()
+
+        return [score for score, in rows]
+
+    def responses(self, test=None, **filters):
+        """
+        Queries the stored responses, e.g. responses("ANS", gender="Female") or responses(user_id="RLVB").
+
+        Parameters:
+            test (str, optional): The name of the test. Defaults to None, every test.
+            **filters: Required values of the indexed columns (user_id, age, gender, sports, tiredness).
+
+        Returns:
+            pd.DataFrame: The full sheet rows, with a "test" column.
+        """
+
+        import pandas as pd
+
+        conditions = {"test":test}|filters if test != None else filters
+        for column in conditions:
+            if column not in COLUMN_ALIASES and column != "test":
+                raise ValueError(f"{column} is not an indexed column.")
+        where = " AND ".join(f"{column} = ?" for column in conditions) or "1"
+
+        with self._lock:
+            rows = self._connection.execute(f"SELECT test, row FROM responses WHERE {where} ORDER BY rowid", tuple(conditions.values())).fetchall()
+
+        return pd.DataFrame([{"test":row_test}|json.loads(row) for row_test, row in rows])
+
+    def export(self, test, path):
+        """
+        Writes a test's responses as a CSV file laid out like the sheet, e.g. for the Report notebooks.
+
+        Parameters:
+            test (str): The name of the test.
+            path (str): Destination path.
+
+        Returns:
+            None
+        """
+
+        self.responses(test).drop(columns="test").to_csv(path, index=False)
+
+        return
+
+    def close(self):
+        """
+        Closes the database.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        with self._lock:
+            self._connection.close()
+
+        return
+
+def number(value, kind):
+    """
+    Converts a sheet value to a number, leaving blanks and malformed values out.
+
+    Parameters:
+        value (str or None): The value as text.
+        kind (type): int or float.
+
+    Returns:
+        int, float or None: The number, None if the value is not one.
+    """
+
+    try:
+        return kind(float(value))
+    except (TypeError, ValueError):
+        return None
+
+# Open mirrors, by path.
+mirrors = {}
+mirrors_lock = threading.Lock()
+
+def open_mirror(path="./Data/mirror.sqlite3"):
+    """
+    Returns the mirror stored at a path, opening it on first use.
+
+    Parameters:
+        path (str, optional): Path of the SQLite database. Defaults to "./Data/mirror.sqlite3".
+
+    Returns:
+        SheetMirror: The mirror.
+    """
+
+    with mirrors_lock:
+        if path not in mirrors:
+            mirrors[path] = SheetMirror(path)
+
+        return mirrors[path]
+
+# Sync the mirror, and optionally export it for the Report notebooks, when started as a script.
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Sync the local mirror of the response sheets.")
+    parser.add_argument("--mirror", default="./Data/mirror.sqlite3", help="Path of the mirror database.")
+    parser.add_argument("--export", default=None, metavar="DIRECTORY", help="Write each test's responses as the CSV files read by the Report notebooks.")
+    args = parser.parse_args()
+
+    from data_interaction import get_rows
+    mirror = open_mirror(args.mirror)
+    for test, sheet_id in RESPONSE_SHEETS.items():
+        print(f"{test}: {mirror.sync(test, sheet_id, get_rows)} new responses, {len(mirror.scores(test))} in total")
+        if args.export != None:
+            mirror.export(test, os.path.join(args.export, REPORT_FILES[test]))
@@ -0,0 +1,348 @@
+import tkinter as tk
+import numpy as np
+import argparse
+import time
+from question_constructor import Question, ANSQuestion, MathQuestion, MemoryQuestion, SpatialReasoningQuestion
+from ANSQuestion_generator import ANSQuestion_bank
+from MathQuestion_generator import MathQuestion_bank
+from MemoryQuestion_generator import MemoryQuestion_bank
+from SRQuestion_generator import SRQuestion_bank
+from submission_codec import NullRenderer, compact_payload, score_questions
+from stimulus_timing import set_clock
+
+# Countdown, gap between questions and timer refresh of each test, as run by main.py and test_runner.TestRunner.
+COUNTDOWN_MS = 5000
+REFRESH_MS = 50
+GAP_MS = {"ANS":1500, "Math":0, "Memory":0, "SR":0}
+
+class VirtualClock:
+    """
+    A class to simulate the session clock, advancing only when told to, so sessions run far faster than real time.
+
+    Attributes:
+        time (int): The current time in nanoseconds.
+    """
+
+    def __init__(self):
+        """
+        Initializes the clock at 0.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        self.time = 0
+
+        return
+
+    def now(self):
+        """
+        Reads the clock, for use with stimulus_timing.set_clock().
+
+        Parameters:
+            None
+
+        Returns:
+            int: The current time in nanoseconds.
+        """
+
+        return self.time
+
+    def advance(self, ms):
+        """
+        Moves the clock forward.
+
+        Parameters:
+            ms (float): The time to move forward by, in milliseconds.
+
+        Returns:
+            None
+        """
+
+        self.time += int(ms*1_000_000)
+
+        return
+
+class SimulatedParticipant:
+    """
+    A class to represent a statistical participant, answering correctly with a fixed probability after a log-normally distributed response time.
+
+    Attributes:
+        rng (np.random.Generator): The participant's random number generator.
+        accuracy (float): The probability of a correct answer.
+        median_ms (float): The median response time in milliseconds.
+        sigma (float): The spread of the log response time.
+        details (dict): The participant details submitted with the results.
+    """
+
+    def __init__(self, rng, accuracy=0.8, median_ms=1200, sigma=0.4, user_id="SIM0"):
+        """
+        Initializes the participant.
+
+        Parameters:
+            rng (np.random.Generator): The participant's random number generator.
+            accuracy (float, optional): The probability of a correct answer. Defaults to 0.8.
+            median_ms (float, optional): The median response time in milliseconds. Defaults to 1200.
+            sigma (float, optional): The spread of the log response time. Defaults to 0.4.
+            user_id (str, optional): The participant's ID. Defaults to "SIM0".
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.rng = rng
+        self.accuracy = accuracy
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.details = {"consent":True, "user_id":user_id, "age":int(rng.integers(18, 70)), "gender":"Other", "sports":"Never(0 days per week)", "tiredness":int(rng.integers(1, 11))}
+
+        return
+
+    def respond(self, question):
+        """
+        Decides the participant's answer to a question and when it is given.
+
+        Parameters:
+            question (Question): The question, once fully displayed.
+
+        Returns:
+            tuple: The submission (None to let the question time out) and the response time in milliseconds.
+        """
+
+        # Screens without an answer, e.g. the Memory Test pictures, are left to time out.
+        if question.answer == None:
+            return None, None
+
+        response_ms = self.median_ms*np.exp(self.sigma*self.rng.standard_normal())
+        if self.rng.random() < self.accuracy:
+            return question.answer, response_ms
+
+        return self.wrong_answer(question), response_ms
+
+    def wrong_answer(self, question):
+        """
+        Picks an incorrect answer of the kind the question accepts.
+
+        Parameters:
+            question (Question): The question.
+
+        Returns:
+            str: An answer different from the correct one.
+        """
+
+        if isinstance(question, ANSQuestion):
+            choices = ["Left", "Right"]
+        elif isinstance(question, SpatialReasoningQuestion):
+            choices = ["a", "b", "c", "d"]
+        elif isinstance(question, MemoryQuestion):
+            choices = list(question.options)
+        else:
+            return question.answer+"0"
+
+        return str(self.rng.choice([choice for choice in choices if choice != question.answer]))
+
+class ScriptedParticipant:
+    """
+    A class to represent a participant giving a fixed sequence of answers, e.g. to reproduce a session exactly.
+
+    Attributes:
+        responses (list): The (submission, response time in milliseconds) for each question in display order, a submission of None lets the question time out.
+        details (dict): The participant details submitted with the results.
+    """
+
+    def __init__(self, responses, details=None):
+        """
+        Initializes the participant.
+
+        Parameters:
+            responses (list): The (submission, response time in milliseconds) for each question in display order.
+            details (dict, optional): The participant details submitted with the results. Defaults to None, using placeholder details.
+
+        Returns:
+            None
+        """
+
+        self.responses = list(responses)
+        self.details = details or {"consent":True, "user_id":"SCRP", "age":0, "gender":"Other", "sports":"Never(0 days per week)", "tiredness":0}
+
+        return
+
+    def respond(self, question):
+        """
+        Gives the next scripted answer.
+
+        Parameters:
+            question (Question): The question, once fully displayed.
+
+        Returns:
+            tuple: The submission and the response time in milliseconds.
+        """
+
+        if question.answer == None:
+            return None, None
+
+        return self.responses.pop(0)
+
+def build_banks(seed=60):
+    """
+    Builds the question banks of main.py without rendering any images.
+
+    Parameters:
+        seed (int, optional): The seed of the banks. Defaults to 60, as used by main.py.
+
+    Returns:
+        dict: The QuestionBank of each test.
+    """
+
+    return {
+        "ANS":ANSQuestion_bank(seed, renderer=NullRenderer(), rng=np.random.default_rng(seed)),
+        "Math":MathQuestion_bank(seed, rng=np.random.default_rng(seed)),
+        "Memory":MemoryQuestion_bank(),
+        "SR":SRQuestion_bank(seed, renderer=NullRenderer(), rng=np.random.default_rng(seed)),
+    }
+
+def build_questions(test, bank, display_region):
+    """
+    Creates a test's questions from its bank, as main.py does.
+
+    Parameters:
+        test (str): The name of the test.
+        bank (QuestionBank): The test's question bank.
+        display_region (tk.Misc): The region the questions belong to, a Tcl interpreter without display when headless.
+
+    Returns:
+        tuple: The questions in display order, and the scored questions.
+    """
+
+    if test == "ANS":
+        questions = [ANSQuestion(display_region, "", answer, bank.image_source(i), timeout=3) for i, answer in enumerate(bank.column("answer"))]
+        return questions, questions
+
+    if test == "Math":
+        questions = [MathQuestion(display_region, "", equation[:steps], answer, timeout=15) for equation, steps, answer in zip(bank.column("equation"), bank.column("steps"), bank.column("answer"))]
+        return questions, questions
+
+    if test == "SR":
+        questions = [SpatialReasoningQuestion(display_region, "", options, answer, bank.image_source(i), timeout=25) for i, (options, answer) in enumerate(zip(bank.column("options"), bank.column("answer")))]
+        return questions, questions
+
+    # Memory Test: each picture is followed by its five subquestions.
+    subquestions = [MemoryQuestion(display_region, description, options, answer, image or None, timeout=10) for description, options, answer, image in zip(bank.column("description"), bank.column("options"), bank.column("answer"), bank.column("image"))]
+    questions = []
+    for group, group_image in enumerate(dict.fromkeys(bank.column("group_image"))):
+        questions.append(Question(display_region, "", group_image, timeout=20))
+        questions.extend(subquestions[group*5:group*5+5])
+
+    return questions, subquestions
+
+def run_test(questions, participant, clock, gap_ms=0):
+    """
+    Runs a test's questions through the Question state machine against the virtual clock, refreshing the timer like TestRunner does.
+
+    Parameters:
+        questions (list): The questions in display order.
+        participant (SimulatedParticipant or ScriptedParticipant): Answers the questions.
+        clock (VirtualClock): The clock installed as the session clock.
+        gap_ms (int, optional): Pause in milliseconds between questions. Defaults to 0.
+
+    Returns:
+        None
+    """
+
+    clock.advance(COUNTDOWN_MS)
+
+    for question in questions:
+
+        # Show the question and its timed stimulus phase.
+        question.mark_displayed(clock.now())
+        if question.stimulus_ms() != 0:
+            clock.advance(question.stimulus_ms())
+            question.mark_fully_displayed(clock.now())
+
+        # Refresh until the participant answers or the question times out.
+        submission, response_ms = participant.respond(question)
+        answer_at = clock.now()+int(response_ms*1_000_000) if submission != None else None
+        while True:
+            if answer_at != None and answer_at <= clock.now()+REFRESH_MS*1_000_000:
+                clock.time = answer_at
+                question.submit(submission)
+                break
+            clock.advance(REFRESH_MS)
+            question.check_timeout()
+            if question.time_up == True:
+                break
+
+        clock.advance(gap_ms)
+
+    return
+
+def run_session(banks, participant, clock, display_region, upload=None):
+    """
+    Runs a full simulated session: every test, its scoring and its upload payload.
+
+    Parameters:
+        banks (dict): The QuestionBank of each test, see build_banks().
+        participant (SimulatedParticipant or ScriptedParticipant): Answers the questions.
+        clock (VirtualClock): The clock installed as the session clock.
+        display_region (tk.Misc): The region the questions belong to.
+        upload (callable, optional): Called with the test name and its payload, e.g. to send it. Defaults to None.
+
+    Returns:
+        dict: The payload of each test.
+    """
+
+    payloads = {}
+    for test in ["ANS", "Math", "Memory", "SR"]:
+        questions, scored = build_questions(test, banks[test], display_region)
+        run_test(questions, participant, clock, GAP_MS[test])
+
+        Test_dict = {"total_score":0, "total_time":0, "score_list":[], "time_list":[]}
+        score_questions(scored, Test_dict)
+        payloads[test] = participant.details|compact_payload(Test_dict, banks[test])
+        if upload != None:
+            upload(test, payloads[test])
+
+    return payloads
+
+# Run simulated sessions when started as a script.
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Run simulated participants through the tests without a display.")
+    parser.add_argument("--participants", type=int, default=100, help="Number of sessions to run.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the simulated participants.")
+    parser.add_argument("--accuracy", type=float, default=0.8, help="Probability of a correct answer.")
+    parser.add_argument("--median-ms", type=float, default=1200, help="Median response time in milliseconds.")
+    parser.add_argument("--upload", action="append", default=[], metavar="TEST=FORM_ID", help="Send the payloads of a test to a form, e.g. ANS=1FAIpQ... (repeatable).")
+    args = parser.parse_args()
+
+    # Send payloads only for the tests given a form.
+    forms = dict(item.split("=", 1) for item in args.upload)
+    upload = None
+    if len(forms) != 0:
+        from data_interaction import send_data
+        def upload(test, payload):
+            if test in forms:
+                send_data(payload, forms[test])
+
+    # Questions only need a Tcl interpreter for their variables, no display.
+    clock = VirtualClock()
+    set_clock(clock.now)
+    display_region = tk.Tcl()
+    banks = build_banks()
+
+    rng = np.random.default_rng(args.seed)
+    scores = {test:[] for test in banks}
+    started = time.perf_counter()
+    for idx in range(args.participants):
+        participant = SimulatedParticipant(rng, args.accuracy, args.median_ms, user_id=f"S{idx:03d}")
+        for test, payload in run_session(banks, participant, clock, display_region, upload).items():
+            scores[test].append(payload["total_score"])
+    wall = time.perf_counter()-started
+
+    print(f"{args.participants} sessions, {clock.time/1e9:.0f} s simulated in {wall:.2f} s ({clock.time/1e9/wall:.0f}x real time)")
+    for test, values in scores.items():
+        print(f"{test}: mean score {np.mean(values):.2f}/{len(banks[test])}")
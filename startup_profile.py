@@ -0,0 +1,115 @@
+import importlib
+import threading
+import time
+import sys
+
+class StartupProfile:
+    """
+    A class to record how long the application takes to start: its imports, including the ones deferred to background threads, and its milestones up to the first screen being painted.
+
+    Attributes:
+        started (float): perf_counter() reading when the profile was created, i.e. when main.py started importing.
+        marks (list): The (milestone, seconds since started) of each milestone reached.
+        imports (list): The (module, thread name, seconds since started, duration in seconds) of each deferred import.
+        verbose (bool): Indicates whether deferred imports are printed as they complete.
+    """
+
+    def __init__(self):
+        """
+        Initializes the profile, starting its clock.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.started = time.perf_counter()
+        self.marks = []
+        self.imports = []
+        self.verbose = False
+        self._lock = threading.Lock()
+
+        return
+
+    def elapsed(self):
+        """
+        Returns the time since the profile was created.
+
+        Parameters:
+            None
+
+        Returns:
+            float: The elapsed time in seconds.
+        """
+
+        return time.perf_counter()-self.started
+
+    def mark(self, milestone):
+        """
+        Records that a milestone has been reached.
+
+        Parameters:
+            milestone (str): The name of the milestone, e.g. "first paint".
+
+        Returns:
+            None
+        """
+
+        with self._lock:
+            self.marks.append((milestone, self.elapsed()))
+
+        return
+
+    def import_module(self, name):
+        """
+        Imports a module on first use, timing the import if it has not been loaded yet.
+        Heavy dependencies (matplotlib, pandas, requests, ...) are imported this way on the threads that need them, so they do not delay the first screen.
+
+        Parameters:
+            name (str): The name of the module, e.g. "data_interaction".
+
+        Returns:
+            module: The imported module.
+        """
+
+        # A module being imported by another thread is already listed, import_module() waits for it to finish.
+        loaded = name in sys.modules
+        started = self.elapsed()
+        module = importlib.import_module(name)
+        if loaded:
+            return module
+
+        # Record the import once, even when several threads waited for it.
+        duration = self.elapsed()-started
+        with self._lock:
+            if name in [imported[0] for imported in self.imports]:
+                return module
+            self.imports.append((name, threading.current_thread().name, started, duration))
+        if self.verbose:
+            print(f"[startup] {name} imported in {duration*1000:.0f} ms on {threading.current_thread().name}")
+
+        return module
+
+    def report(self):
+        """
+        Summarizes the milestones and deferred imports recorded so far.
+
+        Parameters:
+            None
+
+        Returns:
+            str: One line per milestone, then one line per deferred import.
+        """
+
+        with self._lock:
+            lines = [f"[startup] {milestone}: {seconds*1000:.0f} ms" for milestone, seconds in self.marks]
+            for name, thread, started, duration in self.imports:
+                lines.append(f"[startup] {name} imported at {started*1000:.0f} ms in {duration*1000:.0f} ms on {thread}")
+
+        return "\n".join(lines)
+
+# Startup profile of the application, started when main.py imports this module first.
+startup_profile = StartupProfile()
@@ -0,0 +1,300 @@
+import json
+import mmap
+import os
+import struct
+
+# Archive layout: magic, index length, JSON index, then the image payloads back to back.
+ARCHIVE_MAGIC = b"CTSTIM01"
+ARCHIVE_VERSION = 1
+HEADER_FORMAT = "<8sQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# File types packed into an archive, everything else (e.g. Thumbs.db) is skipped.
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp")
+
+def stimulus_id(path, root="."):
+    """
+    Converts an image path into the stimulus ID used as key inside an archive.
+
+    Parameters:
+        path (str): Path to the image, e.g. "./Memory_Test/Figures/Description_img/MemoryQ_1.png".
+        root (str, optional): Directory the ID is made relative to. Defaults to the current directory.
+
+    Returns:
+        str: The stimulus ID, a relative POSIX path including the extension (e.g. "Memory_Test/Figures/Description_img/MemoryQ_1.png").
+    """
+
+    relative_path = os.path.relpath(os.path.normpath(path), os.path.normpath(root))
+    return relative_path.replace(os.sep, "/")
+
+def image_size(path):
+    """
+    Reads the width and height of an image without decoding its pixels.
+
+    Parameters:
+        path (str): Path to the image file.
+
+    Returns:
+        tuple: The (width, height) of the image in pixels.
+    """
+
+    # PNG stores its dimensions at a fixed position of the IHDR chunk.
+    with open(path, "rb") as file:
+        head = file.read(24)
+    if head[:8] == b"\x89PNG\r\n\x1a\n":
+        return struct.unpack(">II", head[16:24])
+
+    # Fall back to PIL, which only parses the header of other formats.
+    from PIL import Image
+    with Image.open(path) as image:
+        return image.size
+
+def pack_stimuli(directories, archive_path, root=".", metadata=None):
+    """
+    Packs every image found in the given directories into a single stimulus archive.
+
+    Parameters:
+        directories (list of str): Directories searched recursively for images.
+        archive_path (str): Path of the archive file to be written.
+        root (str, optional): Directory the stimulus IDs are made relative to. Defaults to the current directory.
+        metadata (dict, optional): Extra metadata per stimulus ID stored in the index. Defaults to None.
+
+    Returns:
+        index (dict): The index written to the archive header, mapping each stimulus ID to its entry.
+    """
+
+    metadata = metadata or {}
+
+    # Collect image paths in a stable order, ignoring non-image debris.
+    paths = []
+    for directory in directories:
+        for dir_path, dir_names, file_names in os.walk(directory):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(dir_path, file_name))
+
+    # Build the index, offsets are relative to the start of the payload section.
+    index = {}
+    offset = 0
+    for path in paths:
+        length = os.path.getsize(path)
+        width, height = image_size(path)
+        key = stimulus_id(path, root)
+        if key in index:
+            raise ValueError(f"Duplicate stimulus ID {key}, check for overlapping directories.")
+        index[key] = {
+            "offset":offset,
+            "length":length,
+            "width":width,
+            "height":height,
+            "format":os.path.splitext(path)[1][1:].lower(),
+            "metadata":metadata.get(key, {}),
+        }
+        offset += length
+    header_json = json.dumps({"version":ARCHIVE_VERSION, "stimuli":index}).encode("utf-8")
+
+    # Write the header followed by the raw image files.
+    with open(archive_path, "wb") as archive:
+        archive.write(struct.pack(HEADER_FORMAT, ARCHIVE_MAGIC, len(header_json)))
+        archive.write(header_json)
+        for path in paths:
+            with open(path, "rb") as file:
+                archive.write(file.read())
+
+    return index
+
+class StimulusArchive:
+    """
+    A class to give random access to the stimuli of a packed archive through a memory map.
+
+    Attributes:
+        path (str): Path of the archive file.
+        index (dict): Mapping of stimulus ID to its offset, length, dimensions, format and metadata.
+    """
+
+    def __init__(self, path):
+        """
+        Opens the archive, maps it into memory and parses its index.
+
+        Parameters:
+            path (str): Path of the archive file.
+
+        Returns:
+            None
+        """
+
+        self.path = path
+
+        self._mmap = None
+        self._view = None
+
+        # Map the whole file read-only, the payloads are only paged in when accessed.
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < HEADER_SIZE:
+                raise ValueError(f"{path} is not a stimulus archive.")
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        # Validate and parse the header, releasing the map if anything is malformed.
+        try:
+            magic, index_length = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+            if magic != ARCHIVE_MAGIC:
+                raise ValueError("Bad magic number.")
+            header = json.loads(bytes(self._view[HEADER_SIZE:HEADER_SIZE+index_length]))
+            version = header["version"]
+            self.index = header["stimuli"]
+        except (struct.error, ValueError, KeyError, TypeError) as error:
+            self.close()
+            raise ValueError(f"{path} is not a stimulus archive.") from error
+        if version != ARCHIVE_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported stimulus archive version {version}.")
+        self._payload_start = HEADER_SIZE + index_length
+
+        return
+
+    def __contains__(self, key):
+        return self._resolve(key) in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _resolve(self, key):
+        """
+        Accepts either a stimulus ID or an image path as used by the question banks.
+
+        Parameters:
+            key (str): A stimulus ID or an image path.
+
+        Returns:
+            str: The stimulus ID.
+        """
+
+        if key in self.index:
+            return key
+        return stimulus_id(key)
+
+    def get(self, key):
+        """
+        Returns the encoded payload of a stimulus without copying it out of the memory map.
+
+        Parameters:
+            key (str): A stimulus ID or an image path.
+
+        Returns:
+            memoryview: A read-only view of the encoded image bytes.
+        """
+
+        entry = self.index[self._resolve(key)]
+        start = self._payload_start + entry["offset"]
+        return self._view[start:start+entry["length"]]
+
+    def info(self, key):
+        """
+        Returns the index entry (payload offset, length, dimensions, format and metadata) of a stimulus.
+
+        Parameters:
+            key (str): A stimulus ID or an image path.
+
+        Returns:
+            dict: The index entry of the stimulus.
+        """
+
+        return self.index[self._resolve(key)]
+
+    def open_image(self, key):
+        """
+        Opens a stimulus as a PIL image, decoding straight from the memory map.
+
+        Parameters:
+            key (str): A stimulus ID or an image path.
+
+        Returns:
+            PIL.Image.Image: The decoded image.
+        """
+
+        from PIL import Image
+
+        # Drop the view once decoded so the archive can still be closed.
+        view = self.get(key)
+        try:
+            image = Image.open(MemoryviewReader(view))
+            image.load()
+        finally:
+            view.release()
+
+        return image
+
+    def close(self):
+        """
+        Releases the memory map. Views returned by get() must not be used afterwards.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        if self._view != None:
+            self._view.release()
+            self._view = None
+        if self._mmap != None:
+            self._mmap.close()
+            self._mmap = None
+
+        return
+
+class MemoryviewReader:
+    """
+    A minimal read-only file object over a memoryview, so PIL can decode without an intermediate bytes copy.
+
+    Attributes:
+        view (memoryview): The buffer being read.
+        position (int): The current read position.
+    """
+
+    def __init__(self, view):
+        self.view = view
+        self.position = 0
+
+    def read(self, size=-1):
+        end = len(self.view) if size is None or size < 0 else min(self.position+size, len(self.view))
+        chunk = self.view[self.position:end].tobytes()
+        self.position = end
+        return chunk
+
+    def readinto(self, buffer):
+        size = min(len(buffer), len(self.view)-self.position)
+        buffer[:size] = self.view[self.position:self.position+size]
+        self.position += size
+        return size
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += len(self.view)
+        self.position = max(0, offset)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def seekable(self):
+        return True
+
+    def readable(self):
+        return True
+
+# Pack the static stimuli when run as a script.
+# Generated figures (ANS dots, SR cubes) are rewritten on every launch, so they are left as loose files.
+if __name__ == "__main__":
+    pack_stimuli(["./Memory_Test/Figures"], "./stimuli.ctstim")
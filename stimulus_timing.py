@@ -0,0 +1,245 @@
+import time
+import csv
+import os
+
+# Session clock in integer nanoseconds, monotonic and unaffected by system time changes.
+# Replaced by set_clock(), e.g. with a virtual clock when running without a display.
+_clock = time.perf_counter_ns
+
+def set_clock(clock):
+    """
+    Replaces the session clock used for stimulus timing and response times.
+
+    Parameters:
+        clock (callable): Returns the current time in integer nanoseconds, e.g. time.perf_counter_ns.
+
+    Returns:
+        None
+    """
+
+    global _clock
+    _clock = clock
+
+    return
+
+def now_ns():
+    """
+    Reads the session clock.
+
+    Parameters:
+        None
+
+    Returns:
+        int: The current time in nanoseconds.
+    """
+
+    return _clock()
+
+class EventClock:
+    """
+    A class to map Tk event timestamps onto the session clock, so response times reflect when a key was pressed rather than when its callback ran.
+
+    Tk stamps input events in milliseconds of the window system's clock, which wraps around every 2**32 ms.
+    The offset between the two clocks is estimated as the smallest difference seen between the session clock on delivery and the event's stamp, i.e. the delivery with the least delay.
+
+    Attributes:
+        offset (int or None): The estimated offset in milliseconds, None until an event has been observed.
+        samples (int): Number of events observed.
+    """
+
+    def __init__(self):
+        """
+        Initializes an uncalibrated event clock.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.offset = None
+        self.samples = 0
+
+        return
+
+    def observe(self, event):
+        """
+        Refines the offset estimate with an input event.
+
+        Parameters:
+            event (tk.Event): Any event carrying a timestamp, e.g. a key press or a mouse motion.
+
+        Returns:
+            None
+        """
+
+        difference = (now_ns()//1_000_000 - event.time) % 2**32
+        if self.offset == None or difference < self.offset:
+            self.offset = difference
+        self.samples += 1
+
+        return
+
+    def event_time(self, event):
+        """
+        Converts the timestamp of an event to the session clock.
+
+        Parameters:
+            event (tk.Event): An input event.
+
+        Returns:
+            int: The time the event occurred, in nanoseconds on the session clock.
+        """
+
+        self.observe(event)
+        delivery = now_ns()
+        delay = (delivery//1_000_000 - event.time - self.offset) % 2**32
+
+        return delivery - delay*1_000_000
+
+    def install(self, root):
+        """
+        Calibrates the clock from every key press, click and mouse motion in the application.
+
+        Parameters:
+            root (tk.Tk): The root window.
+
+        Returns:
+            None
+        """
+
+        for sequence in ["<Key>", "<Button>", "<Motion>"]:
+            root.bind_all(sequence, self.observe, add="+")
+
+        return
+
+class TimingLog:
+    """
+    A class to collect the intended and actual duration of every timed phase of every trial, to quantify timing accuracy.
+
+    Attributes:
+        records (list): One dictionary per phase with the test, trial, phase, intended_ms, actual_ms and jitter_ms.
+        prefetch (dict): The number of questions displayed, and of those displayed before their images had been prefetched, by test name.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty log.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        self.records = []
+        self.prefetch = {}
+
+        return
+
+    def record(self, test, trial, timing):
+        """
+        Adds the timed phases of one trial.
+
+        Parameters:
+            test (str): The name of the test, e.g. "ANS".
+            trial (int): The index of the trial within the test.
+            timing (dict): The (intended, actual) duration in nanoseconds of each phase, by phase name.
+
+        Returns:
+            None
+        """
+
+        for phase, (intended, actual) in timing.items():
+            self.records.append({
+                "test":test,
+                "trial":trial,
+                "phase":phase,
+                "intended_ms":intended/1e6,
+                "actual_ms":actual/1e6,
+                "jitter_ms":(actual-intended)/1e6,
+            })
+
+        return
+
+    def record_prefetch(self, test, displayed, late):
+        """
+        Adds how well a test's image prefetcher kept ahead of the display.
+
+        Parameters:
+            test (str): The name of the test.
+            displayed (int): The number of questions displayed.
+            late (int): The number of them displayed before their images had been prefetched.
+
+        Returns:
+            None
+        """
+
+        self.prefetch[test] = (displayed, late)
+
+        return
+
+    def summary(self):
+        """
+        Summarizes the jitter of each test and phase, and the image prefetching of each test.
+
+        Parameters:
+            None
+
+        Returns:
+            str: One line per test and phase with the mean and maximum jitter in milliseconds, then one line per test with its late prefetches.
+        """
+
+        groups = {}
+        for record in self.records:
+            groups.setdefault((record["test"], record["phase"]), []).append(record["jitter_ms"])
+
+        lines = []
+        for (test, phase), jitters in groups.items():
+            lines.append(f"{test} {phase}: mean jitter {sum(jitters)/len(jitters):.1f} ms, max {max(jitters, key=abs):.1f} ms over {len(jitters)} trials")
+        for test, (displayed, late) in self.prefetch.items():
+            lines.append(f"{test} prefetch: {late}/{displayed} questions displayed before their images were prefetched")
+
+        return "\n".join(lines)
+
+    def write(self, path):
+        """
+        Writes the per-trial report as a CSV file.
+
+        Parameters:
+            path (str): Destination path, its directory is created if needed.
+
+        Returns:
+            None
+        """
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=["test", "trial", "phase", "intended_ms", "actual_ms", "jitter_ms"])
+            writer.writeheader()
+            writer.writerows(self.records)
+
+        return
+
+    def reset(self):
+        """
+        Clears the log for the next session.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        self.records = []
+        self.prefetch = {}
+
+        return
+
+# Session-wide event clock and timing log.
+event_clock = EventClock()
+timing_log = TimingLog()
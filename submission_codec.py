@@ -0,0 +1,184 @@
+import numpy as np
+
+def bank_fingerprint(bank):
+    """
+    Identifies a question bank by the generator that produced it, its version and its seed.
+
+    Parameters:
+        bank (QuestionBank): The question bank.
+
+    Returns:
+        str: The fingerprint, e.g. "ANS:v2:s60" (banks without a seed omit the last part, e.g. "Memory:v1").
+    """
+
+    fingerprint = f"{bank.metadata['generator']}:v{bank.metadata['version']}"
+    if bank.metadata.get("seed") != None:
+        fingerprint += f":s{bank.metadata['seed']}"
+
+    return fingerprint
+
+def encode_scores(score_list):
+    """
+    Packs per-trial 0/1 scores into a hex string, one bit per trial.
+
+    Parameters:
+        score_list (list): The per-trial scores.
+
+    Returns:
+        str: The packed scores, e.g. 64 trials become 16 hex characters.
+    """
+
+    return np.packbits(np.array(score_list, dtype=np.uint8)).tobytes().hex()
+
+def decode_scores(score_bits, trial_num):
+    """
+    Unpacks scores written by encode_scores().
+
+    Parameters:
+        score_bits (str): The packed scores.
+        trial_num (int): The number of trials.
+
+    Returns:
+        list: The per-trial scores.
+    """
+
+    return np.unpackbits(np.frombuffer(bytes.fromhex(score_bits), dtype=np.uint8))[:trial_num].tolist()
+
+def encode_times(time_list):
+    """
+    Encodes per-trial response times as comma-separated whole milliseconds.
+
+    Parameters:
+        time_list (list): The per-trial response times in seconds.
+
+    Returns:
+        str: The encoded times.
+    """
+
+    return ",".join(str(int(round(time*1000))) for time in time_list)
+
+def decode_times(time_ms):
+    """
+    Decodes response times written by encode_times().
+
+    Parameters:
+        time_ms (str): The encoded times.
+
+    Returns:
+        list: The per-trial response times in seconds.
+    """
+
+    return [int(time)/1000 for time in str(time_ms).split(",")]
+
+def score_questions(question_list, Test_dict):
+    """
+    Adds the score and response time of each answered or timed out question to a test's result dictionary.
+
+    Parameters:
+        question_list (list): The Question objects of the test, in display order.
+        Test_dict (dict): The test's result dictionary, its total_score, total_time, score_list and time_list are updated.
+
+    Returns:
+        None
+    """
+
+    for question in question_list:
+        if question.correctness:
+            Test_dict["total_score"] += 1
+            Test_dict["score_list"].append(1)
+        else:
+            Test_dict["score_list"].append(0)
+        Test_dict["total_time"] += question.get_time()
+        Test_dict["time_list"].append(question.get_time())
+
+    return
+
+def compact_payload(Test_dict, bank, legacy=True):
+    """
+    Builds the upload for a test, identifying the questions by the bank fingerprint and packing the per-trial vectors.
+    Until every response form has the bank_fingerprint, score_bits and time_ms fields, the per-question lists of earlier versions are sent alongside them. data_interaction.send_data() only posts the fields a form has, so a migrated form without the lists receives the compact fields alone.
+
+    Parameters:
+        Test_dict (dict): The test's result dictionary with total_score, total_time, score_list and time_list.
+        bank (QuestionBank): The question bank the test was run with.
+        legacy (bool, optional): Also includes every field of Test_dict, e.g. score_list and time_list. Defaults to True.
+
+    Returns:
+        dict: The fields to submit alongside the participant details.
+    """
+
+    return (Test_dict if legacy else {})|{
+        "total_score":Test_dict["total_score"],
+        "total_time":Test_dict["total_time"],
+        "bank_fingerprint":bank_fingerprint(bank),
+        "score_bits":encode_scores(Test_dict["score_list"]),
+        "time_ms":encode_times(Test_dict["time_list"]),
+    }
+
+class NullRenderer:
+    """
+    A renderer that draws nothing, so banks can be regenerated for analysis without producing any images.
+    """
+
+    def render_ans(self, points_l, points_r, path=None):
+        return path
+
+    def render_cube(self, cubes, views):
+        return [path for path, view, flip, rot in views]
+
+def regenerate_bank(fingerprint):
+    """
+    Rebuilds the question bank identified by a fingerprint, without rendering its images.
+
+    Parameters:
+        fingerprint (str): A fingerprint written by bank_fingerprint().
+
+    Returns:
+        QuestionBank: The regenerated bank.
+    """
+
+    parts = fingerprint.split(":")
+    generator, version = parts[0], int(parts[1][1:])
+    seed = int(parts[2][1:]) if len(parts) > 2 else None
+
+    # Import generators lazily, analysis only needs the one that produced the submission.
+    if generator == "ANS":
+        from ANSQuestion_generator import ANSQuestion_bank as bank_function, GENERATOR_VERSION
+        bank = lambda: bank_function(seed, renderer=NullRenderer())
+    elif generator == "Math":
+        from MathQuestion_generator import MathQuestion_bank as bank_function, GENERATOR_VERSION
+        bank = lambda: bank_function(seed)
+    elif generator == "Memory":
+        from MemoryQuestion_generator import MemoryQuestion_bank as bank_function, GENERATOR_VERSION
+        bank = lambda: bank_function()
+    elif generator == "SR":
+        from SRQuestion_generator import SRQuestion_bank as bank_function, GENERATOR_VERSION
+        bank = lambda: bank_function(seed, renderer=NullRenderer())
+    else:
+        raise ValueError(f"Unknown generator {generator}.")
+
+    # A different version would silently produce different questions.
+    if version != GENERATOR_VERSION:
+        raise ValueError(f"{fingerprint} was produced by {generator} generator version {version}, this code is version {GENERATOR_VERSION}.")
+
+    return bank()
+
+def expand_submission(row):
+    """
+    Rebuilds the full per-trial table of a compact submission by regenerating its question bank.
+
+    Parameters:
+        row (dict): One submission as read from the response sheet, with bank_fingerprint, score_bits and time_ms.
+
+    Returns:
+        table (pandas.DataFrame): One row per trial with the bank's fields, the score and the response time.
+    """
+
+    import pandas as pd
+
+    bank = regenerate_bank(row["bank_fingerprint"])
+    table = pd.DataFrame({name:bank.column(name) for name in bank.records.dtype.names})
+    table["score"] = decode_scores(row["score_bits"], len(bank))
+    table["time"] = decode_times(row["time_ms"])
+
+    return table
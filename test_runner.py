@@ -0,0 +1,210 @@
+import tkinter as tk
+from tkinter import ttk
+from stimulus_timing import timing_log
+from loop_monitor import loop_monitor
+
+class TestRunner:
+    """
+    A class to run the questions of a test on the Tk event loop.
+
+    Question onset, the gap between questions and the timer refresh are scheduled with after(), and answers are signalled by the questions themselves when they close.
+    Nothing polls in between, so the application stays idle while it waits for the participant, and every Tk call happens on the main thread.
+
+    Attributes:
+        name (str): The name of the test, used in the timing report.
+        test_frame (tk.Frame): The frame the test is displayed in.
+        labels (tuple): The instruction and timer labels shown before the test starts.
+        questions (list): The questions, in display order.
+        scored (list): The questions counted by the progress indicator, defaults to all of them.
+        progress_indicator (tk.Frame): The frame holding the progress bar and the timer.
+        prefetcher (ImagePrefetcher): Decodes the images of upcoming questions, None to load them on display.
+        gap (int): Pause in milliseconds between a question closing and the next one being displayed.
+        refresh_interval (int): Period in milliseconds of the timer refresh.
+        position (int): Index of the question currently displayed.
+        started (bool): Indicates whether the countdown has started.
+    """
+
+    def __init__(self, name, test_frame, labels, questions, progress_indicator, prefetcher=None, scored=None, gap=0, refresh_interval=50):
+        """
+        Initializes the runner.
+
+        Parameters:
+            name (str): The name of the test, used in the timing report.
+            test_frame (tk.Frame): The frame the test is displayed in.
+            labels (tuple): The instruction and timer labels shown before the test starts.
+            questions (list): The questions, in display order.
+            progress_indicator (tk.Frame): The frame receiving the progress bar and the timer.
+            prefetcher (ImagePrefetcher, optional): Decodes the images of upcoming questions. Defaults to None.
+            scored (list, optional): The questions counted by the progress indicator. Defaults to None, counting all questions.
+            gap (int, optional): Pause in milliseconds between questions. Defaults to 0.
+            refresh_interval (int, optional): Period in milliseconds of the timer refresh. Defaults to 50.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.name = name
+        self.test_frame = test_frame
+        self.labels = labels
+        self.questions = questions
+        self.scored = scored if scored != None else questions
+        self.progress_indicator = progress_indicator
+        self.prefetcher = prefetcher
+        self.gap = gap
+        self.refresh_interval = refresh_interval
+        self.position = 0
+        self.on_finish = None
+        self.started = False
+        self._refresh_id = None
+
+        return
+
+    def start(self, on_finish):
+        """
+        Starts the test as soon as its frame is displayed, after a 5 second countdown.
+
+        Parameters:
+            on_finish (callable): Called without arguments once the last question has closed.
+
+        Returns:
+            None
+        """
+
+        self.on_finish = on_finish
+
+        # Wait for the test frame to be mapped if it is not viewable yet.
+        if self.test_frame.winfo_viewable() == 0:
+            self.test_frame.bind("<Map>", self.on_map, add="+")
+            return
+
+        self.started = True
+        self.countdown(5)
+
+        return
+
+    def on_map(self, event):
+        """
+        Starts the countdown the first time the test frame is mapped.
+
+        Parameters:
+            event (tk.Event): The map event.
+
+        Returns:
+            None
+        """
+
+        if self.started == False and event.widget == self.test_frame:
+            self.started = True
+            self.countdown(5)
+
+        return
+
+    def countdown(self, seconds):
+        """
+        Counts down on the timer label, one scheduled step per second, then starts the first question.
+
+        Parameters:
+            seconds (int): The seconds left before the test starts.
+
+        Returns:
+            None
+        """
+
+        if seconds > 0:
+            self.labels[1].set_html(f"<h3>Test will start in {seconds} seconds.</h3>")
+            self.test_frame.after(1000, self.countdown, seconds-1)
+            return
+
+        self.labels[0].place_forget()
+        self.labels[1].place_forget()
+        loop_monitor.set_phase(self.name)
+
+        # Initialize the progress indicator.
+        self.bar_description = tk.Label(self.progress_indicator, text=f"Q 1/{len(self.scored)} :", bg="white")
+        self.progress_bar = ttk.Progressbar(self.progress_indicator, orient="horizontal", length=100, mode="determinate")
+        self.timer = tk.Label(self.progress_indicator, text="Question not fully displayed", font=("Helvetica", 12), bg="white")
+        self.bar_description.grid(row=0, column=0)
+        self.progress_bar.grid(row=0, column=1)
+        self.timer.grid(row=1, column=0, columnspan=2)
+
+        self.show_question()
+
+        return
+
+    def show_question(self):
+        """
+        Displays the current question, or finishes the test once all questions have been displayed.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        if self.position == len(self.questions):
+            loop_monitor.set_phase(f"{self.name} result")
+            return self.on_finish()
+
+        question = self.questions[self.position]
+        question.on_close = self.on_question_closed
+        if self.prefetcher != None:
+            self.prefetcher.advance(self.position)
+        question.display_question()
+        self.refresh()
+
+        return
+
+    def refresh(self):
+        """
+        Updates the time left and expires the current question on its timeout, then schedules the next refresh.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        question = self.questions[self.position]
+        if question.fully_displayed == True:
+            self.timer["text"] = f"You have {question.timeout-question.get_time():.1f} seconds left"
+            question.check_timeout()
+
+        # The question may just have timed out, in which case on_question_closed has already moved on.
+        if question.widgets != None:
+            self._refresh_id = self.test_frame.after(self.refresh_interval, self.refresh)
+
+        return
+
+    def on_question_closed(self):
+        """
+        Moves on to the next question once the current one has been answered or has timed out.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        if self._refresh_id != None:
+            self.test_frame.after_cancel(self._refresh_id)
+            self._refresh_id = None
+
+        # Log how accurately the question's timed phases were shown.
+        question = self.questions[self.position]
+        timing_log.record(self.name, self.position, question.timing)
+
+        # Update the progress indicator for the questions it counts.
+        if question in self.scored:
+            done = self.scored.index(question)+1
+            self.bar_description["text"] = f"Q {min(done+1, len(self.scored))}/{len(self.scored)} :"
+            self.progress_bar["value"] = done*100/len(self.scored)
+        self.timer["text"] = "Question not fully displayed"
+
+        self.position += 1
+        self.test_frame.after(self.gap, self.show_question)
+
+        return
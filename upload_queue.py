@@ -0,0 +1,127 @@
+import threading
+from collections import deque
+
+class UploadQueue:
+    """
+    A class to run network jobs (result uploads, percentile lookups) on long-lived worker threads, in the order they are submitted.
+
+    The tests hand their uploads over and move on straight away, so the next test can start while earlier uploads are still in flight.
+    Workers are daemon threads, so a stalled request cannot keep the application open; call join() before exiting to let queued uploads finish.
+
+    Attributes:
+        workers (int): Number of worker threads.
+        pending (int): Number of jobs submitted and not finished yet.
+        failures (list): The (job name, exception) of each job that raised.
+    """
+
+    def __init__(self, workers=2):
+        """
+        Initializes the queue and starts its worker threads.
+
+        Parameters:
+            workers (int, optional): Number of jobs run at the same time. Defaults to 2.
+
+        Returns:
+            None
+        """
+
+        # Assign attributes.
+        self.workers = workers
+        self.pending = 0
+        self.failures = []
+        self._jobs = deque()
+        self._closed = False
+        self._condition = threading.Condition()
+
+        for idx in range(workers):
+            threading.Thread(target=self._work, name=f"upload-{idx}", daemon=True).start()
+
+        return
+
+    def submit(self, name, job, on_done=None):
+        """
+        Queues a job.
+
+        Parameters:
+            name (str): The name of the job, used when reporting failures.
+            job (callable): Called without arguments on a worker thread.
+            on_done (callable, optional): Called on the worker thread with the job's return value, or with None if it raised. Defaults to None.
+
+        Returns:
+            None
+        """
+
+        with self._condition:
+            self._jobs.append((name, job, on_done))
+            self.pending += 1
+            self._condition.notify()
+
+        return
+
+    def _work(self):
+        """
+        Runs queued jobs until the queue is closed and empty.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        while True:
+            with self._condition:
+                while len(self._jobs) == 0 and self._closed == False:
+                    self._condition.wait()
+                if len(self._jobs) == 0:
+                    return
+                name, job, on_done = self._jobs.popleft()
+
+            # A failed job must not stop the worker, its caller is told through on_done.
+            result = None
+            try:
+                result = job()
+            except Exception as error:
+                self.failures.append((name, error))
+                print(f"Upload job {name} failed: {error!r}")
+
+            if on_done != None:
+                try:
+                    on_done(result)
+                except Exception as error:
+                    print(f"Upload job {name} callback failed: {error!r}")
+
+            with self._condition:
+                self.pending -= 1
+                self._condition.notify_all()
+
+    def join(self, timeout=None):
+        """
+        Waits for all submitted jobs to finish.
+
+        Parameters:
+            timeout (float, optional): Maximum wait in seconds. Defaults to None, waiting as long as needed.
+
+        Returns:
+            bool: True if all jobs have finished.
+        """
+
+        with self._condition:
+            return self._condition.wait_for(lambda: self.pending == 0, timeout)
+
+    def close(self):
+        """
+        Lets the workers exit once the jobs already queued have finished.
+
+        Parameters:
+            None
+
+        Returns:
+            None
+        """
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        return